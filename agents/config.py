@@ -21,6 +21,13 @@ class AgentConfig:
     db_user: str = os.getenv("DB_USER", "postgres")
     db_password: str = os.getenv("DB_PASSWORD", "")
     
+    # Connection pool
+    db_pool_min_size: int = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+    db_pool_max_size: int = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+    db_pool_max_idle_seconds: float = float(os.getenv("DB_POOL_MAX_IDLE_SECONDS", "300"))
+    db_pool_max_lifetime_seconds: float = float(os.getenv("DB_POOL_MAX_LIFETIME_SECONDS", "3600"))
+    db_pool_acquire_timeout_seconds: float = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT_SECONDS", "30"))
+    
     # LLM
     llm_model: str = os.getenv("LLM_MODEL", "gpt-4-turbo-preview")
     llm_temperature: float = float(os.getenv("LLM_TEMPERATURE", "0.1"))
@@ -36,6 +43,15 @@ class AgentConfig:
     expiry_medium_days: int = int(os.getenv("EXPIRY_MEDIUM_DAYS", "90"))
     shortfall_horizon_weeks: int = int(os.getenv("SHORTFALL_HORIZON_WEEKS", "8"))
     
+    # API
+    dashboard_query_timeout_seconds: float = float(os.getenv("DASHBOARD_QUERY_TIMEOUT_SECONDS", "5"))
+    response_cache_ttl_seconds: float = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+    response_cache_max_entries: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+    response_compress_min_bytes: int = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+    live_update_queue_size: int = int(os.getenv("LIVE_UPDATE_QUEUE_SIZE", "16"))
+    live_update_refresh_seconds: float = float(os.getenv("LIVE_UPDATE_REFRESH_SECONDS", "60"))
+    live_update_debounce_seconds: float = float(os.getenv("LIVE_UPDATE_DEBOUNCE_SECONDS", "1"))
+    
     # Monitoring
     enable_daily_monitoring: bool = os.getenv("ENABLE_DAILY_MONITORING", "true").lower() == "true"
     monitoring_schedule: str = os.getenv("MONITORING_SCHEDULE", "0 6 * * *")
@@ -57,6 +73,17 @@ class AgentConfig:
         """Get PostgreSQL connection string"""
         return f"postgresql://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port}/{self.db_name}"
     
+    @property
+    def db_pool_settings(self) -> dict:
+        """Get connection pool sizing options"""
+        return {
+            "min_size": self.db_pool_min_size,
+            "max_size": self.db_pool_max_size,
+            "max_idle_seconds": self.db_pool_max_idle_seconds,
+            "max_lifetime_seconds": self.db_pool_max_lifetime_seconds,
+            "acquire_timeout_seconds": self.db_pool_acquire_timeout_seconds,
+        }
+    
     def validate(self) -> bool:
         """Validate configuration"""
         errors = []
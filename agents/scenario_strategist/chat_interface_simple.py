@@ -8,83 +8,155 @@ import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 from agents.config import config
-import psycopg2
+from tools.db_pool import get_pool
+from tools.data_events import register_reload_hook
+from tools.entity_resolver import EntityResolver
+from tools.text_search import normalize_key, tiered_fetch
 from psycopg2.extras import RealDictCursor
 import json
 
 
+# Rows fetched per round trip when streaming bulk feasibility results
+BULK_FETCH_ROWS = 500
+
+# One set-based pass: each requested lot joined to one inventory row and its latest re-evaluation
+BULK_FEASIBILITY_SQL = """
+    SELECT
+        r.ord,
+        b.trial_name, b.location, b.lot, b.package_type_description, b.expiry_date,
+        e.re_eval_id, e.request_type, e.sample_status, e.target_date
+    FROM unnest(%(lot_keys)s::text[]) WITH ORDINALITY AS r(lot_key, ord)
+    LEFT JOIN LATERAL (
+        SELECT trial_name, location, lot, package_type_description, expiry_date
+        FROM available_inventory_report i
+        WHERE i.lot_key = r.lot_key AND i.deleted_at IS NULL
+        LIMIT 1
+    ) b ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT re_eval_id, request_type, sample_status, target_date
+        FROM re_evaluation v
+        WHERE v.lot_key = r.lot_key AND v.deleted_at IS NULL
+        ORDER BY v.created_date DESC
+        LIMIT 1
+    ) e ON b.lot IS NOT NULL
+    ORDER BY r.ord;
+"""
+
+# Candidates offered when free text does not name an entity unambiguously
+SUGGESTION_LIMIT = 5
+
+BATCH_COLUMNS = ('trial_name', 'location', 'lot', 'package_type_description', 'expiry_date')
+EXTENSION_COLUMNS = ('re_eval_id', 'request_type', 'sample_status', 'target_date')
+
+
 class ScenarioStrategistSimple:
     """Simplified decision support agent"""
     
     def __init__(self):
         self.config = config
+        self.pool = get_pool(self.config.db_connection_string, **self.config.db_pool_settings)
         self.conversation_history = []
+        
+        # Lots, trials and countries held in memory; reloaded after the loaders announce new data
+        self.resolver = EntityResolver(self.pool.connection)
+        register_reload_hook(self.resolver.invalidate)
     
     def get_db_connection(self):
-        """Get database connection"""
-        return psycopg2.connect(
-            host=self.config.db_host,
-            port=self.config.db_port,
-            user=self.config.db_user,
-            password=self.config.db_password,
-            dbname=self.config.db_name
-        )
+        """Get pooled database connection (close() returns it to the pool)"""
+        return self.pool.acquire()
+    
+    def resolve_entity(self, kind: str, term: str, all_prefix: bool = False) -> Tuple[List[str], List[str]]:
+        """
+        Canonical lot, trial or country names for free text.
+        
+        Only an exact match or a single prefix completion (every completion
+        with all_prefix) counts as what the user named. Ambiguous completions
+        and fuzzy matches are returned as suggestions only and must not be
+        answered for. If the resolver cannot be loaded, the raw term is the
+        answer and the tiered SQL lookups resolve it.
+        
+        Returns:
+            Tuple of (names to answer for, "did you mean" suggestions)
+        """
+        try:
+            matches = self.resolver.resolve(kind, term, limit=None if all_prefix else SUGGESTION_LIMIT)
+        except Exception as e:
+            print(f"⚠️  Entity resolver unavailable, querying directly: {e}")
+            return [term], []
+        
+        values = [match.value for match in matches]
+        tier = matches[0].tier if matches else None
+        if tier == "exact" or (tier == "prefix" and (all_prefix or len(values) == 1)):
+            return values, []
+        return [], values[:SUGGESTION_LIMIT]
+    
+    @staticmethod
+    def did_you_mean(suggestions: List[str]) -> str:
+        """Suggestion suffix for a not-found answer"""
+        return f"\n💡 Did you mean: {', '.join(suggestions)}?" if suggestions else ""
     
     def check_batch_exists(self, lot_number: str):
-        """Check if batch exists in inventory"""
+        """Check if batch exists in inventory (exact lot first, then prefix, then substring)"""
         conn = self.get_db_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
         
         query = """
             SELECT trial_name, location, lot, package_type_description, expiry_date
             FROM available_inventory_report
-            WHERE lot ILIKE %s
+            WHERE {match} AND deleted_at IS NULL
             LIMIT 1;
         """
         
-        cursor.execute(query, (f"%{lot_number}%",))
-        result = cursor.fetchone()
+        _, results = tiered_fetch(cursor, query, "lot_key", "lot", lot_number)
         
         cursor.close()
         conn.close()
         
-        return dict(result) if result else None
+        return dict(results[0]) if results else None
     
     def check_extension_feasibility(self, lot_number: str) -> Dict:
         """Check if batch can be extended"""
         batch_info = self.check_batch_exists(lot_number)
         
         if not batch_info:
-            return {
-                'feasible': False,
-                'reason': f"Batch {lot_number} not found in inventory"
-            }
+            return self.feasibility_result(lot_number, None, None)
         
         conn = self.get_db_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
         
-        # Check if previous extensions exist
+        # Check if previous extensions exist for the lot found in inventory
         query = """
-            SELECT revision_number, extension_type, status
+            SELECT re_eval_id, request_type, sample_status, target_date
             FROM re_evaluation
-            WHERE lot ILIKE %s
-            ORDER BY revision_date DESC
+            WHERE {match} AND deleted_at IS NULL
+            ORDER BY created_date DESC
             LIMIT 1;
         """
         
-        cursor.execute(query, (f"%{lot_number}%",))
-        extension_history = cursor.fetchone()
+        _, results = tiered_fetch(cursor, query, "lot_key", "lot_number", batch_info['lot'])
+        extension_history = results[0] if results else None
         
         cursor.close()
         conn.close()
         
+        return self.feasibility_result(lot_number, batch_info, dict(extension_history) if extension_history else None)
+    
+    @staticmethod
+    def feasibility_result(lot_number: str, batch_info: Optional[Dict], extension_history: Optional[Dict]) -> Dict:
+        """Feasibility answer for one lot from its inventory row and latest re-evaluation"""
+        if not batch_info:
+            return {
+                'feasible': False,
+                'reason': f"Batch {lot_number} not found in inventory"
+            }
+        
         if extension_history:
             return {
                 'feasible': True,
                 'batch_info': batch_info,
-                'extension_history': dict(extension_history),
+                'extension_history': extension_history,
                 'recommendation': 'Extension request can be submitted. Previous extension found.'
             }
         else:
@@ -95,6 +167,41 @@ class ScenarioStrategistSimple:
                 'recommendation': 'Extension request can be submitted. No previous extensions found.'
             }
     
+    def check_extension_feasibility_bulk(self, lot_numbers: Sequence[str]) -> Iterator[Dict]:
+        """
+        Check many lots at once, yielding one result per lot in request order.
+        
+        All lots are answered by a single set-based query (BULK_FEASIBILITY_SQL)
+        read through a server-side cursor, so 500 lots cost one statement
+        instead of 1000+ round trips. Lots match on their normalized key only;
+        a bulk answer is never based on a fuzzy guess.
+        
+        Args:
+            lot_numbers: Lot numbers
+        
+        Returns:
+            Iterator of feasibility results, each with the requested lot_number
+        """
+        lot_numbers = list(lot_numbers)
+        lot_keys = [normalize_key(lot_number) for lot_number in lot_numbers]
+        
+        conn = self.get_db_connection()
+        try:
+            cursor = conn.cursor(name="bulk_extension_feasibility", cursor_factory=RealDictCursor)
+            cursor.itersize = BULK_FETCH_ROWS
+            cursor.execute(BULK_FEASIBILITY_SQL, {"lot_keys": lot_keys})
+            
+            for row in cursor:
+                lot_number = lot_numbers[row['ord'] - 1]
+                batch_info = {column: row[column] for column in BATCH_COLUMNS} if row['lot'] is not None else None
+                history = {column: row[column] for column in EXTENSION_COLUMNS} if row['re_eval_id'] else None
+                yield {'lot_number': lot_number, **self.feasibility_result(lot_number, batch_info, history)}
+            
+            cursor.close()
+        finally:
+            conn.rollback()
+            conn.close()
+    
     def get_trial_inventory_summary(self, trial_name: str) -> List[Dict]:
         """Get inventory summary for a trial"""
         conn = self.get_db_connection()
@@ -108,13 +215,12 @@ class ScenarioStrategistSimple:
                 MIN(expiry_date) as earliest_expiry,
                 MAX(expiry_date) as latest_expiry
             FROM available_inventory_report
-            WHERE trial_name ILIKE %s
+            WHERE {match} AND deleted_at IS NULL
             GROUP BY trial_name, location
             ORDER BY earliest_expiry ASC;
         """
         
-        cursor.execute(query, (f"%{trial_name}%",))
-        results = cursor.fetchall()
+        _, results = tiered_fetch(cursor, query, "trial_key", "trial_name", trial_name)
         
         cursor.close()
         conn.close()
@@ -127,14 +233,18 @@ class ScenarioStrategistSimple:
         cursor = conn.cursor(cursor_factory=RealDictCursor)
         
         query = """
-            SELECT destination_country, lead_time_days_min, lead_time_days_max
+            SELECT
+                country_name AS destination_country,
+                MIN(lead_time_days) AS lead_time_days_min,
+                MAX(lead_time_days) AS lead_time_days_max
             FROM ip_shipping_timelines_report
-            WHERE destination_country ILIKE %s
+            WHERE {match}
+            GROUP BY country_name
+            ORDER BY country_name
             LIMIT 5;
         """
         
-        cursor.execute(query, (f"%{destination}%",))
-        results = cursor.fetchall()
+        _, results = tiered_fetch(cursor, query, "country_key", "country_name", destination)
         
         cursor.close()
         conn.close()
@@ -164,13 +274,17 @@ class ScenarioStrategistSimple:
                         break
                 
                 if lot_number:
-                    result = self.check_extension_feasibility(lot_number)
+                    lots, suggestions = self.resolve_entity("lot", lot_number)
+                    if not lots:
+                        return f"❌ Batch {lot_number} not found in inventory" + self.did_you_mean(suggestions)
+                    result = self.check_extension_feasibility(lots[0])
                     
                     if result['feasible']:
                         response = f"""
 ✅ EXTENSION FEASIBILITY: YES
 
 Batch Information:
+• Lot: {result['batch_info']['lot']}
 • Trial: {result['batch_info']['trial_name']}
 • Location: {result['batch_info']['location']}
 • Material: {result['batch_info']['package_type_description']}
@@ -201,18 +315,23 @@ Next Steps:
                             break
                 
                 if trial_name:
-                    results = self.get_trial_inventory_summary(trial_name)
+                    # Every trial the name is a prefix of, as the substring search used to return
+                    trials, suggestions = self.resolve_entity("trial", trial_name, all_prefix=True)
                     
-                    if results:
-                        response = f"\n📦 INVENTORY SUMMARY FOR {results[0]['trial_name']}\n\n"
+                    response = ""
+                    for trial in trials:
+                        results = self.get_trial_inventory_summary(trial)
+                        if results:
+                            response += f"\n📦 INVENTORY SUMMARY FOR {results[0]['trial_name']}\n\n"
                         for item in results:
                             response += f"Location: {item['location']}\n"
                             response += f"  • Batches: {item['batch_count']}\n"
                             response += f"  • Earliest Expiry: {item['earliest_expiry']}\n"
                             response += f"  • Latest Expiry: {item['latest_expiry']}\n\n"
+                    if response:
                         return response
                     else:
-                        return f"❌ No inventory found for trial '{trial_name}'"
+                        return f"❌ No inventory found for trial '{trial_name}'" + self.did_you_mean(suggestions)
                 else:
                     return "❌ Please specify a trial name"
             
@@ -228,7 +347,8 @@ Next Steps:
                             break
                 
                 if country:
-                    results = self.get_country_shipping_timeline(country)
+                    countries, suggestions = self.resolve_entity("country", country)
+                    results = self.get_country_shipping_timeline(countries[0]) if countries else []
                     
                     if results:
                         response = f"\n🚚 SHIPPING TIMELINE TO {results[0]['destination_country']}\n\n"
@@ -236,7 +356,7 @@ Next Steps:
                         response += f"Lead Time: {item['lead_time_days_min']}-{item['lead_time_days_max']} days\n"
                         return response
                     else:
-                        return f"❌ No shipping data found for '{country}'"
+                        return f"❌ No shipping data found for '{country}'" + self.did_you_mean(suggestions)
                 else:
                     return "❌ Please specify a destination country"
             
@@ -8,12 +8,14 @@ import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
-from typing import Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 from agents.config import config
-from tools.sql_tools import SQLQueryTool, RiskCalculationTool, AlertGeneratorTool
+from tools.sql_tools import SQLQueryTool, AlertGeneratorTool, ExpiryBucketAggregator
+from tools.db_pool import get_pool
+from tools.expiry_snapshot import refresh_expiry_snapshot_if_stale
+from tools.data_events import notify_monitoring_run
 import json
 from datetime import datetime
-import psycopg2
 from psycopg2.extras import RealDictCursor
 
 
@@ -22,118 +24,106 @@ class SupplyWatchdogSimple:
     
     def __init__(self):
         self.config = config
+        self.pool = get_pool(self.config.db_connection_string, **self.config.db_pool_settings)
         self.alert_tool = AlertGeneratorTool()
         
     def get_db_connection(self):
-        """Get database connection"""
-        return psycopg2.connect(
-            host=self.config.db_host,
-            port=self.config.db_port,
-            user=self.config.db_user,
-            password=self.config.db_password,
-            dbname=self.config.db_name
-        )
+        """Get pooled database connection (close() returns it to the pool)"""
+        return self.pool.acquire()
     
-    def detect_expiry_risks(self) -> List[Dict]:
-        """Detect batches expiring within configured thresholds"""
-        print("🔍 Detecting expiry risks...")
-        
-        conn = self.get_db_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Query for expiring inventory
-        query = """
-            SELECT 
-                trial_name,
-                location,
-                lot,
-                package_type_description as material,
-                expiry_date,
-                EXTRACT(DAY FROM (expiry_date::date - CURRENT_DATE)) as days_until_expiry
-            FROM available_inventory_report
-            WHERE expiry_date IS NOT NULL
-                AND expiry_date::date > CURRENT_DATE
-                AND expiry_date::date <= CURRENT_DATE + INTERVAL '90 days'
-            ORDER BY expiry_date ASC
-            LIMIT 50;
+    def build_risk_query(self) -> Tuple[str, Dict[str, int]]:
         """
+        All watchdog detection rules as one CTE query returning a single row.
         
-        cursor.execute(query)
-        results = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
-        
-        # Categorize by risk level
-        risk_calculator = RiskCalculationTool(self.config)
-        categorized = []
+        expiry_risks: every snapshot row inside the medium window, soonest
+        first, with its precomputed risk_level. shortfall_risks: trial/
+        locations where at least half the dated batches are expired or
+        critical, from the shared bucket scan. severity_breakdown: expiry
+        risk counts per level. Nothing is truncated.
+        """
+        buckets, params = ExpiryBucketAggregator(self.config).build_query(
+            group_by=["trial_name", "location"],
+            where="expired_count + critical_count > 0 AND expired_count + critical_count >= dated_count * 0.5"
+        )
         
-        for row in results:
-            days = int(row['days_until_expiry'])
-            risk_level = risk_calculator.categorize_expiry_risk(days)
-            
-            categorized.append({
-                'trial_name': row['trial_name'],
-                'location': row['location'],
-                'lot': row['lot'],
-                'material': row['material'],
-                'expiry_date': str(row['expiry_date']),
-                'days_until_expiry': days,
-                'risk_level': risk_level
-            })
+        query = f"""
+            WITH expiring AS (
+                SELECT 
+                    trial_name,
+                    location,
+                    lot,
+                    package_type_description as material,
+                    expiry_date,
+                    days_until_expiry,
+                    risk_level
+                FROM inventory_expiry_snapshot
+                WHERE days_until_expiry > 0
+                    AND days_until_expiry <= %(medium_days)s
+            ),
+            shortfalls AS (
+                {buckets.strip().rstrip(";")}
+            )
+            SELECT
+                (SELECT COALESCE(json_agg(expiring ORDER BY days_until_expiry, expiry_date), '[]'::json)
+                 FROM expiring) AS expiry_risks,
+                (SELECT COALESCE(json_agg(json_build_object(
+                    'trial_name', trial_name,
+                    'location', location,
+                    'total_batches', dated_count,
+                    'expiring_soon', expired_count + critical_count,
+                    'risk_level', 'HIGH'::text
+                 ) ORDER BY expired_count + critical_count DESC), '[]'::json)
+                 FROM shortfalls) AS shortfall_risks,
+                (SELECT COALESCE(json_object_agg(risk_level, risk_count), '{{}}'::json)
+                 FROM (SELECT risk_level, COUNT(*) AS risk_count FROM expiring GROUP BY risk_level) levels
+                ) AS severity_breakdown;
+        """
         
-        print(f"  ✓ Found {len(categorized)} expiring batches")
-        return categorized
+        return query, params
     
-    def detect_shortfall_risks(self) -> List[Dict]:
-        """Detect potential inventory shortfalls"""
-        print("🔍 Detecting shortfall risks...")
-        
-        conn = self.get_db_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Simplified shortfall detection - check low inventory
-        query = """
-            SELECT 
-                trial_name,
-                location,
-                COUNT(*) as batch_count,
-                SUM(CASE WHEN expiry_date::date <= CURRENT_DATE + INTERVAL '30 days' THEN 1 ELSE 0 END) as expiring_soon
-            FROM available_inventory_report
-            WHERE expiry_date IS NOT NULL
-            GROUP BY trial_name, location
-            HAVING SUM(CASE WHEN expiry_date::date <= CURRENT_DATE + INTERVAL '30 days' THEN 1 ELSE 0 END) > 0
-            ORDER BY expiring_soon DESC
-            LIMIT 20;
+    def detect_risks(self, conn) -> Dict[str, Any]:
         """
+        Detect expiry and shortfall risks in one round trip.
         
-        cursor.execute(query)
-        results = cursor.fetchall()
+        Args:
+            conn: Pooled connection (the caller returns it)
+            
+        Returns:
+            Dict with expiry_risks, shortfall_risks and severity_breakdown
+        """
+        print("🔍 Detecting expiry and shortfall risks...")
         
+        query, params = self.build_risk_query()
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor.execute(query, params)
+        row = cursor.fetchone()
         cursor.close()
-        conn.close()
         
-        shortfalls = []
-        for row in results:
-            if row['expiring_soon'] >= row['batch_count'] * 0.5:  # 50%+ expiring
-                shortfalls.append({
-                    'trial_name': row['trial_name'],
-                    'location': row['location'],
-                    'total_batches': row['batch_count'],
-                    'expiring_soon': row['expiring_soon'],
-                    'risk_level': 'HIGH'
-                })
+        risks = {
+            'expiry_risks': row['expiry_risks'],
+            'shortfall_risks': row['shortfall_risks'],
+            'severity_breakdown': row['severity_breakdown'],
+        }
         
-        print(f"  ✓ Found {len(shortfalls)} potential shortfalls")
-        return shortfalls
+        print(f"  ✓ Found {len(risks['expiry_risks'])} expiring batches")
+        print(f"  ✓ Found {len(risks['shortfall_risks'])} potential shortfalls")
+        return risks
     
-    def generate_alert(self, expiry_risks: List[Dict], shortfall_risks: List[Dict]) -> Dict:
+    def generate_alert(
+        self,
+        expiry_risks: List[Dict],
+        shortfall_risks: List[Dict],
+        severity_breakdown: Optional[Dict[str, int]] = None
+    ) -> Dict:
         """Generate consolidated alert"""
         
-        # Count by severity
+        # Count by severity (already bucketed by detect_risks when given)
         severity_counts = {'CRITICAL': 0, 'HIGH': 0, 'MEDIUM': 0, 'LOW': 0}
-        for item in expiry_risks:
-            severity_counts[item['risk_level']] += 1
+        if severity_breakdown is not None:
+            severity_counts.update(severity_breakdown)
+        else:
+            for item in expiry_risks:
+                severity_counts[item['risk_level']] += 1
         
         # Determine overall severity
         if severity_counts['CRITICAL'] > 0:
@@ -166,15 +156,22 @@ class SupplyWatchdogSimple:
         print("=" * 60 + "\n")
         
         try:
-            # Detect risks
-            expiry_risks = self.detect_expiry_risks()
-            shortfall_risks = self.detect_shortfall_risks()
+            # Make sure today's expiry snapshot exists, then detect on the same connection
+            conn = self.get_db_connection()
+            try:
+                refresh_expiry_snapshot_if_stale(conn, self.config)
+                risks = self.detect_risks(conn)
+            finally:
+                conn.close()
+            expiry_risks = risks['expiry_risks']
+            shortfall_risks = risks['shortfall_risks']
             
             # Generate alert
-            alert = self.generate_alert(expiry_risks, shortfall_risks)
+            alert = self.generate_alert(expiry_risks, shortfall_risks, risks['severity_breakdown'])
             
             # Save alert
             self._save_alert(alert)
+            self._announce_alert(alert)
             
             # Print summary
             print("\n" + "=" * 60)
@@ -206,6 +203,23 @@ class SupplyWatchdogSimple:
         alert_path = self._get_alert_path()
         with open(alert_path, 'w') as f:
             json.dump(alert_data, f, indent=2)
+    
+    def _announce_alert(self, alert_data: Dict):
+        """Tell listening API processes a new alert is available (best effort)"""
+        conn = None
+        try:
+            conn = self.get_db_connection()
+            cursor = conn.cursor()
+            notify_monitoring_run(cursor, alert_data.get('alert_id'))
+            conn.commit()
+            cursor.close()
+        except Exception as e:
+            if conn is not None and not conn.closed:
+                conn.rollback()
+            print(f"⚠️  Could not announce monitoring run: {e}")
+        finally:
+            if conn is not None:
+                conn.close()
 
 
 def main():
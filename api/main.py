@@ -3,13 +3,17 @@ FastAPI Backend for Clinical Supply Chain Control Tower
 Beautiful, Production-Ready REST API
 """
 
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, BackgroundTasks
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, BackgroundTasks, Request, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, JSONResponse
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
-from datetime import datetime, date
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from starlette.background import BackgroundTask
+from starlette.websockets import WebSocketState
+from email.utils import format_datetime, parsedate_to_datetime
+from pydantic import BaseModel, Field
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime, date, timezone
 import sys
 from pathlib import Path
 
@@ -17,7 +21,19 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from agents.config import config
-from tools.sql_tools import SQLQueryTool, RiskCalculationTool, AlertGeneratorTool
+from tools.sql_tools import RiskCalculationTool, AlertGeneratorTool, ExpiryBucketAggregator
+from tools.async_sql_tools import AsyncSQLQueryTool
+from tools.db_pool import pool_stats, close_all_pools
+from tools.response_cache import ResponseCache, CachedResponse, content_etag
+from tools.http_compression import choose_encoding, compress
+from tools.expiry_snapshot import SNAPSHOT_TABLE, EXISTS_SQL, STALE_CHECK_SQL, refresh_statements
+from tools.text_search import match_tiers
+from tools.result_stream import STREAM_FORMATS, RowEncoder, encode_json
+from tools.keyset import MAX_PAGE_SIZE, InvalidPageToken, Keyset, explain_rows
+from tools.data_events import (
+    DATA_RELOAD_CHANNEL, MONITORING_CHANNEL, register_reload_hook, fire_reload_hooks, parse_reload_payload
+)
+from tools.live_updates import LiveUpdates
 from agents.supply_watchdog.run_monitoring_simple import SupplyWatchdogSimple
 from agents.scenario_strategist.chat_interface_simple import ScenarioStrategistSimple
 import json
@@ -42,14 +58,36 @@ app.add_middleware(
 )
 
 # Initialize tools and agents
-sql_tool = SQLQueryTool(config.db_connection_string)
+db = AsyncSQLQueryTool(config.db_connection_string, **config.db_pool_settings)
 risk_tool = RiskCalculationTool(config)
 alert_tool = AlertGeneratorTool()
+expiry_aggregator = ExpiryBucketAggregator(config)
+response_cache = ResponseCache(
+    max_entries=config.response_cache_max_entries,
+    ttl_seconds=config.response_cache_ttl_seconds
+)
 
 # Global agent instances
 watchdog_agent = None
 strategist_agent = None
 
+# Sort keys of the paginated listings. The id surrogate key breaks ties; it is
+# kept by delta merges, so tokens stay valid until the table is reloaded. Each
+# ORDER BY matches an index in TABLE_INDEXES expression for expression.
+EXPIRING_KEYSET = Keyset("inventory_expiring", (("expiry_date", "date"), ("id", "bigint")))
+BY_TRIAL_KEYSET = Keyset("inventory_by_trial", (("COALESCE(expiry_date, 'infinity')", "date"), ("id", "bigint")))
+ENROLLMENT_KEYSET = Keyset("enrollment_summary", (
+    ("COALESCE(trial_alias, '')", "text"), ("COALESCE(country_name, '')", "text"), ("id", "bigint")
+))
+HEATMAP_KEYSET = Keyset("risk_heatmap", (("COALESCE(trial_name, '')", "text"), ("COALESCE(location, '')", "text")))
+
+# Tables the dashboard sections read (its cache entry is dropped when one reloads)
+DASHBOARD_TABLES = ["available_inventory_report", "country_level_enrollment_report", "distribution_order_report"]
+
+# Date the expiry snapshot was last confirmed current in this process
+_snapshot_checked_on: Optional[date] = None
+_snapshot_check_lock = asyncio.Lock()
+
 
 # Pydantic models
 class AlertResponse(BaseModel):
@@ -67,6 +105,10 @@ class ChatMessage(BaseModel):
     conversation_id: Optional[str] = None
 
 
+class FeasibilityRequest(BaseModel):
+    lots: List[str] = Field(..., min_length=1, max_length=5000)
+
+
 class ChatResponse(BaseModel):
     response: str
     conversation_id: str
@@ -80,6 +122,124 @@ class InventorySummary(BaseModel):
     critical_shortfalls: int
 
 
+def _invalidate_response_cache(tables: Optional[List[str]]):
+    """Drop cached responses built from reloaded tables"""
+    removed = response_cache.invalidate(tables)
+    print(f"[CACHE] Data reload ({', '.join(tables) if tables else 'all tables'}): {removed} responses invalidated")
+
+
+register_reload_hook(_invalidate_response_cache)
+
+
+@app.on_event("startup")
+async def listen_for_data_reloads():
+    """Invalidate caches and push live updates when loaders or the watchdog announce changes"""
+    try:
+        await db.listen(
+            DATA_RELOAD_CHANNEL,
+            lambda payload: fire_reload_hooks(parse_reload_payload(payload))
+        )
+        await db.listen(MONITORING_CHANNEL, live_updates.trigger)
+    except Exception as e:
+        print(f"⚠️  Could not listen for data reloads ({e}); cached responses expire by TTL only")
+
+
+@app.on_event("shutdown")
+async def shutdown_database_pools():
+    """Close pooled database connections on server shutdown"""
+    await live_updates.close()
+    await db.close()
+    close_all_pools()
+
+
+def _cache_key(request: Request) -> str:
+    """Cache key from path plus normalized query string"""
+    params = sorted(request.query_params.multi_items())
+    return request.url.path + ("?" + "&".join(f"{k}={v}" for k, v in params) if params else "")
+
+
+def _not_modified(request: Request, entry: CachedResponse, etag: str) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since against a cached entry"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return entry.last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    
+    return False
+
+
+def _respond(request: Request, entry: CachedResponse) -> Response:
+    """
+    Serve an entry, or a bodiless 304 when the client copy is current.
+    
+    Bodies of at least RESPONSE_COMPRESS_MIN_BYTES are sent brotli- or
+    gzip-compressed when accepted; each compressed variant is kept on the
+    entry and carries its own ETag.
+    """
+    encoding = None
+    if len(entry.body) >= config.response_compress_min_bytes:
+        encoding = choose_encoding(request.headers.get("accept-encoding"))
+    etag = f'{entry.etag[:-1]}-{encoding}"' if encoding else entry.etag
+    
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(entry.last_modified, usegmt=True),
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if _not_modified(request, entry, etag):
+        return Response(status_code=304, headers=headers)
+    
+    body = entry.body
+    if encoding:
+        if encoding not in entry.encoded:
+            entry.encoded[encoding] = compress(entry.body, encoding)
+        body = entry.encoded[encoding]
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _cached_response(request: Request) -> Optional[Response]:
+    """Serve the request from the response cache if a live entry exists"""
+    entry = response_cache.get(_cache_key(request))
+    return _respond(request, entry) if entry else None
+
+
+def _payload_etag(payload: Any, body: bytes, volatile: Tuple[str, ...]) -> str:
+    """Content ETag of a payload, ignoring volatile top-level fields such as timestamps"""
+    if not volatile:
+        return content_etag(body)
+    return content_etag(encode_json({k: v for k, v in payload.items() if k not in volatile}))
+
+
+def _json_response(request: Request, payload: Any, volatile: Tuple[str, ...] = ()) -> Response:
+    """Serve an uncached payload of plain rows with an ETag (304 when unchanged)"""
+    body = encode_json(payload)
+    entry = CachedResponse(
+        body=body,
+        etag=_payload_etag(payload, body, volatile),
+        last_modified=datetime.now(timezone.utc).replace(microsecond=0),
+        expires_at=0.0
+    )
+    return _respond(request, entry)
+
+
+def _store_response(request: Request, tables: List[str], payload: Any, volatile: Tuple[str, ...] = ()) -> Response:
+    """Serialize, cache (tagged by source tables) and serve a payload"""
+    body = encode_json(payload)
+    entry = response_cache.set(
+        _cache_key(request), body, tags=tables, etag=_payload_etag(payload, body, volatile)
+    )
+    return _respond(request, entry)
+
+
 # API Routes
 
 @app.get("/")
@@ -104,7 +264,7 @@ async def health_check():
     """Health check endpoint"""
     try:
         # Test database connection
-        result = sql_tool.execute_query("SELECT 1 as health;")
+        result = await db.execute_query("SELECT 1 as health;")
         db_status = "healthy" if result else "unhealthy"
     except Exception as e:
         db_status = f"unhealthy: {str(e)}"
@@ -113,6 +273,8 @@ async def health_check():
         "status": "operational",
         "timestamp": datetime.utcnow().isoformat(),
         "database": db_status,
+        "database_pool": db.stats(),
+        "live_updates": live_updates.stats(),
         "agents": {
             "supply_watchdog": "ready",
             "scenario_strategist": "ready"
@@ -120,76 +282,238 @@ async def health_check():
     }
 
 
+async def _run_dashboard_section(query: str, parameters: Optional[Dict[str, Any]], single_row: bool) -> Any:
+    """Run one dashboard sub-query under the per-section timeout"""
+    rows = await asyncio.wait_for(
+        db.execute_query(query, parameters),
+        timeout=config.dashboard_query_timeout_seconds
+    )
+    if single_row:
+        return rows[0] if rows else {}
+    return rows
+
+
+async def _dashboard_sections() -> Dict[str, Any]:
+    """
+    Query the dashboard sections concurrently.
+    
+    A section that fails or exceeds DASHBOARD_QUERY_TIMEOUT_SECONDS comes
+    back empty and is listed under "errors"; if every section fails this
+    raises a 503 instead.
+    """
+    # Inventory totals and risk buckets come from one scan of the inventory table
+    expiry_query, expiry_params = expiry_aggregator.build_query()
+    
+    # Get enrollment summary
+    enrollment_query = """
+    SELECT 
+        COUNT(DISTINCT trial_alias) as active_trials,
+        COUNT(DISTINCT country_name) as countries,
+        SUM(total_enrolled_actual) as total_patients
+    FROM country_level_enrollment_report;
+    """
+    
+    # Get recent orders
+    orders_query = """
+    SELECT 
+        trial_alias,
+        order_number,
+        status,
+        order_date,
+        requested_delivery_date,
+        actual_delivery_date
+    FROM distribution_order_report
+    WHERE deleted_at IS NULL
+    ORDER BY order_date DESC
+    LIMIT 10;
+    """
+    
+    # section name -> (query, parameters, returns a single summary row)
+    sections = {
+        "expiry": (expiry_query, expiry_params, True),
+        "enrollment": (enrollment_query, None, True),
+        "recent_orders": (orders_query, None, False),
+    }
+    
+    results = await asyncio.gather(
+        *(_run_dashboard_section(*section) for section in sections.values()),
+        return_exceptions=True
+    )
+    
+    payload: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    for (name, (_, _, single_row)), result in zip(sections.items(), results):
+        if isinstance(result, BaseException):
+            if isinstance(result, asyncio.TimeoutError):
+                errors[name] = f"timed out after {config.dashboard_query_timeout_seconds}s"
+            else:
+                errors[name] = str(result)
+            print(f"[DASHBOARD] Section '{name}' failed: {errors[name]}")
+            payload[name] = {} if single_row else []
+        else:
+            payload[name] = result
+    
+    if len(errors) == len(sections):
+        raise HTTPException(status_code=503, detail=errors)
+    
+    # Split the shared expiry aggregation into the inventory and risk sections
+    expiry = payload.pop("expiry")
+    if "expiry" in errors:
+        errors["inventory"] = errors["risks"] = errors.pop("expiry")
+    payload["inventory"] = {
+        "total_batches": expiry.get("distinct_lots"),
+        "total_trials": expiry.get("distinct_trials"),
+        "total_packages": expiry.get("total_packages"),
+        "expiring_soon": expiry.get("expiring_soon"),
+    } if expiry else {}
+    payload["risks"] = {
+        "critical_expiry": expiry.get("critical_count"),
+        "high_expiry": expiry.get("high_count"),
+        "medium_expiry": expiry.get("medium_count"),
+    } if expiry else {}
+    
+    payload["partial"] = bool(errors)
+    payload["errors"] = errors
+    return payload
+
+
 @app.get("/api/dashboard")
-async def get_dashboard_data():
-    """Get main dashboard summary data"""
-    try:
-        # Get inventory summary
-        inventory_query = """
-        SELECT 
-            COUNT(DISTINCT lot) as total_batches,
-            COUNT(DISTINCT trial_name) as total_trials,
-            SUM(received_packages) as total_packages,
-            COUNT(*) FILTER (WHERE expiry_date < CURRENT_DATE + INTERVAL '90 days') as expiring_soon
-        FROM available_inventory_report;
-        """
-        inventory_data = sql_tool.execute_query(inventory_query)[0]
-        
-        # Get enrollment summary
-        enrollment_query = """
-        SELECT 
-            COUNT(DISTINCT trial_alias) as active_trials,
-            COUNT(DISTINCT country_name) as countries,
-            SUM(total_enrolled_actual) as total_patients
-        FROM country_level_enrollment_report;
-        """
-        enrollment_data = sql_tool.execute_query(enrollment_query)[0]
-        
-        # Get risk summary
-        risk_query = """
-        SELECT 
-            COUNT(*) FILTER (WHERE expiry_date < CURRENT_DATE + INTERVAL '30 days') as critical_expiry,
-            COUNT(*) FILTER (WHERE expiry_date BETWEEN CURRENT_DATE + INTERVAL '30 days' 
-                AND CURRENT_DATE + INTERVAL '60 days') as high_expiry,
-            COUNT(*) FILTER (WHERE expiry_date BETWEEN CURRENT_DATE + INTERVAL '60 days' 
-                AND CURRENT_DATE + INTERVAL '90 days') as medium_expiry
-        FROM available_inventory_report
-        WHERE expiry_date > CURRENT_DATE;
-        """
-        risk_data = sql_tool.execute_query(risk_query)[0]
-        
-        # Get recent orders
-        orders_query = """
-        SELECT 
-            trial_alias,
-            order_number,
-            status,
-            order_date,
-            requested_delivery_date,
-            actual_delivery_date
-        FROM distribution_order_report
-        ORDER BY order_date DESC
-        LIMIT 10;
-        """
-        recent_orders = sql_tool.execute_query(orders_query)
-        
-        return {
-            "inventory": inventory_data,
-            "enrollment": enrollment_data,
-            "risks": risk_data,
-            "recent_orders": recent_orders,
-            "last_updated": datetime.utcnow().isoformat()
-        }
+async def get_dashboard_data(request: Request):
+    """
+    Get main dashboard summary data.
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    Sections that fail come back empty and are listed under "errors" instead
+    of failing the whole payload. Complete payloads are cached, so an
+    unchanged poll is answered with a 304 without querying.
+    """
+    cached = _cached_response(request)
+    if cached:
+        return cached
+    
+    payload = await _dashboard_sections()
+    payload["last_updated"] = datetime.utcnow().isoformat()
+    if payload["errors"]:
+        return _json_response(request, payload, volatile=("last_updated",))
+    return _store_response(request, DASHBOARD_TABLES, payload, volatile=("last_updated",))
+
+
+async def _ensure_expiry_snapshot_current():
+    """Rebuild the expiry snapshot once per day if no loader or watchdog has"""
+    global _snapshot_checked_on
+    today = date.today()
+    if _snapshot_checked_on == today:
+        return
+    
+    async with _snapshot_check_lock:
+        if _snapshot_checked_on == today:
+            return
+        present = (await db.execute_query(EXISTS_SQL))[0]["present"]
+        stale = not present or (await db.execute_query(STALE_CHECK_SQL))[0]["stale"]
+        if stale:
+            status = await db.execute_transaction(refresh_statements(config))
+            print(f"[SNAPSHOT] Refreshed {SNAPSHOT_TABLE}: {status}")
+        _snapshot_checked_on = today
+
+
+def _check_format(format: str):
+    """Reject unknown ?format= values"""
+    if format != "json" and format not in STREAM_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown format '{format}'; use json, {', '.join(STREAM_FORMATS)}"
+        )
+
+
+async def _stream_rows(query: str, params: Optional[Dict[str, Any]], format: str, filename: str):
+    """
+    Stream a query as NDJSON or CSV through a server-side cursor.
+    
+    Memory stays at one batch regardless of result size. The first batch is
+    fetched before the response starts so query errors still become a 500.
+    """
+    encoder = RowEncoder(format)
+    batches = db.stream_query(query, params)
+    first = await anext(batches, [])
+    
+    async def body():
+        try:
+            yield encoder.encode(first)
+            async for rows in batches:
+                yield encoder.encode(rows)
+        finally:
+            await batches.aclose()
+    
+    # A client disconnect cancels the send and leaves body() suspended without running its
+    # finally; the background task, which Starlette still runs, returns the connection then
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.csv"'} if format == "csv" else None
+    return StreamingResponse(
+        body(), media_type=encoder.media_type, headers=headers, background=BackgroundTask(batches.aclose)
+    )
+
+
+async def _estimated_total(query: str, params: Optional[Dict[str, Any]]) -> Optional[int]:
+    """Planner row estimate for a query (EXPLAIN only, the query is not run)"""
+    plan = await db.execute_query(f"EXPLAIN (FORMAT JSON) {query}", params)
+    return explain_rows(plan[0]["QUERY PLAN"]) if plan else None
+
+
+async def _fetch_page(
+    keyset: Keyset,
+    query: str,
+    params: Optional[Dict[str, Any]],
+    limit: Optional[int],
+    after: Optional[str],
+    estimate: bool,
+    tag: Optional[str] = None,
+    **fields: str
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Run one page of a keyset-paginated query.
+    
+    Without limit/after the whole result comes back as before. estimate=true
+    adds the planner's row estimate for the unpaged query (no COUNT(*) scan).
+    tag is carried in the next page's token (see Keyset.encode()).
+    
+    Returns:
+        Tuple of (rows, paging fields to merge into the response)
+    """
+    sql, key_params = keyset.render(query, after, limit, **fields)
+    rows = await db.execute_query(sql, {**(params or {}), **key_params})
+    rows, next_token = keyset.split_page(rows, limit, tag)
+    
+    page: Dict[str, Any] = {"next": next_token} if limit or after else {}
+    if estimate:
+        unpaged, _ = keyset.render(query, **fields)
+        page["estimated_total"] = await _estimated_total(unpaged, params)
+    return rows, page
+
+
+def _export_query(keyset: Keyset, query: str) -> str:
+    """A keyset query rendered unpaged and without key columns, for streaming"""
+    return query.format(keyset_columns="", keyset_filter="", order_by=keyset.order_by, limit="")
 
 
 @app.get("/api/inventory/expiring")
-async def get_expiring_inventory(days: int = 90):
-    """Get inventory expiring within specified days"""
+async def get_expiring_inventory(
+    request: Request,
+    days: int = 90,
+    format: str = "json",
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    estimate: bool = False
+):
+    """
+    Get inventory expiring within specified days (from the expiry-risk snapshot).
+    
+    limit pages the result in expiry order; pass the returned next token as
+    after for the following page. format=ndjson or format=csv streams every
+    row instead of building one JSON document.
+    """
+    _check_format(format)
     try:
-        query = f"""
+        await _ensure_expiry_snapshot_current()
+        
+        query = """
         SELECT 
             trial_name,
             location,
@@ -197,32 +521,43 @@ async def get_expiring_inventory(days: int = 90):
             package_type_description,
             expiry_date,
             received_packages,
-            EXTRACT(DAY FROM (expiry_date - CURRENT_DATE)) as days_until_expiry,
-            CASE 
-                WHEN EXTRACT(DAY FROM (expiry_date - CURRENT_DATE)) <= 30 THEN 'CRITICAL'
-                WHEN EXTRACT(DAY FROM (expiry_date - CURRENT_DATE)) <= 60 THEN 'HIGH'
-                WHEN EXTRACT(DAY FROM (expiry_date - CURRENT_DATE)) <= 90 THEN 'MEDIUM'
-                ELSE 'LOW'
-            END as risk_level
-        FROM available_inventory_report
-        WHERE expiry_date BETWEEN CURRENT_DATE AND CURRENT_DATE + INTERVAL '{days} days'
-            AND expiry_date > CURRENT_DATE
-        ORDER BY expiry_date ASC;
+            days_until_expiry,
+            risk_level{keyset_columns}
+        FROM inventory_expiry_snapshot
+        WHERE days_until_expiry > 0
+            AND days_until_expiry <= %(days)s
+            {keyset_filter}
+        ORDER BY {order_by}
+        {limit};
         """
         
-        results = sql_tool.execute_query(query)
-        return {
+        if format != "json":
+            return await _stream_rows(
+                _export_query(EXPIRING_KEYSET, query), {"days": days}, format, f"expiring_inventory_{days}d"
+            )
+        
+        results, page = await _fetch_page(EXPIRING_KEYSET, query, {"days": days}, limit, after, estimate)
+        return _json_response(request, {
             "count": len(results),
-            "items": results
-        }
+            "items": results,
+            **page
+        })
     
+    except InvalidPageToken as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/inventory/by-trial/{trial_alias}")
-async def get_inventory_by_trial(trial_alias: str):
-    """Get inventory for a specific trial"""
+async def get_inventory_by_trial(
+    request: Request,
+    trial_alias: str,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    estimate: bool = False
+):
+    """Get inventory for a specific trial (paged in expiry order with limit/after)"""
     try:
         query = """
         SELECT 
@@ -236,26 +571,66 @@ async def get_inventory_by_trial(trial_alias: str):
             packages_pending_shipment,
             shipped_packages,
             min_qty,
-            max_qty
+            max_qty{keyset_columns}
         FROM available_inventory_report
-        WHERE trial_name ILIKE %(pattern)s
-        ORDER BY expiry_date ASC;
+        WHERE {match} AND deleted_at IS NULL
+            {keyset_filter}
+        ORDER BY {order_by}
+        {limit};
         """
         
-        results = sql_tool.execute_query(query, {"pattern": f"%{trial_alias}%"})
-        return {
+        # Exact trial key, then prefix, then substring; stop at the first tier with rows.
+        # Later pages continue in the tier their token names.
+        tiers = match_tiers("trial_key", "trial_name", trial_alias)
+        if after:
+            token_tier = BY_TRIAL_KEYSET.tag(after)
+            tiers = [entry for entry in tiers if entry[0] == token_tier]
+            if not tiers:
+                raise InvalidPageToken("Page token does not name a match tier")
+        for tier, predicate, params in tiers:
+            results, page = await _fetch_page(
+                BY_TRIAL_KEYSET, query, params, limit, after, False, tag=tier, match=predicate
+            )
+            if results:
+                break
+        if estimate:
+            # Only for the tier that answered, not every tier tried
+            unpaged, _ = BY_TRIAL_KEYSET.render(query, match=predicate)
+            page["estimated_total"] = await _estimated_total(unpaged, params)
+        return _json_response(request, {
             "trial": trial_alias,
+            "match": tier if results else None,
             "count": len(results),
-            "inventory": results
-        }
+            "inventory": results,
+            **page
+        })
     
+    except InvalidPageToken as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/enrollment/summary")
-async def get_enrollment_summary():
-    """Get enrollment summary by trial and country"""
+async def get_enrollment_summary(
+    request: Request,
+    format: str = "json",
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    estimate: bool = False
+):
+    """
+    Get enrollment summary by trial and country.
+    
+    limit/after page the summary in trial, country order. format=ndjson or
+    format=csv streams every row (never cached).
+    """
+    _check_format(format)
+    if format == "json":
+        cached = _cached_response(request)
+        if cached:
+            return cached
+    
     try:
         query = """
         SELECT 
@@ -270,17 +645,25 @@ async def get_enrollment_summary():
                 WHEN total_enrolled_actual > total_enrolled_planned * 1.1 THEN 'ACCELERATED'
                 WHEN total_enrolled_actual < total_enrolled_planned * 0.9 THEN 'SLOWER'
                 ELSE 'ON_TRACK'
-            END as enrollment_status
+            END as enrollment_status{keyset_columns}
         FROM country_level_enrollment_report
-        ORDER BY trial_alias, country_name;
+        WHERE TRUE {keyset_filter}
+        ORDER BY {order_by}
+        {limit};
         """
         
-        results = sql_tool.execute_query(query)
-        return {
+        if format != "json":
+            return await _stream_rows(_export_query(ENROLLMENT_KEYSET, query), None, format, "enrollment_summary")
+        
+        results, page = await _fetch_page(ENROLLMENT_KEYSET, query, None, limit, after, estimate)
+        return _store_response(request, ["country_level_enrollment_report"], {
             "count": len(results),
-            "enrollments": results
-        }
+            "enrollments": results,
+            **page
+        })
     
+    except InvalidPageToken as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -293,8 +676,9 @@ async def run_monitoring(background_tasks: BackgroundTasks):
         if not watchdog_agent:
             watchdog_agent = SupplyWatchdogSimple()
         
-        # Run in background
+        # Run in background; connected dashboards get the new alert pushed
         background_tasks.add_task(watchdog_agent.run_monitoring)
+        background_tasks.add_task(live_updates.trigger)
         
         return {
             "status": "started",
@@ -306,23 +690,24 @@ async def run_monitoring(background_tasks: BackgroundTasks):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _read_alerts(limit: int) -> List[Dict[str, Any]]:
+    """Newest saved watchdog alerts first"""
+    alerts_dir = Path(__file__).parent.parent / "agents" / "supply_watchdog" / "alerts"
+    if not alerts_dir.exists():
+        return []
+    
+    alerts = []
+    for file_path in sorted(alerts_dir.glob("alert_*.json"), reverse=True)[:limit]:
+        with open(file_path, 'r') as f:
+            alerts.append(json.load(f))
+    return alerts
+
+
 @app.get("/api/alerts/latest")
 async def get_latest_alerts(limit: int = 10):
     """Get latest monitoring alerts"""
     try:
-        alerts_dir = Path(__file__).parent.parent / "agents" / "supply_watchdog" / "alerts"
-        
-        if not alerts_dir.exists():
-            return {"alerts": [], "count": 0}
-        
-        alert_files = sorted(alerts_dir.glob("alert_*.json"), reverse=True)[:limit]
-        
-        alerts = []
-        for file_path in alert_files:
-            with open(file_path, 'r') as f:
-                alert_data = json.load(f)
-                alerts.append(alert_data)
-        
+        alerts = _read_alerts(limit)
         return {
             "count": len(alerts),
             "alerts": alerts
@@ -332,15 +717,20 @@ async def get_latest_alerts(limit: int = 10):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _strategist() -> ScenarioStrategistSimple:
+    """Shared Scenario Strategist, created on first use"""
+    global strategist_agent
+    if not strategist_agent:
+        strategist_agent = ScenarioStrategistSimple()
+    return strategist_agent
+
+
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat_with_strategist(message: ChatMessage):
     """Chat with Scenario Strategist Agent"""
     try:
-        global strategist_agent
-        if not strategist_agent:
-            strategist_agent = ScenarioStrategistSimple()
-        
-        response = strategist_agent.ask(message.message)
+        # The strategist uses the blocking pooled driver; keep it off the event loop
+        response = await run_in_threadpool(_strategist().ask, message.message)
         
         return ChatResponse(
             response=response,
@@ -352,29 +742,64 @@ async def chat_with_strategist(message: ChatMessage):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/strategist/extension-feasibility")
+async def bulk_extension_feasibility(request: FeasibilityRequest):
+    """
+    Extension feasibility for many lots with one set-based query.
+    
+    Streams one JSON object per lot (NDJSON), in request order, as rows
+    arrive from the server-side cursor.
+    """
+    try:
+        results = _strategist().check_extension_feasibility_bulk(request.lots)
+        # Run the query before responding so database errors still map to a 500
+        first = await run_in_threadpool(next, results, None)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    def ndjson():
+        if first is not None:
+            yield encode_json(first) + b"\n"
+        for result in results:
+            yield encode_json(result) + b"\n"
+    
+    # Starlette runs the background task even after a client disconnect; closing the
+    # generator releases its server-side cursor, transaction and pooled connection
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson", background=BackgroundTask(results.close))
+
+
 @app.get("/api/trials")
-async def get_trials():
+async def get_trials(request: Request):
     """Get list of all trials"""
+    cached = _cached_response(request)
+    if cached:
+        return cached
+    
     try:
         query = """
         SELECT DISTINCT trial_alias as trial_id, trial_name
         FROM available_inventory_report
+        WHERE deleted_at IS NULL
         ORDER BY trial_name;
         """
         
-        results = sql_tool.execute_query(query)
-        return {
+        results = await db.execute_query(query)
+        return _store_response(request, ["available_inventory_report"], {
             "count": len(results),
             "trials": results
-        }
+        })
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/countries")
-async def get_countries():
+async def get_countries(request: Request):
     """Get list of all countries"""
+    cached = _cached_response(request)
+    if cached:
+        return cached
+    
     try:
         query = """
         SELECT DISTINCT country_name, COUNT(*) as trial_count
@@ -383,66 +808,172 @@ async def get_countries():
         ORDER BY country_name;
         """
         
-        results = sql_tool.execute_query(query)
-        return {
+        results = await db.execute_query(query)
+        return _store_response(request, ["country_level_enrollment_report"], {
             "count": len(results),
             "countries": results
-        }
+        })
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/analytics/risk-heatmap")
-async def get_risk_heatmap():
-    """Get risk heatmap data by trial and country"""
+async def get_risk_heatmap(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    estimate: bool = False
+):
+    """
+    Get risk heatmap data by trial and country.
+    
+    Unpaged, cells come most critical first; with limit/after they are paged
+    in trial, country order (a keyset needs a unique, stable sort key).
+    """
+    cached = _cached_response(request)
+    if cached:
+        return cached
+    
     try:
-        query = """
-        SELECT 
-            air.trial_name,
-            air.location as country,
-            COUNT(*) as total_batches,
-            COUNT(*) FILTER (WHERE air.expiry_date < CURRENT_DATE + INTERVAL '30 days') as critical_count,
-            COUNT(*) FILTER (WHERE air.expiry_date BETWEEN CURRENT_DATE + INTERVAL '30 days' 
-                AND CURRENT_DATE + INTERVAL '60 days') as high_count,
-            COUNT(*) FILTER (WHERE air.expiry_date BETWEEN CURRENT_DATE + INTERVAL '60 days' 
-                AND CURRENT_DATE + INTERVAL '90 days') as medium_count
-        FROM available_inventory_report air
-        WHERE air.expiry_date > CURRENT_DATE
-        GROUP BY air.trial_name, air.location
-        ORDER BY critical_count DESC, high_count DESC;
-        """
+        if limit or after:
+            cells, params = expiry_aggregator.build_query(
+                group_by=["trial_name", "location"],
+                where="live_count > 0"
+            )
+            query = """
+            SELECT *{keyset_columns} FROM ({cells}) heatmap
+            WHERE TRUE {keyset_filter}
+            ORDER BY {order_by}
+            {limit};
+            """
+            results, page = await _fetch_page(
+                HEATMAP_KEYSET, query, params, limit, after, estimate, cells=cells.strip().rstrip(";")
+            )
+        else:
+            query, params = expiry_aggregator.build_query(
+                group_by=["trial_name", "location"],
+                where="live_count > 0",
+                order_by="critical_count DESC, high_count DESC"
+            )
+            results = await db.execute_query(query, params)
+            page = {"estimated_total": await _estimated_total(query, params)} if estimate else {}
         
-        results = sql_tool.execute_query(query)
-        return {
-            "heatmap_data": results
-        }
+        return _store_response(request, ["available_inventory_report"], {
+            "heatmap_data": [
+                {
+                    "trial_name": row["trial_name"],
+                    "country": row["location"],
+                    "total_batches": row["live_count"],
+                    "critical_count": row["critical_count"],
+                    "high_count": row["high_count"],
+                    "medium_count": row["medium_count"],
+                }
+                for row in results
+            ],
+            **page
+        })
     
+    except InvalidPageToken as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/cache/invalidate")
+async def invalidate_cache():
+    """Drop all cached API responses"""
+    removed = response_cache.invalidate()
+    return {
+        "invalidated": removed,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@app.get("/api/health/pool")
+async def get_pool_stats():
+    """Connection pool statistics for sizing under load"""
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "async_pool": db.stats(),
+        "pools": pool_stats(),
+        "response_cache": response_cache.stats()
+    }
+
+
 # WebSocket for real-time updates
+async def _live_state() -> Dict[str, Any]:
+    """State pushed over /ws/monitoring: dashboard sections plus the latest alert"""
+    try:
+        state = await _dashboard_sections()
+    except HTTPException as e:
+        state = {"partial": True, "errors": e.detail}
+    alerts = await run_in_threadpool(_read_alerts, 1)
+    state["latest_alert"] = alerts[0] if alerts else None
+    return state
+
+
+# One producer shared by every /ws/monitoring connection
+live_updates = LiveUpdates(
+    _live_state,
+    queue_size=config.live_update_queue_size,
+    refresh_seconds=config.live_update_refresh_seconds,
+    debounce_seconds=config.live_update_debounce_seconds
+)
+
+register_reload_hook(live_updates.trigger)
+
+
 @app.websocket("/ws/monitoring")
 async def websocket_monitoring(websocket: WebSocket):
-    """WebSocket endpoint for real-time monitoring updates"""
+    """
+    WebSocket endpoint for real-time monitoring updates.
+    
+    Sends a {"type": "snapshot"} of the dashboard sections and latest alert,
+    then {"type": "diff"} messages with only the sections that changed. A
+    client that falls behind receives a fresh snapshot instead of the
+    backlog; apply diffs only on top of the preceding version.
+    """
     await websocket.accept()
-    try:
+    queue = None
+    failed = False
+    
+    async def send_updates():
         while True:
-            # Send periodic updates every 30 seconds
-            await asyncio.sleep(30)
-            
-            # Get quick summary
-            summary = {
-                "timestamp": datetime.utcnow().isoformat(),
-                "status": "monitoring",
-                "message": "System operational"
-            }
-            
-            await websocket.send_json(summary)
+            message = await queue.get()
+            await websocket.send_text(encode_json(message).decode("utf-8"))
+    
+    async def read_until_disconnect():
+        # Incoming messages are ignored; reading notices a closed socket between updates
+        while True:
+            await websocket.receive_text()
+    
+    try:
+        queue = await live_updates.subscribe()
+        done, pending = await asyncio.wait(
+            {asyncio.create_task(send_updates()), asyncio.create_task(read_until_disconnect())},
+            return_when=asyncio.FIRST_COMPLETED
+        )
+        for task in pending:
+            task.cancel()
+        for task in done:
+            task.result()
     
     except WebSocketDisconnect:
         print("Client disconnected from WebSocket")
+    except Exception as e:
+        print(f"[LIVE] WebSocket closed after error: {e}")
+        failed = True
+    finally:
+        if queue is not None:
+            live_updates.unsubscribe(queue)
+    
+    # A failed send usually means the client already went away; only close a live socket
+    if failed and websocket.client_state == WebSocketState.CONNECTED:
+        try:
+            await websocket.close(code=1011)
+        except Exception:
+            pass
 
 
 if __name__ == "__main__":
@@ -0,0 +1,271 @@
+"""
+COPY-based bulk ingest for the data loaders
+
+Streams pandas DataFrames into PostgreSQL with COPY FROM STDIN (CSV format)
+instead of row-wise INSERTs, and reports per-table throughput.
+
+copy_chunks() takes an iterator of DataFrames (e.g. pd.read_csv(chunksize=N))
+and flushes each one before pulling the next, so peak memory is bounded by the
+chunk size rather than the file size.
+"""
+
+import io
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+# Rows rendered to CSV per slice while streaming into COPY
+COPY_SLICE_ROWS = 10000
+
+# Column types ordered from narrowest to widest; anything else widens to TEXT
+_TYPE_WIDTH = {"BOOLEAN": 0, "BIGINT": 1, "DOUBLE PRECISION": 2, "TEXT": 3}
+
+
+@dataclass
+class CopyStats:
+    """Outcome of one bulk COPY"""
+
+    table_name: str
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float(self.rows)
+
+    def __str__(self) -> str:
+        return (f"{self.rows} rows into {self.table_name} in {self.seconds:.2f}s "
+                f"({self.rows_per_second:,.0f} rows/s via COPY)")
+
+
+def coerce_for_copy(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normalize dtypes so COPY receives clean literals.
+
+    Float columns that only hold whole numbers (integers read with NaNs) become
+    nullable Int64 so they are written as "12" rather than "12.0".
+    """
+    df = df.copy(deep=False)
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_float_dtype(series):
+            values = series.dropna()
+            if len(values) and np.all(np.mod(values, 1) == 0):
+                df[column] = series.astype("Int64")
+    return df
+
+
+def postgres_type(series: pd.Series) -> str:
+    """Map a pandas dtype to the column type pandas.to_sql would create"""
+    if pd.api.types.is_bool_dtype(series):
+        return "BOOLEAN"
+    if pd.api.types.is_integer_dtype(series):
+        return "BIGINT"
+    if pd.api.types.is_float_dtype(series):
+        return "DOUBLE PRECISION"
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "TIMESTAMP"
+    return "TEXT"
+
+
+def widen_type(current: Optional[str], incoming: Optional[str]) -> Optional[str]:
+    """
+    Narrowest column type that holds values of both types.
+
+    None stands for a column that has only held NULLs so far.
+    """
+    if current is None:
+        return incoming
+    if incoming is None or incoming == current:
+        return current
+    if current in _TYPE_WIDTH and incoming in _TYPE_WIDTH:
+        return max(current, incoming, key=_TYPE_WIDTH.get)
+    return "TEXT"
+
+
+def create_table_sql(df: pd.DataFrame, table_name: str) -> str:
+    """
+    CREATE TABLE statement matching a DataFrame's columns.
+
+    A BIGSERIAL id is added unless the extract has one: it fills from its
+    default during COPY, survives delta merges (which UPDATE in place) and is
+    the tiebreaker the API's keyset pagination sorts on.
+    """
+    columns = [f'"{column}" {postgres_type(df[column])}' for column in df.columns]
+    if "id" not in df.columns:
+        columns.insert(0, '"id" BIGSERIAL')
+    return f'CREATE TABLE "{table_name}" (\n    ' + ",\n    ".join(columns) + "\n);"
+
+
+class _ChunkSchema:
+    """
+    Column types of a table created from the first chunk of a stream.
+
+    Later chunks may infer different dtypes for the same column (an integer
+    column that turns out to hold decimals, a column that was all NULL in the
+    first chunk); the table is widened in place with ALTER COLUMN ... TYPE,
+    which is cheap inside the loading transaction.
+    """
+
+    def __init__(self, df: pd.DataFrame, table_name: str):
+        self.table_name = table_name
+        self.declared = {column: postgres_type(df[column]) for column in df.columns}
+        self.observed = self._observed_types(df)
+
+    @staticmethod
+    def _observed_types(df: pd.DataFrame) -> Dict[str, Optional[str]]:
+        return {
+            column: None if df[column].isna().all() else postgres_type(df[column])
+            for column in df.columns
+        }
+
+    def widen_statements(self, df: pd.DataFrame) -> List[str]:
+        """ALTER statements needed before the chunk can be copied"""
+        statements = []
+        for column, incoming in self._observed_types(df).items():
+            if column not in self.declared:
+                raise ValueError(f"Chunk column '{column}' is not in table {self.table_name}")
+            current = self.observed[column]
+            target = widen_type(current, incoming)
+            self.observed[column] = target
+            if target is None or target == self.declared[column]:
+                continue
+            
+            if current is None:
+                # Only NULLs so far, nothing to convert
+                using = f"NULL::{target}"
+            elif current == "BOOLEAN":
+                using = f'"{column}"::int::{target}'
+            else:
+                using = f'"{column}"::{target}'
+            statements.append(
+                f'ALTER TABLE "{self.table_name}" ALTER COLUMN "{column}" TYPE {target} USING {using};'
+            )
+            self.declared[column] = target
+        return statements
+
+
+class _CSVStream(io.RawIOBase):
+    """File-like object rendering a DataFrame to CSV slice by slice"""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        size = min(len(target), len(self._buffer))
+        target[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def _csv_chunks(df: pd.DataFrame, slice_rows: int) -> Iterator[bytes]:
+    for start in range(0, len(df), slice_rows):
+        text = df.iloc[start:start + slice_rows].to_csv(index=False, header=False, na_rep="")
+        yield text.encode("utf-8")
+
+
+def _copy_frame(cursor, df: pd.DataFrame, table_name: str, columns: List[str]):
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    stream = io.BufferedReader(_CSVStream(_csv_chunks(df[columns], COPY_SLICE_ROWS)))
+    cursor.copy_expert(
+        f'COPY "{table_name}" ({column_list}) FROM STDIN WITH (FORMAT csv, NULL \'\')',
+        stream
+    )
+
+
+def copy_chunks(
+    conn,
+    chunks: Iterable[pd.DataFrame],
+    table_name: str,
+    replace: bool = True,
+    columns: Optional[List[str]] = None,
+    commit: bool = True
+) -> CopyStats:
+    """
+    Bulk load a stream of DataFrames with COPY FROM STDIN inside one transaction.
+
+    Each chunk is copied before the next is pulled from the iterator, so only
+    one chunk is held in memory at a time. Readers keep seeing the previous
+    table contents until the final commit.
+
+    Args:
+        conn: psycopg2 (or SQLAlchemy raw) connection; rolled back on error
+        chunks: DataFrames sharing the same columns
+        table_name: Target table
+        replace: Drop and recreate the table from the first chunk's dtypes
+            (widening column types for later chunks as needed); otherwise append
+        columns: Target columns (defaults to each chunk's columns)
+        commit: Commit when done; pass False to keep the transaction open
+            for follow-up statements (the caller then commits)
+
+    Returns:
+        CopyStats with row count and throughput
+    """
+    start_time = time.time()
+    rows = 0
+    schema: Optional[_ChunkSchema] = None
+    
+    cursor = conn.cursor()
+    try:
+        for chunk in chunks:
+            chunk = coerce_for_copy(chunk)
+            chunk_columns = columns or list(chunk.columns)
+            
+            if replace:
+                if schema is None:
+                    cursor.execute(f'DROP TABLE IF EXISTS "{table_name}";')
+                    cursor.execute(create_table_sql(chunk[chunk_columns], table_name))
+                    schema = _ChunkSchema(chunk[chunk_columns], table_name)
+                else:
+                    for statement in schema.widen_statements(chunk[chunk_columns]):
+                        cursor.execute(statement)
+            
+            if len(chunk):
+                _copy_frame(cursor, chunk, table_name, chunk_columns)
+                rows += len(chunk)
+        if commit:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    
+    return CopyStats(table_name, rows, time.time() - start_time)
+
+
+def copy_dataframe(
+    conn,
+    df: pd.DataFrame,
+    table_name: str,
+    replace: bool = True,
+    columns: Optional[List[str]] = None
+) -> CopyStats:
+    """
+    Bulk load a DataFrame with COPY FROM STDIN inside one transaction.
+
+    Args:
+        conn: psycopg2 (or SQLAlchemy raw) connection; committed on success
+        df: Data to load
+        table_name: Target table
+        replace: Drop and recreate the table from the DataFrame's dtypes
+            (the old to_sql if_exists='replace' behaviour); otherwise append
+        columns: Target columns (defaults to the DataFrame's columns)
+
+    Returns:
+        CopyStats with row count and throughput
+    """
+    return copy_chunks(conn, [df], table_name, replace=replace, columns=columns)
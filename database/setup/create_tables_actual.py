@@ -2,11 +2,20 @@
 Updated Database Schema based on Actual CSV Data
 """
 
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
 import psycopg2
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 import os
+import re
+from typing import List, Tuple
 from dotenv import load_dotenv
 
+from tools.expiry_snapshot import SNAPSHOT_TABLE, SNAPSHOT_DDL
+from tools.text_search import SEARCH_KEYS, search_key_columns_sql
+
 load_dotenv()
 
 DB_HOST = os.getenv("DB_HOST", "localhost")
@@ -15,6 +24,116 @@ DB_USER = os.getenv("DB_USER", "postgres")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "")
 DB_NAME = os.getenv("DB_NAME", "clinical_supply_chain")
 
+# Secondary indexes per table, also rebuilt by the loaders after a bulk load.
+# Column lists may start with "USING <method>"; the default is a B-tree.
+# *_key columns (tools/text_search.py) serve exact/prefix lookups, the
+# trigram indexes serve the ILIKE '%term%' fallback.
+TABLE_INDEXES = {
+    "allocated_materials_to_orders": [
+        ("idx_alloc_order_id", "order_id"),
+        ("idx_alloc_trial", "trial_alias"),
+        ("idx_alloc_batch", "material_component_batch"),
+    ],
+    "available_inventory_report": [
+        ("idx_inv_trial", "trial_name"),
+        ("idx_inv_lot", "lot"),
+        ("idx_inv_expiry", "expiry_date"),
+        ("idx_inv_location", "location"),
+        ("idx_inv_lot_location", "lot, location"),
+        # Also serves /api/inventory/by-trial pages (its keyset is expiry, id)
+        ("idx_inv_trial_key_expiry", "trial_key text_pattern_ops, COALESCE(expiry_date, 'infinity'), id"),
+        ("idx_inv_lot_key", "lot_key text_pattern_ops"),
+        ("idx_inv_trial_trgm", "USING gin (trial_name gin_trgm_ops)"),
+        ("idx_inv_lot_trgm", "USING gin (lot gin_trgm_ops)"),
+    ],
+    "enrollment_rate_report": [
+        ("idx_enroll_trial", "trial_alias"),
+        ("idx_enroll_country", "country"),
+    ],
+    "country_level_enrollment_report": [
+        ("idx_country_enroll_trial", "trial_alias"),
+        ("idx_country_enroll_country", "country_name"),
+        ("idx_country_enroll_page", "COALESCE(trial_alias, ''), COALESCE(country_name, ''), id"),
+    ],
+    "re_evaluation": [
+        ("idx_reeval_lot", "lot_number"),
+        ("idx_reeval_ly", "ly_number"),
+        ("idx_reeval_lot_key", "lot_key text_pattern_ops"),
+        ("idx_reeval_lot_trgm", "USING gin (lot_number gin_trgm_ops)"),
+    ],
+    "rim": [
+        ("idx_rim_study", "clinical_study_v"),
+        ("idx_rim_ly", "ly_number_c"),
+        ("idx_rim_status", "status_v"),
+    ],
+    "material_country_requirements": [
+        ("idx_mat_req_country", "countries"),
+        ("idx_mat_req_material", "material_number"),
+        ("idx_mat_req_trial", "trial_alias"),
+    ],
+    "ip_shipping_timelines_report": [
+        ("idx_ship_country", "country_name"),
+        ("idx_ship_country_key", "country_key text_pattern_ops"),
+        ("idx_ship_country_trgm", "USING gin (country_name gin_trgm_ops)"),
+    ],
+    "distribution_order_report": [
+        ("idx_dist_trial", "trial_alias"),
+        ("idx_dist_order", "order_number"),
+        ("idx_dist_status", "status"),
+    ],
+    "affiliate_warehouse_inventory": [
+        ("idx_warehouse_country", "country"),
+        ("idx_warehouse_material", "material_id"),
+    ],
+    "qdocs": [
+        ("idx_qdocs_material", "material_id"),
+    ],
+}
+
+
+def index_parts(columns: str) -> Tuple[str, str]:
+    """Split a TABLE_INDEXES column list into (access method, column list)"""
+    match = re.fullmatch(r"USING\s+(\w+)\s*\((.*)\)", columns.strip(), re.IGNORECASE | re.DOTALL)
+    if match:
+        return match.group(1).lower(), match.group(2).strip()
+    return "btree", columns
+
+
+def split_index_columns(column_list: str) -> List[str]:
+    """Split an index column list on the commas outside parentheses"""
+    parts, depth, start = [], 0, 0
+    for i, char in enumerate(column_list):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(column_list[start:i].strip())
+            start = i + 1
+    parts.append(column_list[start:].strip())
+    return parts
+
+
+def index_column_names(columns: str) -> List[str]:
+    """Table columns an index covers (operator classes stripped, expressions reduced to the columns they read)"""
+    names = []
+    for part in split_index_columns(index_parts(columns)[1]):
+        if "(" in part:
+            # Identifiers that are not literals, function names or ::type casts
+            expression = re.sub(r"::[\w ]+?(?=[,)]|$)", "", re.sub(r"'(?:[^']|'')*'", "''", part))
+            names += re.findall(r"\b([a-z_]\w*)\b(?!\s*\()", expression, re.IGNORECASE)
+        else:
+            names.append(part.split()[0])
+    return names
+
+
+def create_index_sql(index_name: str, table_name: str, columns: str) -> str:
+    """CREATE INDEX statement for one TABLE_INDEXES entry"""
+    method, column_list = index_parts(columns)
+    if method == "btree":
+        return f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name}({column_list});"
+    return f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} USING {method} ({column_list});"
+
 
 def create_tables_for_actual_data():
     """Create tables matching the actual CSV structure"""
@@ -28,6 +147,10 @@ def create_tables_for_actual_data():
     )
     cursor = conn.cursor()
     
+    # Trigram indexes in TABLE_INDEXES need pg_trgm
+    cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+    print("✓ Extension 'pg_trgm' ready")
+    
     tables = {
         # Core inventory and allocation tables
         "allocated_materials_to_orders": """
@@ -65,9 +188,6 @@ def create_tables_for_actual_data():
                 teco_flag VARCHAR(10),
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
-            CREATE INDEX IF NOT EXISTS idx_alloc_order_id ON allocated_materials_to_orders(order_id);
-            CREATE INDEX IF NOT EXISTS idx_alloc_trial ON allocated_materials_to_orders(trial_alias);
-            CREATE INDEX IF NOT EXISTS idx_alloc_batch ON allocated_materials_to_orders(material_component_batch);
         """,
         
         "available_inventory_report": """
@@ -87,12 +207,12 @@ def create_tables_for_actual_data():
                 min_qty INTEGER,
                 max_qty INTEGER,
                 initial_qty INTEGER,
+                row_fingerprint TEXT,
+                deleted_at TIMESTAMP,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
-            CREATE INDEX IF NOT EXISTS idx_inv_trial ON available_inventory_report(trial_name);
-            CREATE INDEX IF NOT EXISTS idx_inv_lot ON available_inventory_report(lot);
-            CREATE INDEX IF NOT EXISTS idx_inv_expiry ON available_inventory_report(expiry_date);
-            CREATE INDEX IF NOT EXISTS idx_inv_location ON available_inventory_report(location);
+            ALTER TABLE available_inventory_report ADD COLUMN IF NOT EXISTS row_fingerprint TEXT,
+                ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP;
         """,
         
         "enrollment_rate_report": """
@@ -105,8 +225,6 @@ def create_tables_for_actual_data():
                 months_data TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
-            CREATE INDEX IF NOT EXISTS idx_enroll_trial ON enrollment_rate_report(trial_alias);
-            CREATE INDEX IF NOT EXISTS idx_enroll_country ON enrollment_rate_report(country);
         """,
         
         "country_level_enrollment_report": """
@@ -121,8 +239,6 @@ def create_tables_for_actual_data():
                 enrollment_rate_monthly_actual DECIMAL(10,2),
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
-            CREATE INDEX IF NOT EXISTS idx_country_enroll_trial ON country_level_enrollment_report(trial_alias);
-            CREATE INDEX IF NOT EXISTS idx_country_enroll_country ON country_level_enrollment_report(country_name);
         """,
         
         "re_evaluation": """
@@ -140,10 +256,12 @@ def create_tables_for_actual_data():
                 analytical_lab VARCHAR(200),
                 analytical_rep_notified VARCHAR(200),
                 modified_date DATE,
+                row_fingerprint TEXT,
+                deleted_at TIMESTAMP,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
-            CREATE INDEX IF NOT EXISTS idx_reeval_lot ON re_evaluation(lot_number);
-            CREATE INDEX IF NOT EXISTS idx_reeval_ly ON re_evaluation(ly_number);
+            ALTER TABLE re_evaluation ADD COLUMN IF NOT EXISTS row_fingerprint TEXT,
+                ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP;
         """,
         
         "rim": """
@@ -163,9 +281,6 @@ def create_tables_for_actual_data():
                 submission_outcome VARCHAR(100),
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
-            CREATE INDEX IF NOT EXISTS idx_rim_study ON rim(clinical_study_v);
-            CREATE INDEX IF NOT EXISTS idx_rim_ly ON rim(ly_number_c);
-            CREATE INDEX IF NOT EXISTS idx_rim_status ON rim(status_v);
         """,
         
         "material_country_requirements": """
@@ -185,9 +300,6 @@ def create_tables_for_actual_data():
                 trial_alias VARCHAR(100),
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
-            CREATE INDEX IF NOT EXISTS idx_mat_req_country ON material_country_requirements(countries);
-            CREATE INDEX IF NOT EXISTS idx_mat_req_material ON material_country_requirements(material_number);
-            CREATE INDEX IF NOT EXISTS idx_mat_req_trial ON material_country_requirements(trial_alias);
         """,
         
         "ip_shipping_timelines_report": """
@@ -199,7 +311,6 @@ def create_tables_for_actual_data():
                 lead_time_days INTEGER,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
-            CREATE INDEX IF NOT EXISTS idx_ship_country ON ip_shipping_timelines_report(country_name);
         """,
         
         "distribution_order_report": """
@@ -213,11 +324,12 @@ def create_tables_for_actual_data():
                 order_date DATE,
                 requested_delivery_date DATE,
                 actual_delivery_date DATE,
+                row_fingerprint TEXT,
+                deleted_at TIMESTAMP,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
-            CREATE INDEX IF NOT EXISTS idx_dist_trial ON distribution_order_report(trial_alias);
-            CREATE INDEX IF NOT EXISTS idx_dist_order ON distribution_order_report(order_number);
-            CREATE INDEX IF NOT EXISTS idx_dist_status ON distribution_order_report(status);
+            ALTER TABLE distribution_order_report ADD COLUMN IF NOT EXISTS row_fingerprint TEXT,
+                ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP;
         """,
         
         "affiliate_warehouse_inventory": """
@@ -233,8 +345,6 @@ def create_tables_for_actual_data():
                 last_inventory_date DATE,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
-            CREATE INDEX IF NOT EXISTS idx_warehouse_country ON affiliate_warehouse_inventory(country);
-            CREATE INDEX IF NOT EXISTS idx_warehouse_material ON affiliate_warehouse_inventory(material_id);
         """,
         
         "qdocs": """
@@ -250,13 +360,19 @@ def create_tables_for_actual_data():
                 document_status VARCHAR(50),
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
-            CREATE INDEX IF NOT EXISTS idx_qdocs_material ON qdocs(material_id);
-        """
+        """,
+        
+        # Precomputed expiry risk per inventory row (refreshed by the loaders)
+        SNAPSHOT_TABLE: SNAPSHOT_DDL
     }
     
     for table_name, create_sql in tables.items():
         try:
             cursor.execute(create_sql)
+            if table_name in SEARCH_KEYS:
+                cursor.execute(search_key_columns_sql(table_name))
+            for index_name, columns in TABLE_INDEXES.get(table_name, []):
+                cursor.execute(create_index_sql(index_name, table_name, columns))
             print(f"✓ Table '{table_name}' ready")
         except Exception as e:
             print(f"✗ Error with table '{table_name}': {e}")
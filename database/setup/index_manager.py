@@ -0,0 +1,176 @@
+"""
+Secondary index management around bulk loads
+
+Bulk loads run without secondary indexes; the indexes declared in
+create_tables_actual.TABLE_INDEXES are then built once on the finished data,
+several at a time on separate connections (plain CREATE INDEX takes a SHARE
+lock, so builds on the same table do not block each other), followed by
+ANALYZE. verify_indexes() compares the database with the declarations so
+drift fails the load instead of silently slowing every query.
+"""
+
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AbstractContextManager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from database.setup.create_tables_actual import TABLE_INDEXES, create_index_sql, index_column_names, index_parts
+
+
+IndexDef = Tuple[str, str]  # (index name, column list)
+
+
+class IndexDriftError(RuntimeError):
+    """Declared indexes are missing or differ from the database"""
+
+
+def table_columns(cursor, table_name: str) -> set:
+    """Column names of a table"""
+    cursor.execute(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = %s;",
+        (table_name,)
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+def buildable_indexes(cursor, table_name: str, indexes: Sequence[IndexDef]) -> List[IndexDef]:
+    """Indexes whose columns all exist; the rest are reported and left to verify_indexes()"""
+    columns = table_columns(cursor, table_name)
+    buildable = []
+    for index_name, index_columns in indexes:
+        missing = [column for column in index_column_names(index_columns) if column not in columns]
+        if missing:
+            print(f"⚠️  Skipping {index_name} on {table_name}: missing columns {missing}")
+            continue
+        buildable.append((index_name, index_columns))
+    return buildable
+
+
+def drop_indexes(cursor, indexes: Sequence[IndexDef]):
+    """Drop secondary indexes ahead of a bulk ingest (in the caller's transaction)"""
+    for index_name, _ in indexes:
+        cursor.execute(f'DROP INDEX IF EXISTS "{index_name}";')
+
+
+def loader_pool_size(loaders: int, index_workers: int) -> int:
+    """
+    Connections a load run needs so index builds never wait on the pool.
+
+    Each concurrent table load keeps its own connection while it borrows up
+    to index_workers more for build_indexes, so the peak is
+    loaders * (1 + index_workers).
+    """
+    return max(1, loaders) * (1 + max(1, index_workers))
+
+
+def build_indexes(
+    connect: Callable[[], AbstractContextManager],
+    table_name: str,
+    indexes: Sequence[IndexDef],
+    max_workers: int = 2,
+    name_suffix: str = ""
+) -> List[str]:
+    """
+    Build indexes on a committed table, in parallel on separate connections.
+
+    Args:
+        connect: Returns a context manager yielding a psycopg2 connection
+            (e.g. LoaderSession.connection)
+        table_name: Table to index
+        indexes: (index name, column list) pairs
+        max_workers: Indexes built at the same time
+        name_suffix: Appended to each index name (shadow tables)
+
+    Returns:
+        Names of the indexes built, without the suffix
+    """
+    if not indexes:
+        return []
+    start_time = time.time()
+
+    def build(index: IndexDef) -> str:
+        index_name, index_columns = index
+        with connect() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(create_index_sql(f'"{index_name}{name_suffix}"', f'"{table_name}"', index_columns))
+            conn.commit()
+        return index_name
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="index") as executor:
+        built = list(executor.map(build, indexes))
+
+    print(f"✓ Built {len(built)} indexes on {table_name} in {time.time() - start_time:.2f}s")
+    return built
+
+
+def analyze_table(conn, table_name: str):
+    """Refresh planner statistics for a table and commit"""
+    with conn.cursor() as cursor:
+        cursor.execute(f'ANALYZE "{table_name}";')
+    conn.commit()
+
+
+def _normalize_columns(columns: str) -> str:
+    normalized = re.sub(r'\s+', " ", columns.replace('"', "")).replace(", ", ",").strip().lower()
+    # pg_indexes spells out the type of literals in expressions ('infinity'::date, ''::text)
+    return re.sub(r"('(?:[^']|'')*')::[\w ]+?(?=[,)]|$)", r"\1", normalized)
+
+
+def verify_indexes(
+    conn,
+    table_names: Iterable[str],
+    declared: Dict[str, Sequence[IndexDef]] = TABLE_INDEXES
+) -> List[str]:
+    """
+    Compare declared indexes with the database.
+
+    Tables that do not exist are ignored (nothing was loaded into them).
+
+    Returns:
+        Human-readable problems; empty when everything matches
+    """
+    tables = [table for table in table_names if declared.get(table)]
+    if not tables:
+        return []
+
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT tablename, indexname, indexdef FROM pg_indexes "
+            "WHERE schemaname = current_schema() AND tablename = ANY(%s);",
+            (tables,)
+        )
+        actual = {(row[0], row[1]): row[2] for row in cursor.fetchall()}
+        cursor.execute(
+            "SELECT table_name FROM information_schema.tables "
+            "WHERE table_schema = current_schema() AND table_name = ANY(%s);",
+            (tables,)
+        )
+        present = {row[0] for row in cursor.fetchall()}
+    conn.commit()
+
+    problems = []
+    for table in tables:
+        if table not in present:
+            continue
+        for index_name, index_columns in declared[table]:
+            definition = actual.get((table, index_name))
+            if definition is None:
+                problems.append(f"{table}.{index_name} is missing")
+                continue
+            method, column_list = index_parts(index_columns)
+            match = re.search(r"USING\s+(\w+)\s*\((.*)\)\s*$", definition)
+            if not match or (match.group(1), _normalize_columns(match.group(2))) != (
+                method, _normalize_columns(column_list)
+            ):
+                problems.append(f"{table}.{index_name} is {definition!r}, expected ({index_columns})")
+    return problems
+
+
+def check_indexes(conn, table_names: Iterable[str]):
+    """Raise IndexDriftError if any declared index is missing or different"""
+    problems = verify_indexes(conn, table_names)
+    if problems:
+        raise IndexDriftError("Index drift detected:\n  - " + "\n  - ".join(problems))
+    print("✓ All declared indexes present")
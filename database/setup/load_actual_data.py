@@ -3,14 +3,36 @@ Comprehensive Data Loader for Actual CSV Files
 Handles all 40+ tables with intelligent mapping and transformation
 """
 
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
 import pandas as pd
 import psycopg2
-from pathlib import Path
 from dotenv import load_dotenv
 import os
-from sqlalchemy import create_engine
 from datetime import datetime
-import re
+import argparse
+from dataclasses import dataclass
+from functools import partial
+from typing import Optional, Union
+
+from tools.data_events import notify_data_reload
+from tools.text_search import SEARCH_KEYS, search_key_columns_sql
+from database.setup.bulk_copy import copy_chunks, CopyStats
+from database.setup.delta_load import DELTA_KEYS, DeltaStats, delta_columns_sql, merge_chunks
+from database.setup.index_manager import (
+    analyze_table, build_indexes, buildable_indexes, check_indexes, loader_pool_size
+)
+from database.setup.load_manifest import LoadManifest, MANIFEST_NAME
+from database.setup.loader_session import LoaderSession
+from database.setup.shadow_swap import load_via_shadow
+from database.setup.staging_cache import PARQUET_AVAILABLE, STAGING_DIR, staged_chunks
+from database.setup.table_specs import NULL_TOKENS, TABLE_SPECS, TableSpec, apply_spec
+from database.setup.create_tables_actual import TABLE_INDEXES
+from database.setup.load_orchestrator import LoadJob, run_load_jobs, print_load_summary
+from tools.expiry_snapshot import SNAPSHOT_TABLE, refresh_expiry_snapshot
+from agents.config import config
 
 load_dotenv()
 
@@ -24,229 +46,293 @@ DB_CONFIG = {
 
 DATA_DIR = Path(__file__).parent.parent / "data"
 
+# Tables loaded concurrently (each load holds one DB connection)
+LOAD_CONCURRENCY = int(os.getenv("LOAD_CONCURRENCY", "4"))
 
-def parse_timeline(timeline_str):
-    """Extract days from timeline string like '6 days door-to-door'"""
-    match = re.search(r'(\d+)\s*days?', str(timeline_str))
-    return int(match.group(1)) if match else None
+# CSV rows read, transformed and COPYed at a time (bounds loader memory)
+LOAD_CHUNK_ROWS = int(os.getenv("LOAD_CHUNK_ROWS", "100000"))
 
+# "swap" loads shadow tables and renames them in, "replace" rewrites tables in
+# place, "delta" merges keyed tables by natural key
+LOAD_MODE = os.getenv("LOAD_MODE", "swap")
 
-def load_allocated_materials_to_orders():
-    """Load allocated materials to orders"""
-    file_path = DATA_DIR / "allocated_materials_to_orders.csv"
+# Stage cleaned extracts as Parquet and reuse them while the CSV is unchanged (needs pyarrow)
+LOAD_STAGING = os.getenv("LOAD_STAGING", "true").lower() in ("1", "true", "yes")
+
+# Secondary indexes built at the same time once a table's data is in (extra pool connections)
+LOAD_INDEX_WORKERS = int(os.getenv("LOAD_INDEX_WORKERS", "2"))
+
+
+@dataclass
+class LoadOptions:
+    """Settings shared by every table load in a run"""
+    
+    chunk_rows: int = LOAD_CHUNK_ROWS
+    mode: str = LOAD_MODE
+    manifest: Optional[LoadManifest] = None  # skip files unchanged since their last load
+    force: bool = False  # load even when the manifest says unchanged
+    staging: bool = LOAD_STAGING  # read/write the Parquet staging cache
+    index_workers: int = LOAD_INDEX_WORKERS  # parallel index builds per table
+
+
+def stream_table(
+    file_name: str,
+    table_name: str,
+    session: LoaderSession,
+    options: Optional[LoadOptions] = None
+) -> Optional[Union[CopyStats, DeltaStats]]:
+    """
+    Load a table from a CSV, reading and COPYing it chunk by chunk.
+
+    Each chunk is cleaned according to the table's TABLE_SPECS entry
+    (renames, explicit-format dates, timelines, categoricals) and flushed
+    before the next one is read, so memory stays bounded by chunk_rows
+    regardless of the file size. The whole table is replaced (or merged) in
+    one transaction; replaced tables get their TABLE_INDEXES built on the
+    finished data, in parallel, and every table is ANALYZEd.
+
+    Args:
+        file_name: CSV file in DATA_DIR
+        table_name: Target table
+        session: Loader session providing the connection
+        options: Chunk size, load mode, manifest and staging settings
+
+    Returns:
+        CopyStats or DeltaStats, or None if the CSV is missing or unchanged
+        since the last load
+    """
+    options = options or LoadOptions()
+    mode = options.mode
+    file_path = DATA_DIR / file_name
     if not file_path.exists():
         print(f"⚠️  {file_path.name} not found")
-        return
-    
-    df = pd.read_csv(file_path)
-    df['modified_date'] = pd.to_datetime(df['modified_date'], errors='coerce')
-    
-    engine = create_engine(f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['dbname']}")
-    
-    df.to_sql('allocated_materials_to_orders', engine, if_exists='replace', index=False, chunksize=1000)
-    print(f"✓ Loaded {len(df)} rows into allocated_materials_to_orders")
+        return None
+    
+    fingerprint = None
+    if options.manifest is not None:
+        unchanged, fingerprint = options.manifest.compare(table_name, file_path)
+        if unchanged and not options.force:
+            previous = options.manifest.entry(table_name)
+            print(f"✓ {file_path.name} unchanged since {previous['loaded_at']} "
+                  f"({previous['rows']} rows), skipping {table_name}")
+            return None
+    
+    spec = TABLE_SPECS.get(table_name, TableSpec())
+    
+    def read_source():
+        return (
+            apply_spec(chunk, spec)
+            for chunk in pd.read_csv(file_path, chunksize=options.chunk_rows, na_values=NULL_TOKENS)
+        )
+    
+    # Typed Parquet copy of the cleaned extract; re-parsing the CSV is the slow part
+    chunks = staged_chunks(table_name, file_path, spec, read_source) if options.staging else read_source()
+    
+    # Readers filter keyed tables on deleted_at and search on *_key columns, so both must survive a reload
+    post_load = (delta_columns_sql,) if table_name in DELTA_KEYS else ()
+    if table_name in SEARCH_KEYS:
+        post_load += (partial(search_key_columns_sql, keys=SEARCH_KEYS[table_name]),)
+    indexes = TABLE_INDEXES.get(table_name, ())
+    
+    with session.connection() as conn:
+        if mode == "delta" and table_name in DELTA_KEYS and table_exists(conn, table_name):
+            # Merges touch few rows, so the existing indexes stay in place
+            stats = merge_chunks(conn, chunks, table_name)
+            analyze_table(conn, table_name)
+        elif mode == "replace":
+            # The table is recreated without indexes; build them once the data is committed
+            stats = copy_chunks(conn, chunks, table_name, commit=False)
+            with conn.cursor() as cursor:
+                for build_sql in post_load:
+                    cursor.execute(build_sql(table_name))
+                indexes = buildable_indexes(cursor, table_name, indexes)
+            conn.commit()
+            build_indexes(session.connection, table_name, indexes, max_workers=options.index_workers)
+            analyze_table(conn, table_name)
+        else:
+            # Load, index and ANALYZE a shadow table, then swap it in atomically
+            stats = load_via_shadow(
+                conn, chunks, table_name, indexes=indexes, post_load=post_load,
+                connect=session.connection, index_workers=options.index_workers
+            )
+    
+    if options.manifest is not None:
+        options.manifest.record(table_name, file_path, fingerprint, stats.rows)
+    
+    print(f"✓ Loaded {stats}")
+    return stats
+
+
+def table_exists(conn, table_name: str) -> bool:
+    """Whether the table is present in the search path"""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL;", (table_name,))
+        return cursor.fetchone()[0]
+
+
+def load_allocated_materials_to_orders(session: LoaderSession, options: Optional[LoadOptions] = None):
+    """Load allocated materials to orders"""
+    return stream_table("allocated_materials_to_orders.csv", 'allocated_materials_to_orders', session, options)
 
 
-def load_available_inventory():
+def load_available_inventory(session: LoaderSession, options: Optional[LoadOptions] = None):
     """Load available inventory report"""
-    file_path = DATA_DIR / "available_inventory_report.csv"
-    if not file_path.exists():
-        print(f"⚠️  {file_path.name} not found")
-        return
-    
-    df = pd.read_csv(file_path)
-    
-    # Rename columns to match schema
-    df.columns = [
-        'trial_name', 'location', 'investigator', 'package_type_description',
-        'lot', 'expiry_date', 'packages_awaiting', 'received_packages',
-        'packages_pending_ffu', 'packages_pending_shipment', 'shipped_packages',
-        'min_qty', 'max_qty', 'initial_qty'
-    ]
-    
-    df['expiry_date'] = pd.to_datetime(df['expiry_date'], errors='coerce')
-    
-    engine = create_engine(f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['dbname']}")
-    
-    df.to_sql('available_inventory_report', engine, if_exists='replace', index=False, chunksize=1000)
-    print(f"✓ Loaded {len(df)} rows into available_inventory_report")
+    return stream_table("available_inventory_report.csv", 'available_inventory_report', session, options)
 
 
-def load_enrollment_rate_report():
+def load_enrollment_rate_report(session: LoaderSession, options: Optional[LoadOptions] = None):
     """Load enrollment rate report"""
-    file_path = DATA_DIR / "enrollment_rate_report.csv"
-    if not file_path.exists():
-        print(f"⚠️  {file_path.name} not found")
-        return
-    
-    df = pd.read_csv(file_path)
-    df.columns = ['trial_alias', 'country', 'site', 'year', 'months_data']
-    
-    engine = create_engine(f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['dbname']}")
-    
-    df.to_sql('enrollment_rate_report', engine, if_exists='replace', index=False, chunksize=1000)
-    print(f"✓ Loaded {len(df)} rows into enrollment_rate_report")
+    return stream_table("enrollment_rate_report.csv", 'enrollment_rate_report', session, options)
 
 
-def load_country_level_enrollment():
+def load_country_level_enrollment(session: LoaderSession, options: Optional[LoadOptions] = None):
     """Load country level enrollment"""
-    file_path = DATA_DIR / "country_level_enrollment_report.csv"
-    if not file_path.exists():
-        print(f"⚠️  {file_path.name} not found")
-        return
-    
-    df = pd.read_csv(file_path)
-    
-    engine = create_engine(f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['dbname']}")
-    
-    df.to_sql('country_level_enrollment_report', engine, if_exists='replace', index=False, chunksize=1000)
-    print(f"✓ Loaded {len(df)} rows into country_level_enrollment_report")
+    return stream_table("country_level_enrollment_report.csv", 'country_level_enrollment_report', session, options)
 
 
-def load_re_evaluation():
+def load_re_evaluation(session: LoaderSession, options: Optional[LoadOptions] = None):
     """Load re-evaluation data"""
-    file_path = DATA_DIR / "re-evaluation.csv"
-    if not file_path.exists():
-        print(f"⚠️  {file_path.name} not found")
-        return
-    
-    df = pd.read_csv(file_path)
-    
-    # Rename columns
-    df.columns = [
-        're_eval_id', 'created_date', 'request_type', 'sample_status',
-        'ly_number', 'item_code', 'lot_number', 'target_date',
-        'sample_location', 'analytical_lab', 'analytical_rep_notified', 'modified_date'
-    ]
-    
-    df['created_date'] = pd.to_datetime(df['created_date'], errors='coerce')
-    df['target_date'] = pd.to_datetime(df['target_date'], errors='coerce')
-    df['modified_date'] = pd.to_datetime(df['modified_date'], errors='coerce')
-    
-    engine = create_engine(f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['dbname']}")
-    
-    df.to_sql('re_evaluation', engine, if_exists='replace', index=False, chunksize=1000)
-    print(f"✓ Loaded {len(df)} rows into re_evaluation")
+    return stream_table("re-evaluation.csv", 're_evaluation', session, options)
 
 
-def load_rim():
+def load_rim(session: LoaderSession, options: Optional[LoadOptions] = None):
     """Load RIM (Regulatory Information Management)"""
-    file_path = DATA_DIR / "rim.csv"
-    if not file_path.exists():
-        print(f"⚠️  {file_path.name} not found")
-        return
-    
-    df = pd.read_csv(file_path)
-    
-    df['approved_date_c'] = pd.to_datetime(df['approved_date_c'], errors='coerce')
-    df['lilly_receipt_date_c'] = pd.to_datetime(df['lilly_receipt_date_c'], errors='coerce')
-    
-    engine = create_engine(f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['dbname']}")
-    
-    df.to_sql('rim', engine, if_exists='replace', index=False, chunksize=1000)
-    print(f"✓ Loaded {len(df)} rows into rim")
+    return stream_table("rim.csv", 'rim', session, options)
 
 
-def load_material_country_requirements():
+def load_material_country_requirements(session: LoaderSession, options: Optional[LoadOptions] = None):
     """Load material country requirements"""
-    file_path = DATA_DIR / "material_country_requirements.csv"
-    if not file_path.exists():
-        print(f"⚠️  {file_path.name} not found")
-        return
-    
-    df = pd.read_csv(file_path)
-    
-    # Rename columns to match schema
-    df.columns = [
-        'client', 'countries', 'created_on', 'ct_compound', 'ct_label_group',
-        'ct_pack_type', 'ct_pcn_group', 'date_of_last_change', 'material_number',
-        'name_of_person_who_changed', 'time_of_creation', 'trial_alias'
-    ]
-    
-    df['created_on'] = pd.to_datetime(df['created_on'], errors='coerce')
-    df['date_of_last_change'] = pd.to_datetime(df['date_of_last_change'], errors='coerce')
-    
-    engine = create_engine(f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['dbname']}")
-    
-    df.to_sql('material_country_requirements', engine, if_exists='replace', index=False, chunksize=1000)
-    print(f"✓ Loaded {len(df)} rows into material_country_requirements")
+    return stream_table("material_country_requirements.csv", 'material_country_requirements', session, options)
 
 
-def load_ip_shipping_timelines():
+def load_ip_shipping_timelines(session: LoaderSession, options: Optional[LoadOptions] = None):
     """Load IP shipping timelines"""
-    file_path = DATA_DIR / "ip_shipping_timelines_report.csv"
-    if not file_path.exists():
-        print(f"⚠️  {file_path.name} not found")
-        return
-    
-    df = pd.read_csv(file_path)
-    
-    # Extract lead time in days
-    df['lead_time_days'] = df['ip_timeline'].apply(parse_timeline)
-    
-    engine = create_engine(f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['dbname']}")
-    
-    df.to_sql('ip_shipping_timelines_report', engine, if_exists='replace', index=False, chunksize=1000)
-    print(f"✓ Loaded {len(df)} rows into ip_shipping_timelines_report")
+    return stream_table("ip_shipping_timelines_report.csv", 'ip_shipping_timelines_report', session, options)
 
 
-def load_distribution_orders():
+def load_distribution_orders(session: LoaderSession, options: Optional[LoadOptions] = None):
     """Load distribution orders"""
-    file_path = DATA_DIR / "distribution_order_report.csv"
-    if not file_path.exists():
-        print(f"⚠️  {file_path.name} not found")
-        return
-    
-    df = pd.read_csv(file_path)
+    return stream_table("distribution_order_report.csv", 'distribution_order_report', session, options)
+
+
+def refresh_snapshots(session: LoaderSession):
+    """Rebuild the precomputed expiry-risk snapshot from the fresh inventory"""
+    with session.connection() as conn:
+        refresh_expiry_snapshot(conn, config)
+
+
+def announce_reload(session: LoaderSession, tables):
+    """Tell running API processes which tables were reloaded"""
+    try:
+        with session.connection() as conn:
+            with conn.cursor() as cursor:
+                notify_data_reload(cursor, tables)
+            # NOTIFY is only delivered on commit
+            conn.commit()
+        print(f"✓ Announced reload of {len(tables)} tables")
+    except Exception as e:
+        print(f"⚠️  Could not announce data reload: {e}")
+
+
+def build_load_jobs(session: LoaderSession, options: Optional[LoadOptions] = None):
+    """Table loads plus the rebuilds that must wait for them"""
+    table_loads = [
+        ("Allocated Materials", "allocated_materials_to_orders", load_allocated_materials_to_orders),
+        ("Available Inventory", "available_inventory_report", load_available_inventory),
+        ("Enrollment Rate", "enrollment_rate_report", load_enrollment_rate_report),
+        ("Country Enrollment", "country_level_enrollment_report", load_country_level_enrollment),
+        ("Re-Evaluation", "re_evaluation", load_re_evaluation),
+        ("RIM", "rim", load_rim),
+        ("Material Requirements", "material_country_requirements", load_material_country_requirements),
+        ("Shipping Timelines", "ip_shipping_timelines_report", load_ip_shipping_timelines),
+        ("Distribution Orders", "distribution_order_report", load_distribution_orders),
+    ]
     
-    df['order_date'] = pd.to_datetime(df['order_date'], errors='coerce')
-    df['requested_delivery_date'] = pd.to_datetime(df['requested_delivery_date'], errors='coerce')
-    df['actual_delivery_date'] = pd.to_datetime(df['actual_delivery_date'], errors='coerce')
+    jobs = [
+        LoadJob(name, partial(loader_func, session, options), table_name=table_name)
+        for name, table_name, loader_func in table_loads
+    ]
     
-    engine = create_engine(f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['dbname']}")
+    # Rebuilds
+    jobs.append(LoadJob(
+        "Expiry Snapshot", partial(refresh_snapshots, session),
+        depends_on=("Available Inventory",), table_name=SNAPSHOT_TABLE
+    ))
     
-    df.to_sql('distribution_order_report', engine, if_exists='replace', index=False, chunksize=1000)
-    print(f"✓ Loaded {len(df)} rows into distribution_order_report")
+    return jobs
 
 
-def main():
+def main(argv=None):
     """Load all data files"""
+    parser = argparse.ArgumentParser(description="Load CSV extracts into PostgreSQL")
+    parser.add_argument(
+        "--workers", type=int, default=LOAD_CONCURRENCY,
+        help=f"Maximum tables loaded concurrently (default: {LOAD_CONCURRENCY})"
+    )
+    parser.add_argument(
+        "--chunk-rows", type=int, default=LOAD_CHUNK_ROWS,
+        help=f"CSV rows read and copied per chunk (default: {LOAD_CHUNK_ROWS})"
+    )
+    parser.add_argument(
+        "--mode", choices=("swap", "replace", "delta"), default=LOAD_MODE,
+        help=(
+            "swap loads shadow tables and renames them in; replace rewrites tables in place; "
+            f"delta upserts changed rows by natural key (default: {LOAD_MODE})"
+        )
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="Reload every CSV, even those unchanged since the last load"
+    )
+    parser.add_argument(
+        "--no-staging", action="store_true",
+        help="Always parse the CSVs; do not read or write the Parquet staging cache"
+    )
+    parser.add_argument(
+        "--index-workers", type=int, default=LOAD_INDEX_WORKERS,
+        help=f"Indexes built at the same time per table after loading (default: {LOAD_INDEX_WORKERS})"
+    )
+    args = parser.parse_args(argv)
+    
+    options = LoadOptions(
+        chunk_rows=args.chunk_rows,
+        mode=args.mode,
+        manifest=LoadManifest(DATA_DIR / MANIFEST_NAME),
+        force=args.force,
+        staging=LOAD_STAGING and not args.no_staging,
+        index_workers=args.index_workers,
+    )
+    
     print("=" * 60)
     print("Clinical Supply Chain AI - Data Loading")
     print("=" * 60)
     print(f"\nData directory: {DATA_DIR}")
+    print(f"Workers: {args.workers}")
+    print(f"Chunk size: {args.chunk_rows} rows")
+    print(f"Mode: {args.mode}{' (forced reload)' if args.force else ''}")
+    print(f"Index workers: {args.index_workers}")
+    if options.staging:
+        print(f"Staging: {STAGING_DIR}" if PARQUET_AVAILABLE else "Staging: off (pyarrow not installed)")
     print()
     
-    # Load all tables
-    loaders = [
-        ("Allocated Materials", load_allocated_materials_to_orders),
-        ("Available Inventory", load_available_inventory),
-        ("Enrollment Rate", load_enrollment_rate_report),
-        ("Country Enrollment", load_country_level_enrollment),
-        ("Re-Evaluation", load_re_evaluation),
-        ("RIM", load_rim),
-        ("Material Requirements", load_material_country_requirements),
-        ("Shipping Timelines", load_ip_shipping_timelines),
-        ("Distribution Orders", load_distribution_orders),
-    ]
-    
-    success = 0
-    failed = 0
-    
-    for name, loader_func in loaders:
-        try:
-            print(f"\nLoading {name}...")
-            loader_func()
-            success += 1
-        except Exception as e:
-            print(f"✗ Error loading {name}: {e}")
-            failed += 1
-    
-    print("\n" + "=" * 60)
-    print(f"✓ Successfully loaded: {success} tables")
-    if failed > 0:
-        print(f"✗ Failed: {failed} tables")
-    print("=" * 60)
+    # One engine and connection pool for the whole run, torn down once at the end. Every
+    # loader may build indexes at once while holding its own connection, so size for all of them.
+    with LoaderSession(DB_CONFIG, pool_size=loader_pool_size(args.workers, args.index_workers)) as session:
+        results = run_load_jobs(build_load_jobs(session, options), max_workers=args.workers)
+        
+        # Loaders return None when their CSV is missing or unchanged; only announce real reloads
+        loaded_tables = [
+            result.table_name for result in results.values()
+            if result.status == "success" and (result.result is not None or result.table_name == SNAPSHOT_TABLE)
+        ]
+        if loaded_tables:
+            announce_reload(session, loaded_tables)
+        
+        print_load_summary(results)
+        
+        # Every index declared in create_tables_actual.py must exist, loaded this run or not
+        with session.connection() as conn:
+            check_indexes(conn, TABLE_INDEXES)
 
 
 if __name__ == "__main__":
@@ -5,13 +5,32 @@ This script loads CSV files into the PostgreSQL database.
 Place all CSV files in the database/data/ directory before running.
 """
 
-import psycopg2
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
 import pandas as pd
 import os
-from pathlib import Path
 from dotenv import load_dotenv
 from typing import Dict, List
 import glob
+import argparse
+import itertools
+import dataclasses
+from contextlib import nullcontext
+
+from tools.data_events import notify_data_reload
+from database.setup.bulk_copy import copy_chunks
+from database.setup.create_tables_actual import TABLE_INDEXES
+from database.setup.delta_load import DELTA_KEYS, merge_chunks
+from database.setup.index_manager import (
+    analyze_table, build_indexes, buildable_indexes, check_indexes, drop_indexes, IndexDriftError, loader_pool_size
+)
+from database.setup.load_manifest import LoadManifest, MANIFEST_NAME
+from database.setup.loader_session import LoaderSession
+from database.setup.table_specs import NULL_TOKENS, TABLE_SPECS, apply_spec, default_spec
+from tools.expiry_snapshot import SNAPSHOT_TABLE, refresh_expiry_snapshot
+from agents.config import config
 
 load_dotenv()
 
@@ -23,6 +42,15 @@ DB_NAME = os.getenv("DB_NAME", "clinical_supply_chain")
 
 DATA_DIR = Path(__file__).parent.parent / "data"
 
+# CSV rows read, cleaned and copied at a time
+LOAD_CHUNK_ROWS = int(os.getenv("LOAD_CHUNK_ROWS", "100000"))
+
+# "replace" clears and reloads tables; "delta" merges keyed tables by natural key
+LOAD_MODE = os.getenv("LOAD_MODE", "replace")
+
+# Secondary indexes rebuilt at the same time after a reload
+LOAD_INDEX_WORKERS = int(os.getenv("LOAD_INDEX_WORKERS", "2"))
+
 
 # Mapping of CSV file patterns to table names
 TABLE_MAPPINGS = {
@@ -84,23 +112,18 @@ def find_csv_files() -> Dict[str, Path]:
 def clean_dataframe(df: pd.DataFrame, table_name: str) -> pd.DataFrame:
     """
     Clean and prepare DataFrame for database insertion.
+
+    Columns are matched by name here, so only the date, timeline and
+    categorical parts of the table's spec apply. Tables without a spec get
+    ISO dates in every column named *date*. NULL tokens are already handled
+    by read_csv(na_values=NULL_TOKENS).
     """
     # Convert column names to lowercase with underscores
     df.columns = [col.lower().replace(' ', '_').replace('-', '_') for col in df.columns]
     
-    # Handle common data issues
-    # Replace empty strings with None for database NULL
-    df = df.replace('', None)
-    df = df.replace('NA', None)
-    df = df.replace('N/A', None)
-    
-    # Convert date columns
-    date_columns = [col for col in df.columns if 'date' in col]
-    for col in date_columns:
-        try:
-            df[col] = pd.to_datetime(df[col], errors='coerce')
-        except Exception as e:
-            print(f"    Warning: Could not convert {col} to date: {e}")
+    spec = TABLE_SPECS.get(table_name)
+    spec = dataclasses.replace(spec, columns=None) if spec else default_spec(df.columns)
+    df = apply_spec(df, spec)
     
     # Remove completely empty rows
     df = df.dropna(how='all')
@@ -108,22 +131,46 @@ def clean_dataframe(df: pd.DataFrame, table_name: str) -> pd.DataFrame:
     return df
 
 
-def load_csv_to_table(csv_path: Path, table_name: str, conn):
+def load_csv_to_table(
+    csv_path: Path,
+    table_name: str,
+    conn,
+    chunk_rows: int = LOAD_CHUNK_ROWS,
+    mode: str = LOAD_MODE,
+    connect=None,
+    index_workers: int = 1
+):
     """
     Load a CSV file into a PostgreSQL table.
+
+    The file is read, cleaned and copied chunk_rows at a time, so memory use
+    does not grow with the file size. The DELETE and every chunk's COPY
+    commit together. The table's declared secondary indexes are dropped for
+    the ingest and rebuilt afterwards (index_workers at a time when connect
+    yields extra connections), then the table is ANALYZEd. In delta mode,
+    tables with a natural key (DELTA_KEYS) are merged instead of cleared.
+
+    Returns:
+        CopyStats or DeltaStats, or None if nothing was loaded
     """
     print(f"\nLoading {csv_path.name} into table '{table_name}'...")
     
     try:
-        # Read CSV
-        df = pd.read_csv(csv_path)
-        print(f"  ✓ Read CSV: {len(df)} rows, {len(df.columns)} columns")
+        read_counts = {"rows": 0, "chunks": 0}
         
-        # Clean data
-        df = clean_dataframe(df, table_name)
-        print(f"  ✓ Cleaned data: {len(df)} rows after cleaning")
+        def cleaned_chunks():
+            for chunk in pd.read_csv(csv_path, chunksize=chunk_rows, na_values=NULL_TOKENS):
+                read_counts["rows"] += len(chunk)
+                read_counts["chunks"] += 1
+                chunk = clean_dataframe(chunk, table_name)
+                if not chunk.empty:
+                    yield chunk
         
-        if df.empty:
+        chunks = cleaned_chunks()
+        first_chunk = next(chunks, None)
+        
+        if first_chunk is None:
+            print(f"  ✓ Read CSV: {read_counts['rows']} rows")
             print(f"  ⚠️  No data to load (empty after cleaning)")
             return
         
@@ -139,41 +186,44 @@ def load_csv_to_table(csv_path: Path, table_name: str, conn):
         db_columns = [row[0] for row in cursor.fetchall()]
         
         # Match DataFrame columns to database columns
-        matching_columns = [col for col in df.columns if col in db_columns]
+        matching_columns = [col for col in first_chunk.columns if col in db_columns]
         
         if not matching_columns:
             print(f"  ✗ No matching columns found between CSV and table")
-            print(f"    CSV columns: {list(df.columns)[:10]}")
+            print(f"    CSV columns: {list(first_chunk.columns)[:10]}")
             print(f"    DB columns: {db_columns[:10]}")
             return
         
         print(f"  ✓ Matched {len(matching_columns)} columns")
         
-        # Prepare data for insertion
-        df_to_insert = df[matching_columns]
-        
-        # Clear existing data (optional - comment out if you want to append)
-        cursor.execute(f"DELETE FROM {table_name};")
-        print(f"  ✓ Cleared existing data from {table_name}")
-        
-        # Insert data using pandas to_sql (fast and efficient)
-        from sqlalchemy import create_engine
+        all_chunks = itertools.chain([first_chunk], chunks)
+        keys = DELTA_KEYS.get(table_name, ())
         
-        engine = create_engine(
-            f"postgresql://{DB_USER}:{DB_PASSWORD}@"
-            f"{DB_HOST}:{DB_PORT}/{DB_NAME}"
-        )
-        
-        df_to_insert.to_sql(
-            table_name,
-            engine,
-            if_exists='append',
-            index=False,
-            method='multi',
-            chunksize=1000
-        )
-        
-        print(f"  ✓ Successfully loaded {len(df_to_insert)} rows into {table_name}")
+        if mode == "delta" and keys and all(key in matching_columns for key in keys):
+            # Upsert changed rows and soft-delete vanished ones; indexes stay in place
+            stats = merge_chunks(conn, (chunk[matching_columns] for chunk in all_chunks), table_name, keys)
+            analyze_table(conn, table_name)
+            print(f"  ✓ Read CSV: {read_counts['rows']} rows in {read_counts['chunks']} chunk(s)")
+            print(f"  ✓ Merged {stats}")
+        else:
+            # Clear existing data (optional - comment out if you want to append)
+            cursor.execute(f"DELETE FROM {table_name};")
+            print(f"  ✓ Cleared existing data from {table_name}")
+            
+            # Maintaining indexes row by row is slower than one build afterwards
+            indexes = buildable_indexes(cursor, table_name, TABLE_INDEXES.get(table_name, ()))
+            drop_indexes(cursor, indexes)
+            
+            # Bulk insert via COPY FROM STDIN, one chunk at a time
+            stats = copy_chunks(conn, all_chunks, table_name, replace=False, columns=matching_columns)
+            
+            print(f"  ✓ Read CSV: {read_counts['rows']} rows in {read_counts['chunks']} chunk(s)")
+            print(f"  ✓ Successfully loaded {stats}")
+            
+            if connect is None:
+                connect, index_workers = (lambda: nullcontext(conn)), 1
+            build_indexes(connect, table_name, indexes, max_workers=index_workers)
+            analyze_table(conn, table_name)
         
         # Verify
         cursor.execute(f"SELECT COUNT(*) FROM {table_name};")
@@ -181,13 +231,21 @@ def load_csv_to_table(csv_path: Path, table_name: str, conn):
         print(f"  ✓ Verification: Table now has {count} rows")
         
         cursor.close()
+        return stats
         
     except Exception as e:
         print(f"  ✗ Error loading {csv_path.name}: {e}")
         raise
 
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load CSV files from database/data into PostgreSQL")
+    parser.add_argument(
+        "--force", action="store_true",
+        help="Reload every CSV, even those unchanged since the last load"
+    )
+    args = parser.parse_args(argv)
+    
     print("=" * 60)
     print("Clinical Supply Chain AI - Data Loading")
     print("=" * 60)
@@ -199,32 +257,73 @@ def main():
         print("\n⚠️  No CSV files to load. Exiting.")
         return
     
+    # Skip extracts whose content has not changed since they were last loaded
+    manifest = LoadManifest(DATA_DIR / MANIFEST_NAME)
+    fingerprints = {}
+    for table_name, csv_path in list(file_mapping.items()):
+        unchanged, fingerprints[table_name] = manifest.compare(table_name, csv_path)
+        if unchanged and not args.force:
+            print(f"  - {csv_path.name} unchanged since {manifest.entry(table_name)['loaded_at']}, skipping")
+            del file_mapping[table_name]
+    
+    if not file_mapping:
+        print("\n✓ All CSV files are unchanged since the last load (use --force to reload). Exiting.")
+        return
+    
     print(f"\nPreparing to load {len(file_mapping)} tables...")
     input("Press Enter to continue or Ctrl+C to cancel...")
     
-    # Connect to database
-    conn = psycopg2.connect(
-        host=DB_HOST,
-        port=DB_PORT,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        dbname=DB_NAME
-    )
-    conn.autocommit = True
+    # One engine and connection pool for the whole run
+    db_config = {"host": DB_HOST, "port": DB_PORT, "user": DB_USER, "password": DB_PASSWORD, "dbname": DB_NAME}
     
     # Load each file
     success_count = 0
     failed_count = 0
+    loaded_tables = []
     
-    for table_name, csv_path in file_mapping.items():
-        try:
-            load_csv_to_table(csv_path, table_name, conn)
-            success_count += 1
-        except Exception as e:
-            print(f"✗ Failed to load {table_name}: {e}")
-            failed_count += 1
+    drift = None
     
-    conn.close()
+    # One connection loads, the others rebuild indexes
+    with LoaderSession(db_config, pool_size=loader_pool_size(1, LOAD_INDEX_WORKERS)) as session:
+        for table_name, csv_path in file_mapping.items():
+            try:
+                # DELETE + COPY commit together, so a failed file keeps its old rows
+                with session.connection() as conn:
+                    stats = load_csv_to_table(
+                        csv_path, table_name, conn,
+                        connect=session.connection, index_workers=LOAD_INDEX_WORKERS
+                    )
+                if stats is not None:
+                    manifest.record(table_name, csv_path, fingerprints[table_name], stats.rows)
+                success_count += 1
+                loaded_tables.append(table_name)
+            except Exception as e:
+                print(f"✗ Failed to load {table_name}: {e}")
+                failed_count += 1
+        
+        # Rebuild the precomputed expiry-risk snapshot from the fresh inventory
+        if "available_inventory_report" in loaded_tables:
+            try:
+                with session.connection() as conn:
+                    refresh_expiry_snapshot(conn, config)
+                loaded_tables.append(SNAPSHOT_TABLE)
+            except Exception as e:
+                print(f"✗ Failed to refresh {SNAPSHOT_TABLE}: {e}")
+                failed_count += 1
+        
+        # Let running API processes drop responses cached from the old data
+        if loaded_tables:
+            with session.connection() as conn:
+                with conn.cursor() as cursor:
+                    notify_data_reload(cursor, loaded_tables)
+                conn.commit()
+        
+        # Every index declared in create_tables_actual.py must exist after the reload
+        try:
+            with session.connection() as conn:
+                check_indexes(conn, loaded_tables)
+        except IndexDriftError as e:
+            drift = e
     
     # Summary
     print("\n" + "=" * 60)
@@ -235,6 +334,10 @@ def main():
         print(f"✗ Failed to load: {failed_count} tables")
     print("=" * 60)
     
+    if drift is not None:
+        print(f"\n✗ {drift}")
+        raise drift
+    
     print("\nNext steps:")
     print("1. Run: python database/setup/verify_data.py")
     print("2. Start the agents: python agents/supply_watchdog/run_monitoring.py")
@@ -0,0 +1,114 @@
+"""
+Load manifest for skipping unchanged source extracts
+
+Records, per table, the size, mtime and SHA-256 of the CSV it was last
+loaded from plus the resulting row count. A file whose content hash still
+matches is skipped on the next run; touching a file without changing it
+costs one hash but no reload.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+
+MANIFEST_NAME = ".load_manifest.json"
+
+_HASH_BLOCK_BYTES = 1024 * 1024
+
+
+@dataclass
+class FileFingerprint:
+    """Identity of a source file's content"""
+
+    size: int
+    mtime: float
+    sha256: str
+
+
+def file_sha256(path: Path) -> str:
+    """SHA-256 of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(_HASH_BLOCK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint_file(path: Path) -> FileFingerprint:
+    """Size, mtime and content hash of a file"""
+    stat = path.stat()
+    return FileFingerprint(stat.st_size, stat.st_mtime, file_sha256(path))
+
+
+class LoadManifest:
+    """JSON manifest of the source files each table was last loaded from"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = {}
+        if self.path.exists():
+            try:
+                self._entries = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Ignoring unreadable load manifest {self.path}: {e}")
+
+    def entry(self, table_name: str) -> Optional[dict]:
+        """Manifest entry for a table, if it was loaded before"""
+        with self._lock:
+            return self._entries.get(table_name)
+
+    def compare(self, table_name: str, path: Path) -> Tuple[bool, FileFingerprint]:
+        """
+        Compare a file with the one the table was last loaded from.
+
+        Files whose size and mtime both match are trusted without hashing;
+        otherwise the content hash decides.
+
+        Args:
+            table_name: Target table
+            path: Source file
+
+        Returns:
+            Tuple of (content unchanged, current fingerprint for record())
+        """
+        stat = path.stat()
+        previous = self.entry(table_name)
+        if previous is None or previous.get("file") != path.name:
+            return False, fingerprint_file(path)
+
+        if previous.get("size") == stat.st_size and previous.get("mtime") == stat.st_mtime:
+            return True, FileFingerprint(stat.st_size, stat.st_mtime, previous["sha256"])
+
+        fingerprint = fingerprint_file(path)
+        if fingerprint.sha256 != previous.get("sha256"):
+            return False, fingerprint
+
+        # Same content, new mtime: remember it so the next run skips the hash
+        with self._lock:
+            self._entries[table_name] = {**previous, "mtime": fingerprint.mtime}
+            self._save()
+        return True, fingerprint
+
+    def record(self, table_name: str, path: Path, fingerprint: FileFingerprint, rows: int):
+        """Remember a successful load and persist the manifest"""
+        with self._lock:
+            self._entries[table_name] = {
+                "file": path.name,
+                **asdict(fingerprint),
+                "rows": rows,
+                "loaded_at": datetime.now().isoformat(timespec="seconds"),
+            }
+            self._save()
+
+    def _save(self):
+        # Write then rename so a crash never leaves a truncated manifest
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self._entries, indent=2, sort_keys=True), encoding="utf-8")
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,156 @@
+"""
+Parallel load orchestration for the data loaders
+
+Runs independent load jobs on a bounded worker pool while honouring a
+dependency graph (e.g. the expiry snapshot rebuild waits for the inventory
+load), and records per-job timings and failures.
+"""
+
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+@dataclass
+class LoadJob:
+    """One unit of load work and the jobs it must wait for"""
+
+    name: str
+    func: Callable[[], Any]
+    depends_on: Tuple[str, ...] = ()
+    table_name: Optional[str] = None
+
+
+@dataclass
+class JobResult:
+    """Outcome of a load job"""
+
+    name: str
+    status: str  # "success", "failed" or "skipped"
+    seconds: float = 0.0
+    result: Any = None
+    error: Optional[str] = None
+    table_name: Optional[str] = None
+    details: str = field(default="", repr=False)
+
+
+def validate_jobs(jobs: Sequence[LoadJob]):
+    """Reject duplicate names, unknown dependencies and cycles"""
+    names = [job.name for job in jobs]
+    duplicates = {name for name in names if names.count(name) > 1}
+    if duplicates:
+        raise ValueError(f"Duplicate load jobs: {sorted(duplicates)}")
+
+    by_name = {job.name: job for job in jobs}
+    for job in jobs:
+        unknown = [dep for dep in job.depends_on if dep not in by_name]
+        if unknown:
+            raise ValueError(f"Job '{job.name}' depends on unknown jobs: {unknown}")
+
+    # Depth-first search for cycles
+    state: Dict[str, int] = {}  # 1 = visiting, 2 = done
+
+    def visit(name: str, path: List[str]):
+        if state.get(name) == 2:
+            return
+        if state.get(name) == 1:
+            raise ValueError(f"Dependency cycle: {' -> '.join(path + [name])}")
+        state[name] = 1
+        for dep in by_name[name].depends_on:
+            visit(dep, path + [name])
+        state[name] = 2
+
+    for job in jobs:
+        visit(job.name, [])
+
+
+def _run_timed(job: LoadJob) -> JobResult:
+    print(f"\nStarting {job.name}...")
+    start_time = time.time()
+    try:
+        result = job.func()
+        return JobResult(job.name, "success", time.time() - start_time, result, table_name=job.table_name)
+    except Exception as e:
+        return JobResult(
+            job.name, "failed", time.time() - start_time,
+            error=str(e), table_name=job.table_name, details=traceback.format_exc()
+        )
+
+
+def run_load_jobs(jobs: Sequence[LoadJob], max_workers: int = 4) -> Dict[str, JobResult]:
+    """
+    Run load jobs concurrently, starting each once its dependencies succeed.
+
+    Jobs whose dependencies failed (directly or transitively) are skipped.
+
+    Args:
+        jobs: Jobs to run
+        max_workers: Concurrency cap for the worker pool
+
+    Returns:
+        Mapping of job name to JobResult, in the order jobs were given
+    """
+    validate_jobs(jobs)
+    by_name = {job.name: job for job in jobs}
+    results: Dict[str, JobResult] = {}
+    pending = [job.name for job in jobs]
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="loader") as executor:
+        running = {}
+
+        def schedule_ready():
+            # Loop until stable: skipping one job can make its dependents skippable
+            progressed = True
+            while progressed:
+                progressed = False
+                for name in list(pending):
+                    job = by_name[name]
+                    failed_deps = [
+                        dep for dep in job.depends_on
+                        if dep in results and results[dep].status != "success"
+                    ]
+                    if failed_deps:
+                        results[name] = JobResult(
+                            name, "skipped", error=f"dependency failed: {', '.join(failed_deps)}",
+                            table_name=job.table_name
+                        )
+                    elif all(dep in results for dep in job.depends_on):
+                        running[executor.submit(_run_timed, job)] = name
+                    else:
+                        continue
+                    pending.remove(name)
+                    progressed = True
+
+        schedule_ready()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+            schedule_ready()
+
+    return {job.name: results[job.name] for job in jobs}
+
+
+def print_load_summary(results: Dict[str, JobResult]):
+    """Print per-job timings and a failure summary"""
+    print("\n" + "=" * 60)
+    print("Load Summary")
+    print("=" * 60)
+    for result in results.values():
+        marker = {"success": "✓", "failed": "✗", "skipped": "-"}[result.status]
+        throughput = ""
+        if hasattr(result.result, "rows_per_second"):
+            throughput = f" {result.result.rows:>10} rows {result.result.rows_per_second:>12,.0f} rows/s"
+        print(f"{marker} {result.name:<28} {result.status:<8} {result.seconds:>8.2f}s{throughput}")
+
+    failures = [r for r in results.values() if r.status != "success"]
+    succeeded = len(results) - len(failures)
+    print("-" * 60)
+    print(f"✓ Succeeded: {succeeded}/{len(results)} jobs")
+    if failures:
+        print("✗ Failures:")
+        for result in failures:
+            print(f"  - {result.name} ({result.status}): {result.error}")
+    print("=" * 60)
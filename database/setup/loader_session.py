@@ -0,0 +1,57 @@
+"""
+Shared database session for a data loading run
+
+One SQLAlchemy engine (and therefore one connection pool) is created per run
+and hands out connections to every table job, instead of each loader building
+its own engine and paying a fresh handshake.
+"""
+
+from contextlib import contextmanager
+from typing import Dict
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import URL
+
+
+class LoaderSession:
+    """Owns the engine and connection pool for one loader run"""
+
+    def __init__(self, db_config: Dict[str, str], pool_size: int = 4):
+        url = URL.create(
+            "postgresql+psycopg2",
+            username=db_config["user"],
+            password=db_config["password"],
+            host=db_config["host"],
+            port=int(db_config["port"]),
+            database=db_config["dbname"],
+        )
+        self.engine = create_engine(
+            url,
+            pool_size=max(1, pool_size),
+            max_overflow=0,
+            pool_pre_ping=True,
+        )
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a raw psycopg2 connection (for COPY) from the session pool.
+
+        Uncommitted work is rolled back when the connection returns to the pool.
+        """
+        conn = self.engine.raw_connection()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def close(self):
+        """Close every pooled connection"""
+        self.engine.dispose()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,119 @@
+"""
+Blue/green table reloads via a shadow table and an atomic rename
+
+The new data is copied into "<table>__shadow" and committed there, indexed
+(in parallel when given a connection factory) and ANALYZEd, and only then
+swapped in. Readers keep querying the live table the whole time; the swap
+itself (drop old, rename shadow and its indexes) takes an exclusive lock for
+a few milliseconds at commit, so nobody ever sees an empty or half-written
+table.
+"""
+
+from contextlib import AbstractContextManager, nullcontext
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from database.setup.bulk_copy import copy_chunks, CopyStats
+from database.setup.index_manager import build_indexes, buildable_indexes
+
+
+SHADOW_SUFFIX = "__shadow"
+
+# Give up on the swap rather than queue readers behind a long-running query
+SWAP_LOCK_TIMEOUT = "10s"
+
+
+def shadow_name(name: str) -> str:
+    """Name of the shadow twin of a table or index"""
+    return f"{name}{SHADOW_SUFFIX}"
+
+
+def swap_statements(table_name: str, index_names: Sequence[str]) -> List[str]:
+    """
+    Statements that replace the live table with its shadow; run them in one transaction.
+
+    Dropping the old table also drops its indexes, which frees their names
+    for the shadow's indexes.
+    """
+    statements = [
+        f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}';",
+        f'DROP TABLE IF EXISTS "{table_name}";',
+        f'ALTER TABLE "{shadow_name(table_name)}" RENAME TO "{table_name}";',
+    ]
+    statements.extend(
+        f'ALTER INDEX "{shadow_name(index_name)}" RENAME TO "{index_name}";'
+        for index_name in index_names
+    )
+    return statements
+
+
+def load_via_shadow(
+    conn,
+    chunks: Iterable[pd.DataFrame],
+    table_name: str,
+    indexes: Sequence[Tuple[str, str]] = (),
+    post_load: Sequence[Callable[[str], str]] = (),
+    connect: Optional[Callable[[], AbstractContextManager]] = None,
+    index_workers: int = 1
+) -> CopyStats:
+    """
+    Load a table into its shadow, index it and swap it in.
+
+    Args:
+        conn: psycopg2 (or SQLAlchemy raw) connection; committed on success
+        chunks: DataFrames to load (e.g. pd.read_csv(chunksize=N))
+        table_name: Live table to replace
+        indexes: (index name, column list) pairs built on the finished data
+        post_load: Functions mapping the shadow table name to SQL run after
+            the COPY and before indexing (e.g. adding bookkeeping columns)
+        connect: Yields extra connections for building indexes in parallel;
+            without it they are built one by one on conn
+        index_workers: Indexes built at the same time when connect is given
+
+    Returns:
+        CopyStats for the COPY into the shadow table
+    """
+    shadow = shadow_name(table_name)
+    if connect is None:
+        connect, index_workers = (lambda: nullcontext(conn)), 1
+
+    try:
+        stats = copy_chunks(conn, chunks, shadow, replace=True, commit=False)
+        stats.table_name = table_name
+
+        with conn.cursor() as cursor:
+            for build_sql in post_load:
+                cursor.execute(build_sql(shadow))
+            buildable = buildable_indexes(cursor, shadow, indexes)
+        # Index builders on other connections must see the shadow table
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    try:
+        # Build indexes once on the finished data instead of row by row
+        built = build_indexes(connect, shadow, buildable, max_workers=index_workers, name_suffix=SHADOW_SUFFIX)
+
+        with conn.cursor() as cursor:
+            cursor.execute(f'ANALYZE "{shadow}";')
+            for statement in swap_statements(table_name, built):
+                cursor.execute(statement)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        _drop_shadow(conn, shadow)
+        raise
+
+    return stats
+
+
+def _drop_shadow(conn, shadow: str):
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS "{shadow}";')
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"⚠️  Could not drop {shadow}: {e}")
@@ -0,0 +1,181 @@
+"""
+Parquet staging cache for source extracts
+
+The first load of a CSV writes each cleaned chunk to
+database/staging/<table>/part-NNNNN.parquet. Later loads of the same file
+(same content, same TABLE_SPECS entry) stream those typed parts instead of
+re-parsing and re-cleaning the CSV.
+
+The staged parts double as an offline copy of the data: read_staged() (or
+any Parquet reader, e.g. DuckDB over database/staging/<table>/*.parquet)
+queries them without touching Postgres.
+
+Requires pyarrow; without it the loaders read the CSVs directly.
+"""
+
+import hashlib
+import importlib.util
+import json
+import shutil
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional
+
+import pandas as pd
+
+from database.setup.load_manifest import fingerprint_file
+from database.setup.table_specs import TableSpec
+
+
+STAGING_DIR = Path(__file__).parent.parent / "staging"
+
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+_SOURCE_FILE = "_source.json"
+
+
+def spec_digest(spec: TableSpec) -> str:
+    """Short hash of a table spec; staged data is stale once the spec changes"""
+    return hashlib.sha256(repr(spec).encode("utf-8")).hexdigest()[:16]
+
+
+def staged_dir(table_name: str, staging_dir: Path = STAGING_DIR) -> Path:
+    return staging_dir / table_name
+
+
+def staged_parts(table_name: str, staging_dir: Path = STAGING_DIR) -> List[Path]:
+    """Parquet parts of a staged table, in load order"""
+    return sorted(staged_dir(table_name, staging_dir).glob("part-*.parquet"))
+
+
+def _read_source_info(table_dir: Path) -> Optional[dict]:
+    try:
+        return json.loads((table_dir / _SOURCE_FILE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def is_fresh(table_name: str, source_path: Path, spec: TableSpec, staging_dir: Path = STAGING_DIR) -> bool:
+    """
+    Whether the staged parts were built from this file's content and spec.
+
+    Matching size and mtime are trusted; otherwise the content hash decides.
+    """
+    table_dir = staged_dir(table_name, staging_dir)
+    info = _read_source_info(table_dir)
+    if not info or info.get("spec") != spec_digest(spec) or info.get("file") != source_path.name:
+        return False
+
+    stat = source_path.stat()
+    if info.get("size") != stat.st_size:
+        return False
+    if info.get("mtime") == stat.st_mtime:
+        return True
+
+    fingerprint = fingerprint_file(source_path)
+    if fingerprint.sha256 != info.get("sha256"):
+        return False
+    info["mtime"] = fingerprint.mtime
+    (table_dir / _SOURCE_FILE).write_text(json.dumps(info, indent=2, sort_keys=True), encoding="utf-8")
+    return True
+
+
+def _write_through(
+    table_name: str,
+    source_path: Path,
+    spec: TableSpec,
+    chunks: Iterator[pd.DataFrame],
+    staging_dir: Path
+) -> Iterator[pd.DataFrame]:
+    # Parts go to a scratch directory that only replaces the cache once complete
+    table_dir = staged_dir(table_name, staging_dir)
+    scratch_dir = table_dir.with_name(f"{table_name}.partial")
+    shutil.rmtree(scratch_dir, ignore_errors=True)
+    scratch_dir.mkdir(parents=True)
+    fingerprint = fingerprint_file(source_path)
+
+    complete = False
+    failed = False
+    rows = 0
+    try:
+        for number, chunk in enumerate(chunks):
+            if not failed:
+                try:
+                    chunk.to_parquet(scratch_dir / f"part-{number:05d}.parquet", index=False)
+                except Exception as e:
+                    # Staging is an optimization; the load itself carries on
+                    print(f"⚠️  Could not stage {table_name} as Parquet: {e}")
+                    failed = True
+            rows += len(chunk)
+            yield chunk
+
+        if failed:
+            return
+        info = {
+            "file": source_path.name,
+            "size": fingerprint.size,
+            "mtime": fingerprint.mtime,
+            "sha256": fingerprint.sha256,
+            "spec": spec_digest(spec),
+            "rows": rows,
+        }
+        (scratch_dir / _SOURCE_FILE).write_text(json.dumps(info, indent=2, sort_keys=True), encoding="utf-8")
+        shutil.rmtree(table_dir, ignore_errors=True)
+        scratch_dir.rename(table_dir)
+        complete = True
+        print(f"[STAGING] Staged {rows} rows of {source_path.name} as Parquet in {table_dir}")
+    finally:
+        if not complete:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+def staged_chunks(
+    table_name: str,
+    source_path: Path,
+    spec: TableSpec,
+    read_source: Callable[[], Iterator[pd.DataFrame]],
+    staging_dir: Path = STAGING_DIR
+) -> Iterator[pd.DataFrame]:
+    """
+    Cleaned chunks of a source extract, served from the staging cache when fresh.
+
+    Args:
+        table_name: Target table (names the staging directory)
+        source_path: Source CSV
+        spec: Cleaning spec the chunks were (or will be) produced with
+        read_source: Produces cleaned chunks from the CSV on a cache miss;
+            they are staged as they stream past
+        staging_dir: Cache root
+
+    Returns:
+        Iterator of DataFrames
+    """
+    if not PARQUET_AVAILABLE:
+        return read_source()
+
+    if is_fresh(table_name, source_path, spec, staging_dir):
+        print(f"[STAGING] Reading {table_name} from staged Parquet")
+        return (pd.read_parquet(part) for part in staged_parts(table_name, staging_dir))
+
+    return _write_through(table_name, source_path, spec, read_source(), staging_dir)
+
+
+def read_staged(
+    table_name: str,
+    columns: Optional[List[str]] = None,
+    staging_dir: Path = STAGING_DIR
+) -> pd.DataFrame:
+    """
+    Load a staged table for offline analysis, without Postgres.
+
+    Args:
+        table_name: Staged table
+        columns: Subset of columns to read (Parquet reads only those)
+        staging_dir: Cache root
+
+    Returns:
+        DataFrame of all staged rows
+    """
+    parts = staged_parts(table_name, staging_dir)
+    if not parts:
+        raise FileNotFoundError(f"No staged Parquet data for {table_name} in {staging_dir}")
+    return pd.concat((pd.read_parquet(part, columns=columns) for part in parts), ignore_index=True)
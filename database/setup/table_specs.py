@@ -0,0 +1,134 @@
+"""
+Declarative column specs for cleaning source extracts
+
+Each table declares its column names, date columns (with an explicit
+format, so pandas never infers one per element), derived timeline columns
+and low-cardinality text columns to hold as categoricals. apply_spec() turns
+a raw chunk into load-ready data in one vectorized pass.
+
+NULL tokens ('', 'NA', 'N/A') are handled by pd.read_csv(na_values=...)
+while parsing, so no separate replace passes are needed.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+
+# Source extracts use ISO dates ("2025-12-15", optionally with a time part)
+ISO_DATE = "ISO8601"
+
+# Strings read as NULL (pass to pd.read_csv as na_values)
+NULL_TOKENS = ["", "NA", "N/A"]
+
+# Lead time in a shipping timeline such as "6 days door-to-door"
+TIMELINE_PATTERN = r"(\d+)\s*days?"
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    """How to clean one table's extract"""
+
+    columns: Optional[Tuple[str, ...]] = None  # positional rename of the CSV header
+    dates: Dict[str, str] = field(default_factory=dict)  # column -> date format
+    timelines: Dict[str, str] = field(default_factory=dict)  # derived days column -> timeline text column
+    categories: Tuple[str, ...] = ()  # low-cardinality text columns
+
+
+TABLE_SPECS: Dict[str, TableSpec] = {
+    "allocated_materials_to_orders": TableSpec(
+        dates={"modified_date": ISO_DATE},
+        categories=("order_status", "plant", "supply_type", "material_comp_type", "trial_alias"),
+    ),
+    "available_inventory_report": TableSpec(
+        columns=(
+            "trial_name", "location", "investigator", "package_type_description",
+            "lot", "expiry_date", "packages_awaiting", "received_packages",
+            "packages_pending_ffu", "packages_pending_shipment", "shipped_packages",
+            "min_qty", "max_qty", "initial_qty",
+        ),
+        dates={"expiry_date": ISO_DATE},
+        categories=("trial_name", "location", "package_type_description"),
+    ),
+    "enrollment_rate_report": TableSpec(
+        columns=("trial_alias", "country", "site", "year", "months_data"),
+        categories=("trial_alias", "country"),
+    ),
+    "country_level_enrollment_report": TableSpec(
+        categories=("trial_alias", "country_name"),
+    ),
+    "re_evaluation": TableSpec(
+        columns=(
+            "re_eval_id", "created_date", "request_type", "sample_status",
+            "ly_number", "item_code", "lot_number", "target_date",
+            "sample_location", "analytical_lab", "analytical_rep_notified", "modified_date",
+        ),
+        dates={"created_date": ISO_DATE, "target_date": ISO_DATE, "modified_date": ISO_DATE},
+        categories=("request_type", "sample_status", "sample_location", "analytical_lab"),
+    ),
+    "rim": TableSpec(
+        dates={"approved_date_c": ISO_DATE, "lilly_receipt_date_c": ISO_DATE},
+        categories=("status_v",),
+    ),
+    "material_country_requirements": TableSpec(
+        columns=(
+            "client", "countries", "created_on", "ct_compound", "ct_label_group",
+            "ct_pack_type", "ct_pcn_group", "date_of_last_change", "material_number",
+            "name_of_person_who_changed", "time_of_creation", "trial_alias",
+        ),
+        dates={"created_on": ISO_DATE, "date_of_last_change": ISO_DATE},
+        categories=("client", "ct_pack_type", "trial_alias"),
+    ),
+    "ip_shipping_timelines_report": TableSpec(
+        timelines={"lead_time_days": "ip_timeline"},
+        categories=("country_name",),
+    ),
+    "distribution_order_report": TableSpec(
+        dates={"order_date": ISO_DATE, "requested_delivery_date": ISO_DATE, "actual_delivery_date": ISO_DATE},
+        categories=("status", "trial_alias"),
+    ),
+}
+
+
+def default_spec(columns) -> TableSpec:
+    """Spec for tables without a declared one: ISO dates in columns named *date*"""
+    return TableSpec(dates={column: ISO_DATE for column in columns if "date" in column})
+
+
+def parse_timeline_days(timelines: pd.Series) -> pd.Series:
+    """Vectorized lead-time extraction; NULL where no day count is present"""
+    days = timelines.astype("string").str.extract(TIMELINE_PATTERN, expand=False)
+    return pd.to_numeric(days, errors="coerce").astype("Int64")
+
+
+def apply_spec(df: pd.DataFrame, spec: TableSpec) -> pd.DataFrame:
+    """
+    Clean a chunk according to its table spec.
+
+    Columns named in the spec but absent from the chunk are ignored.
+
+    Args:
+        df: Raw chunk as read by pd.read_csv
+        spec: Table spec
+
+    Returns:
+        The cleaned chunk (modified in place)
+    """
+    if spec.columns is not None:
+        df.columns = list(spec.columns)
+
+    for column, date_format in spec.dates.items():
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column], format=date_format, errors="coerce")
+
+    for target, source in spec.timelines.items():
+        if source in df.columns:
+            df[target] = parse_timeline_days(df[source])
+
+    # Only text columns: numeric codes keep their numeric column type
+    for column in spec.categories:
+        if column in df.columns and df[column].dtype == object:
+            df[column] = df[column].astype("category")
+
+    return df
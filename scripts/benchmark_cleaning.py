@@ -0,0 +1,104 @@
+"""
+Benchmark the loader cleaning pass: legacy row-wise cleaning vs TABLE_SPECS
+
+Generates a synthetic extract (no database or CSV files needed), cleans it
+with the previous clean_dataframe/parse_timeline approach and with
+apply_spec, and prints rows per second for both.
+
+Usage:
+    python scripts/benchmark_cleaning.py --rows 200000
+"""
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import argparse
+import io
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from database.setup.table_specs import NULL_TOKENS, ISO_DATE, TableSpec, apply_spec
+
+
+SPEC = TableSpec(
+    dates={"order_date": ISO_DATE, "requested_delivery_date": ISO_DATE, "actual_delivery_date": ISO_DATE},
+    timelines={"lead_time_days": "ip_timeline"},
+    categories=("status", "country", "location"),
+)
+
+
+def make_extract(rows: int) -> str:
+    """Synthetic CSV resembling the order and shipping extracts"""
+    rng = np.random.default_rng(42)
+    dates = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 900, rows), unit="D")
+    date_text = dates.strftime("%Y-%m-%d").to_numpy(dtype=object)
+    date_text[rng.random(rows) < 0.05] = "N/A"
+    df = pd.DataFrame({
+        "order_number": [f"ORD-{i:08d}" for i in range(rows)],
+        "status": rng.choice(["Shipped", "Delivered", "Pending", "Cancelled"], rows),
+        "country": rng.choice(["DE", "FR", "US", "JP", "BR", "IN"], rows),
+        "location": rng.choice([f"Site {i}" for i in range(40)], rows),
+        "order_date": date_text,
+        "requested_delivery_date": date_text,
+        "actual_delivery_date": date_text,
+        "ip_timeline": rng.choice(["6 days door-to-door", "12 days", "1 day express", "TBD"], rows),
+        "quantity": rng.integers(1, 500, rows),
+    })
+    return df.to_csv(index=False)
+
+
+def legacy_parse_timeline(timeline_str):
+    match = re.search(r'(\d+)\s*days?', str(timeline_str))
+    return int(match.group(1)) if match else None
+
+
+def legacy_clean(df: pd.DataFrame) -> pd.DataFrame:
+    """The cleaning previously done by clean_dataframe and the loaders"""
+    df = df.replace('', None)
+    df = df.replace('NA', None)
+    df = df.replace('N/A', None)
+    for col in [col for col in df.columns if 'date' in col]:
+        df[col] = pd.to_datetime(df[col], errors='coerce')
+    df['lead_time_days'] = df['ip_timeline'].apply(legacy_parse_timeline)
+    return df.dropna(how='all')
+
+
+def spec_clean(df: pd.DataFrame) -> pd.DataFrame:
+    return apply_spec(df, SPEC).dropna(how='all')
+
+
+def bench(label: str, text: str, read_kwargs: dict, clean, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        df = clean(pd.read_csv(io.StringIO(text), **read_kwargs))
+        best = min(best, time.perf_counter() - start_time)
+    rows = len(df)
+    print(f"{label:<10} {best:>8.3f}s {rows / best:>14,.0f} rows/s  "
+          f"{df.memory_usage(deep=True).sum() / 1e6:>8.1f} MB in memory")
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark loader cleaning throughput")
+    parser.add_argument("--rows", type=int, default=200000, help="Rows in the synthetic extract")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per variant (best is reported)")
+    args = parser.parse_args(argv)
+
+    text = make_extract(args.rows)
+    print(f"Cleaning {args.rows} rows ({len(text) / 1e6:.1f} MB of CSV), best of {args.repeat}")
+    print("-" * 60)
+
+    legacy = bench("legacy", text, {}, legacy_clean, args.repeat)
+    spec = bench("spec", text, {"na_values": NULL_TOKENS}, spec_clean, args.repeat)
+
+    print("-" * 60)
+    print(f"Speedup: {legacy / spec:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark API response serialization: jsonable_encoder + json.dumps vs encode_json
+
+Builds rows shaped like /api/inventory/expiring and /api/enrollment/summary
+results (dates and Decimals included, no database needed), serializes them
+the way FastAPI does for a returned dict and with tools.result_stream's
+encode_json, checks both produce the same document and prints rows per
+second for each.
+
+Usage:
+    python scripts/benchmark_json.py --rows 50000
+"""
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import argparse
+import json
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+
+from tools.result_stream import ORJSON_AVAILABLE, encode_json
+
+
+def make_inventory(rows: int) -> dict:
+    """Synthetic /api/inventory/expiring payload"""
+    today = date.today()
+    items = [
+        {
+            "trial_name": f"Study {i % 40:03d}",
+            "location": ("DE", "FR", "US", "JP", "BR", "IN")[i % 6],
+            "lot": f"LOT-{i:07d}",
+            "package_type_description": "Kit",
+            "expiry_date": today + timedelta(days=i % 90 + 1),
+            "received_packages": Decimal(i % 500),
+            "days_until_expiry": i % 90 + 1,
+            "risk_level": ("CRITICAL", "HIGH", "MEDIUM")[i % 3],
+        }
+        for i in range(rows)
+    ]
+    return {"count": len(items), "items": items}
+
+
+def make_enrollment(rows: int) -> dict:
+    """Synthetic /api/enrollment/summary payload"""
+    items = [
+        {
+            "trial_alias": f"Study {i % 40:03d}",
+            "country_name": f"Country {i % 120}",
+            "enrollment_level": "Country",
+            "total_enrolled_forecast": Decimal(i % 700),
+            "total_enrolled_planned": Decimal(i % 650),
+            "total_enrolled_actual": Decimal(i % 600),
+            "enrollment_rate_monthly_actual": Decimal(f"{i % 50}.{i % 100:02d}"),
+            "enrollment_status": ("ACCELERATED", "SLOWER", "ON_TRACK")[i % 3],
+        }
+        for i in range(rows)
+    ]
+    return {"count": len(items), "enrollments": items}
+
+
+def fastapi_encode(payload: dict) -> bytes:
+    """What FastAPI does for a returned dict (serialize_response + JSONResponse)"""
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def bench(label: str, encode, payload: dict, rows: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        body = encode(payload)
+        best = min(best, time.perf_counter() - start_time)
+    print(f"  {label:<14} {best * 1000:>9.1f}ms {rows / best:>14,.0f} rows/s  {len(body) / 1e6:>6.1f} MB")
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark API response serialization")
+    parser.add_argument("--rows", type=int, default=50000, help="Rows per payload")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per variant (best is reported)")
+    args = parser.parse_args(argv)
+
+    encoder = "orjson" if ORJSON_AVAILABLE else "stdlib json (orjson not installed)"
+    print(f"Serializing {args.rows} rows, best of {args.repeat}; encode_json uses {encoder}")
+    print("-" * 64)
+
+    for name, payload in (("inventory/expiring", make_inventory(args.rows)),
+                          ("enrollment/summary", make_enrollment(args.rows))):
+        if json.loads(fastapi_encode(payload)) != json.loads(encode_json(payload)):
+            raise SystemExit(f"✗ {name}: encode_json output differs from the FastAPI encoding")
+        print(name)
+        legacy = bench("fastapi", fastapi_encode, payload, args.rows, args.repeat)
+        fast = bench("encode_json", encode_json, payload, args.rows, args.repeat)
+        print(f"  Speedup: {legacy / fast:.1f}x")
+
+    print("-" * 64)
+
+
+if __name__ == "__main__":
+    main()
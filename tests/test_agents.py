@@ -0,0 +1,166 @@
+"""
+Agent functionality tests (no database required)
+"""
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pytest
+from agents.config import AgentConfig
+from agents.scenario_strategist.chat_interface_simple import BULK_FEASIBILITY_SQL, ScenarioStrategistSimple
+from agents.supply_watchdog.run_monitoring_simple import SupplyWatchdogSimple
+from tools.sql_tools import AlertGeneratorTool
+from tools.entity_resolver import EntityIndex
+
+
+class FakeNamedCursor:
+    def __init__(self, rows, log):
+        self.rows = rows
+        self.log = log
+        self.itersize = None
+
+    def execute(self, query, params=None):
+        self.log.append((query, params))
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.log = []
+        self.cursor_names = []
+        self.closed = False
+
+    def cursor(self, name=None, cursor_factory=None):
+        self.cursor_names.append(name)
+        return FakeNamedCursor(self.rows, self.log)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def _row(ord, lot=None, re_eval_id=None):
+    return {
+        "ord": ord, "trial_name": "Study A" if lot else None, "location": "DE" if lot else None,
+        "lot": lot, "package_type_description": None, "expiry_date": None,
+        "re_eval_id": re_eval_id, "request_type": None, "sample_status": None, "target_date": None,
+    }
+
+
+def test_bulk_feasibility_answers_all_lots_with_one_query():
+    """Test that many lots cost one server-side cursor query and keep request order"""
+    conn = FakeConnection([_row(1, "LOT-1", "RE-9"), _row(2, "LOT-2"), _row(3)])
+    agent = ScenarioStrategistSimple.__new__(ScenarioStrategistSimple)
+    agent.get_db_connection = lambda: conn
+
+    results = list(agent.check_extension_feasibility_bulk(["lot-1", " LOT-2", "LOT-404"]))
+
+    assert conn.log == [(BULK_FEASIBILITY_SQL, {"lot_keys": ["lot-1", "lot-2", "lot-404"]})]
+    assert conn.cursor_names[0] is not None
+    assert conn.closed
+    assert [result["lot_number"] for result in results] == ["lot-1", " LOT-2", "LOT-404"]
+    assert results[0]["extension_history"]["re_eval_id"] == "RE-9"
+    assert results[1]["feasible"] and results[1]["extension_history"] is None
+    assert results[2] == {"lot_number": "LOT-404", "feasible": False, "reason": "Batch LOT-404 not found in inventory"}
+
+
+class FakeResolver:
+    def __init__(self, **values):
+        self.indexes = {kind: EntityIndex(kind_values) for kind, kind_values in values.items()}
+
+    def resolve(self, kind, term, limit=5):
+        return self.indexes[kind].resolve(term, limit)
+
+
+def _strategist(**values):
+    agent = ScenarioStrategistSimple.__new__(ScenarioStrategistSimple)
+    agent.resolver = FakeResolver(**values)
+    return agent
+
+
+def test_fuzzy_lot_match_is_only_a_suggestion():
+    """Test that a lot the user did not name is suggested, never answered for"""
+    agent = _strategist(lot=[f"LOT-{i:08d}" for i in range(11490, 11500)])
+
+    def not_expected(lot):
+        raise AssertionError(f"feasibility checked for {lot}")
+    agent.check_extension_feasibility = not_expected
+
+    answer = agent.ask("Can we extend batch LOT-00000000")
+
+    assert answer.startswith("❌ Batch LOT-00000000 not found in inventory")
+    assert "Did you mean" in answer
+    assert agent.resolve_entity("lot", "lot-00011498") == (["LOT-00011498"], [])
+    assert agent.resolve_entity("lot", "LOT-0001149")[0] == []  # ambiguous prefix
+
+
+def test_trial_prefix_answers_for_every_matching_trial():
+    """Test that a trial prefix covers all trials it completes to"""
+    agent = _strategist(trial=["ABC-1", "ABC-2", "XYZ-1"])
+    agent.get_trial_inventory_summary = lambda trial: [
+        {"trial_name": trial, "location": "DE", "batch_count": 1, "earliest_expiry": None, "latest_expiry": None}
+    ]
+
+    answer = agent.ask("Show inventory for ABC")
+
+    assert "INVENTORY SUMMARY FOR ABC-1" in answer and "INVENTORY SUMMARY FOR ABC-2" in answer
+    assert "XYZ-1" not in answer
+
+
+def test_watchdog_detects_all_risk_classes_in_one_query():
+    """Test that expiry and shortfall risks come bucketed from one untruncated query"""
+    expiring = [
+        {"lot": "LOT-1", "days_until_expiry": 5, "risk_level": "CRITICAL"},
+        {"lot": "LOT-2", "days_until_expiry": 70, "risk_level": "MEDIUM"},
+    ]
+    shortfalls = [{"trial_name": "Study A", "location": "DE", "total_batches": 2, "expiring_soon": 2}]
+    conn = FakeConnection([{
+        "expiry_risks": expiring,
+        "shortfall_risks": shortfalls,
+        "severity_breakdown": {"CRITICAL": 1, "MEDIUM": 1},
+    }])
+    agent = SupplyWatchdogSimple.__new__(SupplyWatchdogSimple)
+    agent.config = AgentConfig(expiry_critical_days=30, expiry_high_days=60, expiry_medium_days=90)
+    agent.alert_tool = AlertGeneratorTool()
+
+    risks = agent.detect_risks(conn)
+
+    [(query, params)] = conn.log
+    assert "WITH expiring AS" in query and "shortfalls AS" in query
+    assert "LIMIT" not in query
+    assert params == {"critical_days": 30, "high_days": 60, "medium_days": 90}
+    assert risks["expiry_risks"] == expiring and risks["shortfall_risks"] == shortfalls
+
+    alert = agent.generate_alert(risks["expiry_risks"], risks["shortfall_risks"], risks["severity_breakdown"])
+    assert alert["severity"] == "CRITICAL"
+    assert alert["metadata"]["severity_breakdown"] == {"CRITICAL": 1, "HIGH": 0, "MEDIUM": 1, "LOW": 0}
+
+
+
+def test_watchdog_announcement_survives_connection_failure(capsys):
+    """Test that a failed connect is reported instead of raising from the best-effort announcement"""
+    agent = SupplyWatchdogSimple.__new__(SupplyWatchdogSimple)
+
+    def unavailable():
+        raise ConnectionError("database is down")
+
+    agent.get_db_connection = unavailable
+    agent._announce_alert({"alert_id": "a"})
+
+    assert "Could not announce monitoring run: database is down" in capsys.readouterr().out
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,102 @@
+"""
+Placeholder conversion and streaming tests for the async query tool (no database required)
+"""
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import asyncio
+import pytest
+from tools.async_sql_tools import AsyncSQLQueryTool, convert_placeholders
+
+
+def test_named_placeholders_become_positional():
+    """Test that %(name)s maps to $n and repeated names share a slot"""
+    sql, args = convert_placeholders(
+        "SELECT * FROM t WHERE a = %(x)s AND b = %(y)s OR c = %(x)s",
+        {"x": 1, "y": "two"}
+    )
+
+    assert sql == "SELECT * FROM t WHERE a = $1 AND b = $2 OR c = $1"
+    assert args == [1, "two"]
+
+
+def test_positional_placeholders_and_escapes():
+    """Test %s sequences and the %% escape"""
+    sql, args = convert_placeholders("SELECT %s, 'a%%' WHERE x ILIKE %s", ("v", "%lot%"))
+
+    assert sql == "SELECT $1, 'a%' WHERE x ILIKE $2"
+    assert args == ["v", "%lot%"]
+
+
+def test_missing_named_parameter_raises():
+    """Test that a missing parameter fails before hitting the database"""
+    with pytest.raises(KeyError):
+        convert_placeholders("SELECT %(missing)s", {})
+
+
+
+class _FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.fetch_sizes = []
+
+    async def fetch(self, n):
+        self.fetch_sizes.append(n)
+        batch, self.rows = self.rows[:n], self.rows[n:]
+        return batch
+
+
+class _FakeContext:
+    def __init__(self, value=None):
+        self.value = value
+
+    async def __aenter__(self):
+        return self.value
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _FakeConnection:
+    def __init__(self, rows):
+        self.cursor_obj = _FakeCursor(rows)
+        self.calls = []
+
+    def transaction(self, readonly=False):
+        self.calls.append(("transaction", readonly))
+        return _FakeContext()
+
+    async def cursor(self, sql, *args):
+        self.calls.append(("cursor", sql, args))
+        return self.cursor_obj
+
+
+class _FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def acquire(self, timeout=None):
+        return _FakeContext(self.conn)
+
+
+def test_stream_query_yields_batches_from_server_side_cursor():
+    """Test that rows arrive batch by batch from one read-only cursor"""
+    conn = _FakeConnection([{"lot": f"LOT-{i}"} for i in range(5)])
+    tool = AsyncSQLQueryTool("postgresql://unused")
+    tool._pool = _FakePool(conn)
+
+    async def collect():
+        return [batch async for batch in tool.stream_query("SELECT lot FROM t WHERE d <= %(days)s", {"days": 9}, 2)]
+
+    batches = asyncio.run(collect())
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert batches[2] == [{"lot": "LOT-4"}]
+    assert conn.calls == [("transaction", True), ("cursor", "SELECT lot FROM t WHERE d <= $1", (9,))]
+    assert conn.cursor_obj.fetch_sizes == [2, 2, 2, 2]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,127 @@
+"""
+Loader ingest tests: chunked COPY, delta merge, shadow swap and cleaning specs
+(no database required)
+"""
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pandas as pd
+import pytest
+from database.setup.bulk_copy import copy_chunks, widen_type
+from database.setup.delta_load import merge_statements
+from database.setup.shadow_swap import swap_statements
+from database.setup.table_specs import ISO_DATE, TableSpec, apply_spec
+
+
+class FakeCursor:
+    def __init__(self, log):
+        self.log = log
+
+    def execute(self, statement, params=None):
+        self.log.append(("execute", statement))
+
+    def copy_expert(self, statement, stream):
+        self.log.append(("copy", stream.read().decode("utf-8")))
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.log = []
+        self.committed = False
+
+    def cursor(self):
+        return FakeCursor(self.log)
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        self.log.append(("rollback", None))
+
+
+def test_widen_type():
+    """Test that column types only ever widen"""
+    assert widen_type(None, "BIGINT") == "BIGINT"
+    assert widen_type("BIGINT", None) == "BIGINT"
+    assert widen_type("BIGINT", "DOUBLE PRECISION") == "DOUBLE PRECISION"
+    assert widen_type("DOUBLE PRECISION", "BIGINT") == "DOUBLE PRECISION"
+    assert widen_type("TIMESTAMP", "BIGINT") == "TEXT"
+
+
+def test_copy_chunks_widens_table_for_later_chunks():
+    """Test that each chunk is copied and later dtypes widen the table"""
+    conn = FakeConnection()
+    chunks = iter([
+        pd.DataFrame({"lot": ["A", "B"], "qty": [1, 2], "note": [None, None]}),
+        pd.DataFrame({"lot": ["C"], "qty": [2.5], "note": [7]}),
+    ])
+
+    stats = copy_chunks(conn, chunks, "inventory")
+
+    statements = [entry for kind, entry in conn.log if kind == "execute"]
+    copies = [entry for kind, entry in conn.log if kind == "copy"]
+    assert stats.rows == 3
+    assert conn.committed
+    assert len(copies) == 2
+    assert 'DROP TABLE IF EXISTS "inventory";' in statements[0]
+    assert '"id" BIGSERIAL' in statements[1] and '"qty" BIGINT' in statements[1]
+    assert 'ALTER COLUMN "qty" TYPE DOUBLE PRECISION' in statements[2]
+    assert 'ALTER COLUMN "note" TYPE BIGINT USING NULL::BIGINT' in statements[3]
+
+
+def test_merge_statements_match_on_natural_key():
+    """Test that delta merges join on the key and fingerprint only data columns"""
+    steps = merge_statements(
+        "available_inventory_report", "_stage", ["lot", "location", "qty", "deleted_at"], ("lot", "location")
+    )
+
+    assert list(steps) == ["drop_null_keys", "dedupe", "fingerprint", "analyze", "update", "insert", "soft_delete"]
+    assert 't."lot" = s."lot" AND t."location" = s."location"' in steps["update"]
+    assert 'ROW(s."lot", s."location", s."qty")' in steps["fingerprint"]
+    assert "deleted_at = NULL" in steps["update"]
+    assert "SET deleted_at = CURRENT_TIMESTAMP" in steps["soft_delete"]
+
+
+def test_swap_statements_rename_shadow_and_indexes():
+    """Test that the swap drops the live table before taking over its names"""
+    statements = swap_statements("rim", ["idx_rim_ly"])
+
+    assert statements[0].startswith("SET LOCAL lock_timeout")
+    assert statements[1] == 'DROP TABLE IF EXISTS "rim";'
+    assert statements[2] == 'ALTER TABLE "rim__shadow" RENAME TO "rim";'
+    assert statements[3] == 'ALTER INDEX "idx_rim_ly__shadow" RENAME TO "idx_rim_ly";'
+
+
+def test_apply_spec_cleans_dates_timelines_and_categories():
+    """Test that a table spec renames, parses and categorizes in one pass"""
+    spec = TableSpec(
+        columns=("ship_date", "ip_timeline", "country", "site"),
+        dates={"ship_date": ISO_DATE},
+        timelines={"lead_time_days": "ip_timeline"},
+        categories=("country", "site"),
+    )
+    df = pd.DataFrame({
+        "Ship Date": ["2025-12-15", "not a date"],
+        "Timeline": ["6 days door-to-door", "TBD"],
+        "Country": ["DE", "FR"],
+        "Site": [101, 102],
+    })
+
+    cleaned = apply_spec(df, spec)
+
+    assert list(cleaned.columns) == ["ship_date", "ip_timeline", "country", "site", "lead_time_days"]
+    assert cleaned["ship_date"].iloc[0] == pd.Timestamp("2025-12-15")
+    assert pd.isna(cleaned["ship_date"].iloc[1])
+    assert cleaned["lead_time_days"].tolist()[0] == 6
+    assert pd.isna(cleaned["lead_time_days"].iloc[1])
+    assert cleaned["country"].dtype == "category"
+    assert cleaned["site"].dtype == "int64"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
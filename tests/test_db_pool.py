@@ -0,0 +1,186 @@
+"""
+Connection pool behaviour tests (no database required)
+"""
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import time
+import pytest
+from psycopg2 import extensions
+from tools.db_pool import ConnectionPool, PoolExhaustedError
+from tools.sql_tools import SQLQueryTool
+
+
+class FakeConnection:
+    """Minimal stand-in for a psycopg2 connection"""
+
+    def __init__(self):
+        self.closed = 0
+        self.rollbacks = 0
+        self.in_transaction = False
+
+    def get_transaction_status(self):
+        if self.in_transaction:
+            return extensions.TRANSACTION_STATUS_INTRANS
+        return extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = 1
+
+
+class FakeNamedCursor:
+    """Server-side cursor stand-in that serves rows through fetchmany"""
+
+    def __init__(self, conn, name):
+        self.conn = conn
+        self.name = name
+        self.itersize = None
+        self.fetch_sizes = []
+
+    def execute(self, query, params=None):
+        self.conn.in_transaction = True
+
+    def fetchmany(self, size):
+        self.fetch_sizes.append(size)
+        batch, self.conn.rows = self.conn.rows[:size], self.conn.rows[size:]
+        return batch
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class StreamingConnection(FakeConnection):
+    """FakeConnection with named cursors and psycopg2's transaction block"""
+
+    def __init__(self, rows):
+        super().__init__()
+        self.rows = rows
+        self.cursors = []
+
+    def cursor(self, name=None, cursor_factory=None):
+        cursor = FakeNamedCursor(self, name)
+        self.cursors.append(cursor)
+        return cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # psycopg2 commits a clean block and rolls back one left by an exception
+        if exc_type is None:
+            self.in_transaction = False
+        else:
+            self.rollback()
+        return False
+
+
+def make_pool(**options):
+    created = []
+
+    def connect(_conn_string):
+        conn = FakeConnection()
+        created.append(conn)
+        return conn
+
+    return ConnectionPool("postgresql://test", connect=connect, **options), created
+
+
+def test_connections_are_reused():
+    """Test that a released connection is handed out again"""
+    pool, created = make_pool(max_size=2)
+
+    conn = pool.acquire()
+    first = conn.raw
+    conn.close()
+
+    with pool.connection() as conn:
+        assert conn.raw is first
+
+    assert len(created) == 1
+    assert pool.stats()["acquired"] == 2
+
+
+def test_acquire_times_out_when_exhausted():
+    """Test that checkouts beyond max_size fail after the timeout"""
+    pool, _ = make_pool(max_size=1)
+
+    held = pool.acquire()
+    with pytest.raises(PoolExhaustedError):
+        pool.acquire(timeout=0.05)
+
+    held.close()
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_open_transaction_is_rolled_back_on_release():
+    """Test that connections never return to the pool mid-transaction"""
+    pool, created = make_pool()
+
+    conn = pool.acquire()
+    conn.raw.in_transaction = True
+    conn.close()
+
+    assert created[0].rollbacks == 1
+    assert pool.stats()["idle"] == 1
+
+
+def test_connections_past_max_lifetime_are_recycled():
+    """Test that old connections are closed instead of reused"""
+    pool, created = make_pool(max_lifetime_seconds=0.01)
+
+    conn = pool.acquire()
+    time.sleep(0.02)
+    conn.close()
+
+    assert created[0].closed
+    assert pool.stats()["size"] == 0
+    assert pool.stats()["recycled_lifetime"] == 1
+
+
+def test_idle_connections_above_min_size_are_reaped():
+    """Test that idle reaping keeps min_size connections open"""
+    pool, created = make_pool(min_size=1, max_size=3, max_idle_seconds=0.01)
+
+    conns = [pool.acquire() for _ in range(3)]
+    for conn in conns:
+        conn.close()
+    time.sleep(0.02)
+
+    assert pool.reap_idle() == 2
+    assert pool.stats()["size"] == 1
+    assert sum(conn.closed for conn in created) == 2
+
+
+
+def test_stream_query_batches_and_releases_connection_when_closed_early():
+    """Test that streaming uses one named cursor in batches and a closed stream rolls back and frees its connection"""
+    conn = StreamingConnection([{"lot": f"LOT-{i}"} for i in range(5)])
+    tool = SQLQueryTool.__new__(SQLQueryTool)
+    tool.pool = ConnectionPool("postgresql://test", connect=lambda _conn_string: conn)
+
+    stream = tool.stream_query("SELECT lot FROM t", batch_rows=2)
+    first = next(stream)
+    stream.close()
+
+    [cursor] = conn.cursors
+    assert cursor.name and cursor.name.startswith("stream_")
+    assert cursor.itersize == 2 and cursor.fetch_sizes == [2]
+    assert first == [{"lot": "LOT-0"}, {"lot": "LOT-1"}]
+    assert conn.rollbacks == 1
+    assert tool.pool.stats()["in_use"] == 0 and tool.pool.stats()["idle"] == 1
+
+    assert [len(batch) for batch in tool.stream_query("SELECT lot FROM t", batch_rows=2)] == [2, 1]
+    assert tool.pool.stats()["in_use"] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
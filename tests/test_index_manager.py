@@ -0,0 +1,152 @@
+"""
+Load-time index management tests (no database required)
+"""
+
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pytest
+from database.setup.create_tables_actual import create_index_sql, index_column_names
+from database.setup.index_manager import (
+    build_indexes, check_indexes, IndexDriftError, loader_pool_size, verify_indexes
+)
+
+
+DECLARED = {
+    "available_inventory_report": [
+        ("idx_inv_expiry", "expiry_date"),
+        ("idx_inv_lot_location", "lot, location"),
+        ("idx_inv_trial", "trial_name"),
+        ("idx_inv_lot_trgm", "USING gin (lot gin_trgm_ops)"),
+    ],
+    "rim": [("idx_rim_status", "status_v")],
+    "country_level_enrollment_report": [
+        ("idx_country_enroll_page", "COALESCE(trial_alias, ''), COALESCE(country_name, ''), id"),
+    ],
+}
+
+
+class ScriptedCursor:
+    """Returns the next scripted result set for each query"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, statement, params=None):
+        self.conn.statements.append(statement)
+
+    def fetchall(self):
+        return self.conn.results.pop(0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class ScriptedConnection:
+    def __init__(self, results=()):
+        self.results = list(results)
+        self.statements = []
+        self.commits = 0
+
+    def cursor(self):
+        return ScriptedCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_verify_indexes_reports_missing_and_changed_indexes():
+    """Test that drift is reported per index and absent tables are ignored"""
+    conn = ScriptedConnection([
+        [
+            ("available_inventory_report", "idx_inv_expiry",
+             "CREATE INDEX idx_inv_expiry ON public.available_inventory_report USING btree (expiry_date)"),
+            ("available_inventory_report", "idx_inv_lot_location",
+             "CREATE INDEX idx_inv_lot_location ON public.available_inventory_report USING btree (lot)"),
+            ("available_inventory_report", "idx_inv_lot_trgm",
+             "CREATE INDEX idx_inv_lot_trgm ON public.available_inventory_report USING gin (lot gin_trgm_ops)"),
+        ],
+        [("available_inventory_report",)],
+    ])
+
+    problems = verify_indexes(conn, ["available_inventory_report", "rim"], DECLARED)
+
+    assert problems == [
+        "available_inventory_report.idx_inv_lot_location is "
+        "'CREATE INDEX idx_inv_lot_location ON public.available_inventory_report USING btree (lot)', "
+        "expected (lot, location)",
+        "available_inventory_report.idx_inv_trial is missing",
+    ]
+
+
+def test_create_index_sql_supports_access_methods():
+    """Test that trigram specs become GIN indexes and plain column lists stay B-trees"""
+    assert create_index_sql("idx_inv_lot_trgm", "inv", "USING gin (lot gin_trgm_ops)") == (
+        "CREATE INDEX IF NOT EXISTS idx_inv_lot_trgm ON inv USING gin (lot gin_trgm_ops);"
+    )
+    assert create_index_sql("idx_inv_lot_key", "inv", "lot_key text_pattern_ops") == (
+        "CREATE INDEX IF NOT EXISTS idx_inv_lot_key ON inv(lot_key text_pattern_ops);"
+    )
+
+
+def test_expression_indexes_match_and_name_their_columns():
+    """Test that pg_indexes' typed literals still match the declared expression and columns are found inside it"""
+    conn = ScriptedConnection([
+        [
+            ("country_level_enrollment_report", "idx_country_enroll_page",
+             "CREATE INDEX idx_country_enroll_page ON public.country_level_enrollment_report USING btree "
+             "(COALESCE(trial_alias, ''::text), COALESCE(country_name, ''::character varying), id)"),
+        ],
+        [("country_level_enrollment_report",)],
+    ])
+
+    assert verify_indexes(conn, ["country_level_enrollment_report"], DECLARED) == []
+    assert index_column_names("trial_key text_pattern_ops, COALESCE(expiry_date, 'infinity'), id") == [
+        "trial_key", "expiry_date", "id"
+    ]
+
+
+def test_check_indexes_raises_on_drift():
+    """Test that a missing declared index fails loudly"""
+    conn = ScriptedConnection([[], [("available_inventory_report",)]])
+
+    with pytest.raises(IndexDriftError, match="idx_inv_expiry is missing"):
+        check_indexes(conn, ["available_inventory_report"])
+
+
+def test_build_indexes_uses_one_connection_per_index():
+    """Test that each index is built and committed on its own borrowed connection"""
+    connections = []
+
+    @contextmanager
+    def connect():
+        conn = ScriptedConnection()
+        connections.append(conn)
+        yield conn
+
+    built = build_indexes(
+        connect, "rim__shadow", [("idx_rim_status", "status_v"), ("idx_rim_country", "country_v")],
+        max_workers=2, name_suffix="__shadow"
+    )
+
+    assert built == ["idx_rim_status", "idx_rim_country"]
+    assert len(connections) == 2
+    assert all(conn.commits == 1 for conn in connections)
+    statements = sorted(conn.statements[0] for conn in connections)
+    assert statements[1] == 'CREATE INDEX IF NOT EXISTS "idx_rim_status__shadow" ON "rim__shadow"(status_v);'
+
+
+def test_loader_pool_covers_every_loader_building_indexes():
+    """Test that the pool holds each loader's connection plus its index builders"""
+    assert loader_pool_size(4, 2) == 12
+    assert loader_pool_size(1, 2) == 3
+    assert loader_pool_size(3, 0) == 6
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,101 @@
+"""
+Live update broadcaster tests (no database required)
+"""
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import asyncio
+import pytest
+from tools.live_updates import LiveUpdates, diff_state
+
+
+class _StateSource:
+    def __init__(self, *states):
+        self.states = list(states)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return self.states[min(self.calls, len(self.states)) - 1]
+
+
+def test_diff_state_reports_changed_and_removed_sections():
+    """Test that only sections whose value changed are included"""
+    changed, removed = diff_state(
+        {"risks": {"critical": 1}, "inventory": {"total": 5}, "old": 1},
+        {"risks": {"critical": 2}, "inventory": {"total": 5}, "latest_alert": {"alert_id": "a"}}
+    )
+
+    assert changed == {"risks": {"critical": 2}, "latest_alert": {"alert_id": "a"}}
+    assert removed == ["old"]
+
+
+def test_subscribers_get_snapshot_then_diffs():
+    """Test that a new subscriber is primed with a snapshot and later sees only changes"""
+    source = _StateSource({"risks": 1, "orders": []}, {"risks": 2, "orders": []}, {"risks": 2, "orders": []})
+
+    async def scenario():
+        live = LiveUpdates(source, refresh_seconds=0)
+        first, second = await live.subscribe(), await live.subscribe()
+        diff = await live.refresh()
+        unchanged = await live.refresh()
+        messages = [first.get_nowait(), first.get_nowait(), second.get_nowait(), second.get_nowait()]
+        await live.close()
+        return diff, unchanged, messages, first.empty()
+
+    diff, unchanged, messages, drained = asyncio.run(scenario())
+
+    assert source.calls == 3  # one shared build for both subscribers, then two refreshes
+    assert unchanged is None
+    assert diff["changed"] == {"risks": 2} and diff["removed"] == []
+    assert messages[0]["type"] == "snapshot" and messages[0]["state"] == {"risks": 1, "orders": []}
+    assert messages[1] is diff and messages[3] is diff
+    assert drained
+
+
+def test_slow_subscriber_is_resynced_with_a_snapshot():
+    """Test that a full queue is replaced by one snapshot instead of blocking the producer"""
+    source = _StateSource(*({"risks": i} for i in range(5)))
+
+    async def scenario():
+        live = LiveUpdates(source, queue_size=2, refresh_seconds=0)
+        queue = await live.subscribe()
+        for _ in range(3):
+            await live.refresh()
+        messages = [queue.get_nowait() for _ in range(queue.qsize())]
+        await live.close()
+        return live, messages
+
+    live, messages = asyncio.run(scenario())
+
+    assert [message["type"] for message in messages] == ["snapshot", "diff"]
+    assert messages[0]["state"] == {"risks": 2}
+    assert messages[1]["changed"] == {"risks": 3}
+    assert live.stats()["resyncs"] == 1
+
+
+def test_burst_of_triggers_rebuilds_once():
+    """Test that events arriving together cause a single rebuild and broadcast"""
+    source = _StateSource({"risks": 1}, {"risks": 2})
+
+    async def scenario():
+        live = LiveUpdates(source, refresh_seconds=0, debounce_seconds=0.01)
+        queue = await live.subscribe()
+        queue.get_nowait()
+        for _ in range(5):
+            live.trigger(["available_inventory_report"])
+        message = await asyncio.wait_for(queue.get(), timeout=1)
+        await asyncio.sleep(0.05)
+        await live.close()
+        return message
+
+    message = asyncio.run(scenario())
+
+    assert message["changed"] == {"risks": 2}
+    assert source.calls == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
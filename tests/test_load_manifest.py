@@ -0,0 +1,50 @@
+"""
+Load manifest tests (no database required)
+"""
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import os
+import pytest
+from database.setup.load_manifest import LoadManifest
+
+
+def test_unchanged_file_is_detected_across_runs(tmp_path):
+    """Test that a recorded file compares as unchanged, even after a touch"""
+    csv_path = tmp_path / "rim.csv"
+    csv_path.write_text("a,b\n1,2\n")
+    manifest = LoadManifest(tmp_path / "manifest.json")
+
+    unchanged, fingerprint = manifest.compare("rim", csv_path)
+    assert not unchanged
+    manifest.record("rim", csv_path, fingerprint, rows=1)
+
+    stat = csv_path.stat()
+    os.utime(csv_path, (stat.st_atime, stat.st_mtime + 60))
+    reloaded = LoadManifest(tmp_path / "manifest.json")
+    unchanged, _ = reloaded.compare("rim", csv_path)
+
+    assert unchanged
+    assert reloaded.entry("rim")["rows"] == 1
+    assert reloaded.entry("rim")["mtime"] == stat.st_mtime + 60
+
+
+def test_changed_content_triggers_reload(tmp_path):
+    """Test that new content with the same size is not skipped"""
+    csv_path = tmp_path / "rim.csv"
+    csv_path.write_text("a,b\n1,2\n")
+    manifest = LoadManifest(tmp_path / "manifest.json")
+    manifest.record("rim", csv_path, manifest.compare("rim", csv_path)[1], rows=1)
+
+    csv_path.write_text("a,b\n3,4\n")
+    os.utime(csv_path, (0, 0))
+    unchanged, fingerprint = manifest.compare("rim", csv_path)
+
+    assert not unchanged
+    assert fingerprint.sha256 != manifest.entry("rim")["sha256"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
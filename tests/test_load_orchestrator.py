@@ -0,0 +1,69 @@
+"""
+Parallel load orchestrator tests (no database required)
+"""
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import threading
+import time
+import pytest
+from database.setup.load_orchestrator import LoadJob, run_load_jobs, validate_jobs
+
+
+def test_independent_jobs_run_concurrently():
+    """Test that independent loads overlap on the worker pool"""
+    barrier = threading.Barrier(3, timeout=2)
+    jobs = [LoadJob(name, barrier.wait) for name in ("a", "b", "c")]
+
+    results = run_load_jobs(jobs, max_workers=3)
+
+    assert all(result.status == "success" for result in results.values())
+
+
+def test_dependents_wait_for_their_dependencies():
+    """Test that a rebuild only starts after the load it depends on"""
+    finished = []
+
+    def load():
+        time.sleep(0.05)
+        finished.append("load")
+
+    def rebuild():
+        assert finished == ["load"]
+        return "rebuilt"
+
+    results = run_load_jobs([LoadJob("rebuild", rebuild, ("load",)), LoadJob("load", load)])
+
+    assert results["rebuild"].status == "success"
+    assert results["rebuild"].result == "rebuilt"
+
+
+def test_failed_dependency_skips_dependents_transitively():
+    """Test failure propagation through the dependency graph"""
+    def broken():
+        raise RuntimeError("bad csv")
+
+    results = run_load_jobs([
+        LoadJob("load", broken),
+        LoadJob("index", lambda: None, ("load",)),
+        LoadJob("snapshot", lambda: None, ("index",)),
+        LoadJob("other", lambda: None),
+    ])
+
+    assert results["load"].status == "failed"
+    assert results["load"].error == "bad csv"
+    assert results["index"].status == "skipped"
+    assert results["snapshot"].status == "skipped"
+    assert results["other"].status == "success"
+
+
+def test_dependency_cycles_are_rejected():
+    """Test that cyclic graphs fail before anything runs"""
+    with pytest.raises(ValueError):
+        validate_jobs([LoadJob("a", lambda: None, ("b",)), LoadJob("b", lambda: None, ("a",))])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
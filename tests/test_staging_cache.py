@@ -0,0 +1,58 @@
+"""
+Parquet staging cache tests (no database required)
+"""
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pandas as pd
+import pytest
+from database.setup.staging_cache import read_staged, staged_chunks
+from database.setup.table_specs import ISO_DATE, TableSpec, apply_spec
+
+pytest.importorskip("pyarrow")
+
+SPEC = TableSpec(dates={"expiry_date": ISO_DATE}, categories=("location",))
+
+
+def _reader(csv_path, calls):
+    def read_source():
+        calls.append(csv_path.name)
+        return (apply_spec(chunk, SPEC) for chunk in pd.read_csv(csv_path, chunksize=2))
+    return read_source
+
+
+def test_second_load_reads_staged_parquet(tmp_path):
+    """Test that an unchanged CSV is parsed once and then served from Parquet"""
+    csv_path = tmp_path / "inventory.csv"
+    csv_path.write_text("lot,location,expiry_date\nA,DE,2025-12-15\nB,FR,2026-01-10\nC,DE,\n")
+    calls = []
+
+    first = pd.concat(staged_chunks("inventory", csv_path, SPEC, _reader(csv_path, calls), tmp_path / "stage"))
+    second = list(staged_chunks("inventory", csv_path, SPEC, _reader(csv_path, calls), tmp_path / "stage"))
+
+    assert calls == ["inventory.csv"]
+    assert len(second) == 2
+    staged = read_staged("inventory", staging_dir=tmp_path / "stage")
+    pd.testing.assert_frame_equal(staged, first.reset_index(drop=True))
+    assert second[0]["location"].dtype == "category"
+    assert str(second[0]["expiry_date"].dtype).startswith("datetime64")
+
+
+def test_changed_csv_is_restaged(tmp_path):
+    """Test that new CSV content bypasses the stale staged copy"""
+    csv_path = tmp_path / "inventory.csv"
+    csv_path.write_text("lot,location,expiry_date\nA,DE,2025-12-15\n")
+    calls = []
+    list(staged_chunks("inventory", csv_path, SPEC, _reader(csv_path, calls), tmp_path / "stage"))
+
+    csv_path.write_text("lot,location,expiry_date\nA,DE,2025-12-15\nB,FR,2026-01-10\n")
+    list(staged_chunks("inventory", csv_path, SPEC, _reader(csv_path, calls), tmp_path / "stage"))
+
+    assert calls == ["inventory.csv", "inventory.csv"]
+    assert len(read_staged("inventory", staging_dir=tmp_path / "stage")) == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,289 @@
+"""
+Tool function tests (no database required)
+"""
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import json
+import time
+from datetime import date
+from decimal import Decimal
+import pytest
+from agents.config import AgentConfig
+from tools.sql_tools import ExpiryBucketAggregator
+from tools.response_cache import ResponseCache, content_etag
+from tools.http_compression import ENCODINGS, choose_encoding, compress
+from tools.text_search import match_tiers, tiered_fetch
+from tools.entity_resolver import EntityIndex, EntityResolver
+from tools.result_stream import RowEncoder, encode_json
+from tools.keyset import InvalidPageToken, Keyset, explain_rows
+from tools.expiry_snapshot import SNAPSHOT_META_TABLE, STALE_CHECK_SQL, refresh_statements
+
+
+def test_expiry_buckets_use_configured_thresholds():
+    """Test that bucket edges come from the expiry_*_days settings"""
+    config = AgentConfig(expiry_critical_days=7, expiry_high_days=14, expiry_medium_days=21)
+    query, params = ExpiryBucketAggregator(config).build_query()
+
+    assert params == {"critical_days": 7, "high_days": 14, "medium_days": 21}
+    assert "%(critical_days)s" in query
+    assert "INTERVAL '30 days'" not in query
+    assert query.count("FROM available_inventory_report") == 1
+
+
+def test_expiry_buckets_grouping_and_filters():
+    """Test grouped aggregation with output filters"""
+    query, _ = ExpiryBucketAggregator(AgentConfig()).build_query(
+        group_by=["trial_name", "location"],
+        where="live_count > 0",
+        order_by="critical_count DESC",
+        limit=5
+    )
+
+    assert "GROUP BY trial_name, location" in query
+    assert "WHERE live_count > 0" in query
+    assert "LIMIT 5" in query
+
+
+def test_expiry_buckets_reject_unknown_group_column():
+    """Test that group-by columns are whitelisted"""
+    with pytest.raises(ValueError):
+        ExpiryBucketAggregator(AgentConfig()).build_query(group_by=["lot; DROP TABLE x"])
+
+
+def test_snapshot_staleness_comes_from_the_refresh_marker():
+    """Test that a refresh records its date and staleness reads that marker, not the snapshot rows"""
+    statements = [sql for sql, _ in refresh_statements(AgentConfig())]
+
+    assert SNAPSHOT_META_TABLE in statements[0]
+    assert "ON CONFLICT" in statements[-2] and "refreshed_on" in statements[-2]
+    assert statements[-1].lstrip().startswith("INSERT INTO inventory_expiry_snapshot (")
+    assert SNAPSHOT_META_TABLE in STALE_CHECK_SQL and "MAX(snapshot_date)" not in STALE_CHECK_SQL
+
+
+def test_response_cache_ttl_and_lru_eviction():
+    """Test that entries expire by TTL and the oldest is evicted when full"""
+    cache = ResponseCache(max_entries=2, ttl_seconds=0.05)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    cache.get("a")
+    cache.set("c", b"3")
+
+    assert cache.get("b") is None
+    assert cache.get("a").body == b"1"
+
+    time.sleep(0.06)
+    assert cache.get("a") is None
+
+
+def test_response_cache_invalidates_by_table_tag():
+    """Test that a reload only drops responses built from that table"""
+    cache = ResponseCache()
+    first = cache.set("/api/trials", b"[]", tags=["available_inventory_report"])
+    cache.set("/api/countries", b"[]", tags=["country_level_enrollment_report"])
+
+    assert cache.invalidate(["available_inventory_report"]) == 1
+    assert cache.get("/api/trials") is None
+    assert cache.get("/api/countries") is not None
+    assert first.etag == cache.set("/api/trials", b"[]").etag
+
+
+def test_response_cache_keeps_explicit_etag():
+    """Test that a caller-supplied ETag (computed without volatile fields) is kept"""
+    cache = ResponseCache()
+    stable = content_etag(b'{"count":1}')
+
+    first = cache.set("/api/dashboard", b'{"count":1,"last_updated":"10:00"}', etag=stable)
+    second = cache.set("/api/dashboard", b'{"count":1,"last_updated":"10:01"}', etag=stable)
+
+    assert first.etag == second.etag == stable
+    assert second.last_modified == first.last_modified
+
+
+def test_choose_encoding_honours_q_values():
+    """Test that Accept-Encoding negotiation picks an accepted, supported coding"""
+    assert choose_encoding(None) is None
+    assert choose_encoding("identity") is None
+    assert choose_encoding("gzip;q=0, deflate") is None
+    assert choose_encoding("deflate, gzip;q=0.5") == "gzip"
+    assert choose_encoding("*") == ENCODINGS[0]
+    if "br" in ENCODINGS:
+        assert choose_encoding("gzip, deflate, br") == "br"
+        assert choose_encoding("br;q=0.1, gzip") == "gzip"
+
+    import gzip
+    body = b'{"items":[' + b'{"lot":"LOT-1"},' * 200 + b'{}]}'
+    assert gzip.decompress(compress(body, "gzip")) == body
+    assert len(compress(body, "gzip")) < len(body) / 10
+
+
+
+class _TierCursor:
+    def __init__(self, rows_by_tier):
+        self.rows_by_tier = list(rows_by_tier)
+        self.executed = []
+
+    def execute(self, query, params):
+        self.executed.append((query, params))
+
+    def fetchall(self):
+        return self.rows_by_tier[len(self.executed) - 1]
+
+
+def test_match_tiers_normalize_and_escape_terms():
+    """Test that lookups go exact, prefix, fuzzy with LIKE wildcards escaped"""
+    tiers = match_tiers("lot_key", "lot", " LOT_12% ")
+
+    assert [tier for tier, _, _ in tiers] == ["exact", "prefix", "fuzzy"]
+    assert tiers[0][1:] == ("lot_key = %(term)s", {"term": "lot_12%"})
+    assert tiers[1][1:] == ("lot_key LIKE %(term)s", {"term": "lot\\_12\\%%"})
+    assert tiers[2][1:] == ("lot ILIKE %(term)s", {"term": "%LOT\\_12\\%%"})
+
+
+def test_tiered_fetch_stops_at_first_tier_with_rows():
+    """Test that fuzzy matching only runs when exact and prefix find nothing"""
+    query = "SELECT lot FROM available_inventory_report WHERE {match} LIMIT 1;"
+
+    cursor = _TierCursor([[("LOT-1",)]])
+    assert tiered_fetch(cursor, query, "lot_key", "lot", "lot-1") == ("exact", [("LOT-1",)])
+    assert cursor.executed == [(query.format(match="lot_key = %(term)s"), {"term": "lot-1"})]
+
+    cursor = _TierCursor([[], [], [("XLOT-1",)]])
+    assert tiered_fetch(cursor, query, "lot_key", "lot", "lot-1")[0] == "fuzzy"
+    assert "lot ILIKE %(term)s" in cursor.executed[2][0]
+
+
+
+def test_entity_index_ranks_exact_prefix_then_fuzzy():
+    """Test that resolution prefers exact keys, then shortest completions, then trigram similarity"""
+    index = EntityIndex(["LOT-1001", "LOT-10015", "LOT-2002", "Study ABC-101", "Germany"])
+
+    assert [(m.value, m.tier) for m in index.resolve(" lot-1001 ")] == [("LOT-1001", "exact")]
+    assert [m.value for m in index.resolve("lot-100")] == ["LOT-1001", "LOT-10015"]
+    assert index.resolve("germny")[0].value == "Germany"
+    assert index.resolve("germny")[0].tier == "fuzzy"
+    assert index.resolve("zzz") == []
+
+
+def test_entity_resolver_reloads_only_invalidated_kinds():
+    """Test that values are loaded once and reloaded after a reload of their source table"""
+    loads = []
+
+    class Cursor:
+        def execute(self, query):
+            loads.append(query)
+
+        def fetchall(self):
+            return [("LOT-1",)] if "lot" in loads[-1] else [("Germany",)]
+
+        def close(self):
+            pass
+
+    class Connection:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def cursor(self):
+            return Cursor()
+
+    sources = {"lot": ("SELECT lot", ("available_inventory_report",)), "country": ("SELECT country", ("rim",))}
+    resolver = EntityResolver(Connection, sources)
+
+    assert resolver.resolve("lot", "lot-1")[0].value == "LOT-1"
+    resolver.resolve("lot", "lot-1")
+    resolver.invalidate(["rim"])
+    resolver.resolve("lot", "lot-1")
+    assert loads == ["SELECT lot"]
+
+    resolver.invalidate(["available_inventory_report"])
+    resolver.resolve("lot", "lot-1")
+    assert loads == ["SELECT lot", "SELECT lot"]
+
+
+
+def test_row_encoder_streams_ndjson_and_csv():
+    """Test that batches encode independently, with the CSV header only once"""
+    first = [{"lot": "LOT-1", "expiry_date": date(2026, 1, 31), "qty": Decimal("4")}]
+    second = [{"lot": "LOT-2", "expiry_date": None, "qty": Decimal("2.5")}]
+
+    ndjson = RowEncoder("ndjson")
+    assert ndjson.encode(first) == b'{"lot":"LOT-1","expiry_date":"2026-01-31","qty":4}\n'
+    assert ndjson.encode([]) == b""
+
+    encoder = RowEncoder("csv")
+    text = encoder.encode(first) + encoder.encode(second)
+    assert text.splitlines() == ["lot,expiry_date,qty", "LOT-1,2026-01-31,4", "LOT-2,,2.5"]
+
+    with pytest.raises(ValueError):
+        RowEncoder("xml")
+
+
+def test_encode_json_matches_fastapi_encoding():
+    """Test that encode_json renders dates and Decimals as FastAPI's jsonable_encoder does"""
+    from fastapi.encoders import jsonable_encoder
+
+    payload = {"count": 1, "items": [
+        {"expiry_date": date(2026, 3, 1), "received_packages": Decimal("12"), "rate": Decimal("1.25"), "lot": None}
+    ]}
+
+    assert isinstance(encode_json(payload), bytes)
+    assert json.loads(encode_json(payload)) == jsonable_encoder(payload)
+
+
+def test_keyset_pages_continue_after_last_key():
+    """Test that a page's token filters the next page on the key and limit fetches one extra row"""
+    keyset = Keyset("listing", (("expiry_date", "date"), ("id", "bigint")))
+    query = "SELECT lot{keyset_columns} FROM t WHERE TRUE {keyset_filter} ORDER BY {order_by} {limit};"
+
+    sql, params = keyset.render(query, limit=2)
+    assert sql == (
+        "SELECT lot, (expiry_date)::text AS _k0, (id)::text AS _k1 FROM t WHERE TRUE  ORDER BY expiry_date, id LIMIT 3;"
+    )
+    assert params == {}
+
+    rows = [{"lot": f"L{i}", "_k0": "2026-01-0" + str(i), "_k1": str(i)} for i in (1, 2, 3)]
+    page, token = keyset.split_page(rows, 2)
+    assert page == [{"lot": "L1"}, {"lot": "L2"}]
+    assert keyset.decode(token) == ["2026-01-02", "2"]
+
+    sql, params = keyset.render(query, after=token, limit=2)
+    assert "AND (expiry_date, id) > (%(_k0)s::text::date, %(_k1)s::text::bigint)" in sql
+    assert params == {"_k0": "2026-01-02", "_k1": "2"}
+
+    assert keyset.split_page(rows[2:], 2) == ([{"lot": "L3"}], None)
+
+
+def test_keyset_token_carries_tag():
+    """Test that a tag given to split_page comes back from the token and untagged tokens have none"""
+    keyset = Keyset("listing", (("id", "bigint"),))
+
+    _, token = keyset.split_page([{"_k0": "1"}, {"_k0": "2"}], 1, tag="prefix")
+
+    assert keyset.tag(token) == "prefix"
+    assert keyset.decode(token) == ["1"]
+    assert keyset.tag(keyset.encode([1])) is None
+
+
+def test_keyset_rejects_foreign_or_malformed_tokens():
+    """Test that tokens from another listing or of the wrong shape are refused"""
+    keyset = Keyset("listing", (("id", "bigint"),))
+    other = Keyset("other", (("id", "bigint"),))
+
+    with pytest.raises(InvalidPageToken):
+        keyset.decode(other.encode([5]))
+    with pytest.raises(InvalidPageToken):
+        keyset.decode("not a token")
+    with pytest.raises(InvalidPageToken):
+        keyset.decode(Keyset("listing", (("a", "text"), ("b", "text"))).encode(["x", "y"]))
+
+    assert explain_rows('[{"Plan": {"Plan Rows": 1234}}]') == 1234
+    assert explain_rows([]) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
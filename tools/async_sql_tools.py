@@ -0,0 +1,233 @@
+"""
+Async SQL tools for the FastAPI backend (asyncpg based)
+"""
+
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple, Union
+import asyncio
+import re
+import time
+import asyncpg
+
+
+# Rows per round trip when streaming through a server-side cursor
+STREAM_BATCH_ROWS = 2000
+
+# psycopg2-style placeholders: %(name)s, %s and the %% escape
+_PLACEHOLDER_RE = re.compile(r"%\((\w+)\)s|%s|%%")
+
+
+def convert_placeholders(
+    query: str,
+    parameters: Optional[Union[Dict[str, Any], Sequence[Any]]] = None
+) -> Tuple[str, List[Any]]:
+    """
+    Translate a psycopg2-style query into asyncpg's positional form.
+
+    Named placeholders that appear more than once reuse the same ``$n``
+    argument, so queries written for ``SQLQueryTool`` run unchanged.
+
+    Args:
+        query: SQL using %(name)s or %s placeholders
+        parameters: Mapping for named placeholders or sequence for %s
+
+    Returns:
+        Tuple of (converted query, positional argument list)
+    """
+    args: List[Any] = []
+    named_slots: Dict[str, int] = {}
+    positional = iter(parameters) if isinstance(parameters, (list, tuple)) else None
+
+    def replace(match: "re.Match") -> str:
+        token = match.group(0)
+        if token == "%%":
+            return "%"
+
+        name = match.group(1)
+        if name is not None:
+            if not isinstance(parameters, dict) or name not in parameters:
+                raise KeyError(f"Missing query parameter: {name}")
+            if name not in named_slots:
+                args.append(parameters[name])
+                named_slots[name] = len(args)
+            return f"${named_slots[name]}"
+
+        if positional is None:
+            raise TypeError("Positional %s placeholder requires a sequence of parameters")
+        try:
+            args.append(next(positional))
+        except StopIteration:
+            raise IndexError("Not enough parameters for query placeholders") from None
+        return f"${len(args)}"
+
+    return _PLACEHOLDER_RE.sub(replace, query), args
+
+
+class AsyncSQLQueryTool:
+    """Execute SQL queries against PostgreSQL without blocking the event loop"""
+
+    def __init__(
+        self,
+        connection_string: str,
+        min_size: int = 1,
+        max_size: int = 10,
+        max_idle_seconds: float = 300.0,
+        acquire_timeout_seconds: float = 30.0,
+        **_unused_pool_options
+    ):
+        self.conn_string = connection_string
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle_seconds = max_idle_seconds
+        self.acquire_timeout_seconds = acquire_timeout_seconds
+        self._pool: Optional[asyncpg.Pool] = None
+        self._pool_lock = asyncio.Lock()
+        self._listener_conn: Optional[asyncpg.Connection] = None
+
+    async def get_pool(self) -> asyncpg.Pool:
+        """Create the asyncpg pool on first use"""
+        if self._pool is None:
+            async with self._pool_lock:
+                if self._pool is None:
+                    self._pool = await asyncpg.create_pool(
+                        self.conn_string,
+                        min_size=self.min_size,
+                        max_size=self.max_size,
+                        max_inactive_connection_lifetime=self.max_idle_seconds
+                    )
+        return self._pool
+
+    async def execute_query(
+        self,
+        query: str,
+        parameters: Optional[Union[Dict[str, Any], Sequence[Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Execute SQL query and return results as list of dictionaries.
+
+        Args:
+            query: SQL query (psycopg2-style placeholders if needed)
+            parameters: Query parameters
+
+        Returns:
+            List of row dictionaries
+        """
+        start_time = time.time()
+        sql, args = convert_placeholders(query, parameters)
+        pool = await self.get_pool()
+
+        try:
+            async with pool.acquire(timeout=self.acquire_timeout_seconds) as conn:
+                records = await conn.fetch(sql, *args)
+        except asyncpg.PostgresError as e:
+            print(f"[SQL ERROR] {e}")
+            raise
+
+        results = [dict(record) for record in records]
+
+        execution_time = (time.time() - start_time) * 1000
+        print(f"[SQL] Async query executed in {execution_time:.2f}ms, {len(results)} rows returned")
+
+        return results
+
+    async def stream_query(
+        self,
+        query: str,
+        parameters: Optional[Union[Dict[str, Any], Sequence[Any]]] = None,
+        batch_rows: int = STREAM_BATCH_ROWS
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Execute a SELECT through a server-side cursor, yielding rows in batches.
+
+        Only one batch is held in memory at a time, whatever the result size.
+        The connection stays checked out (in a read-only transaction) until
+        the iterator is exhausted or closed.
+
+        Args:
+            query: SQL query (psycopg2-style placeholders if needed)
+            parameters: Query parameters
+            batch_rows: Rows fetched per round trip
+
+        Yields:
+            Lists of row dictionaries
+        """
+        start_time = time.time()
+        total = 0
+        sql, args = convert_placeholders(query, parameters)
+        pool = await self.get_pool()
+
+        try:
+            async with pool.acquire(timeout=self.acquire_timeout_seconds) as conn:
+                async with conn.transaction(readonly=True):
+                    cursor = await conn.cursor(sql, *args)
+                    while True:
+                        records = await cursor.fetch(batch_rows)
+                        if not records:
+                            break
+                        total += len(records)
+                        yield [dict(record) for record in records]
+        except asyncpg.PostgresError as e:
+            print(f"[SQL ERROR] {e}")
+            raise
+
+        execution_time = (time.time() - start_time) * 1000
+        print(f"[SQL] Async query streamed {total} rows in {execution_time:.2f}ms")
+
+    async def execute_transaction(
+        self,
+        statements: Sequence[Tuple[str, Optional[Union[Dict[str, Any], Sequence[Any]]]]]
+    ) -> str:
+        """
+        Run several statements in one transaction on one connection.
+
+        Args:
+            statements: (query, parameters) pairs, executed in order
+
+        Returns:
+            Status string of the last statement (e.g. "INSERT 0 42")
+        """
+        pool = await self.get_pool()
+        status = ""
+
+        async with pool.acquire(timeout=self.acquire_timeout_seconds) as conn:
+            async with conn.transaction():
+                for query, parameters in statements:
+                    sql, args = convert_placeholders(query, parameters)
+                    status = await conn.execute(sql, *args)
+
+        return status
+
+    async def listen(self, channel: str, callback: Callable[[str], Any]):
+        """
+        Subscribe to a Postgres NOTIFY channel on a dedicated connection.
+
+        Args:
+            channel: Channel name
+            callback: Called with the notification payload
+        """
+        if self._listener_conn is None or self._listener_conn.is_closed():
+            self._listener_conn = await asyncpg.connect(self.conn_string)
+
+        def on_notify(_conn, _pid, _channel, payload):
+            callback(payload)
+
+        await self._listener_conn.add_listener(channel, on_notify)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of async pool sizing"""
+        if self._pool is None:
+            return {"min_size": self.min_size, "max_size": self.max_size, "size": 0, "idle": 0}
+        return {
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "size": self._pool.get_size(),
+            "idle": self._pool.get_idle_size(),
+        }
+
+    async def close(self):
+        """Close the listener connection and the asyncpg pool"""
+        if self._listener_conn is not None:
+            await self._listener_conn.close()
+            self._listener_conn = None
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
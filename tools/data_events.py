@@ -0,0 +1,69 @@
+"""
+Data reload events shared by the loaders, API and agents
+
+Loaders announce finished loads with a Postgres NOTIFY on DATA_RELOAD_CHANNEL.
+Long-running processes (the API) listen on that channel and fire the hooks
+registered here, e.g. to invalidate cached responses.
+
+The Supply Watchdog announces each finished run on MONITORING_CHANNEL so the
+API can push the new alert to connected dashboards.
+"""
+
+from typing import Callable, Iterable, List, Optional
+import json
+
+
+DATA_RELOAD_CHANNEL = "data_reload"
+MONITORING_CHANNEL = "monitoring_run"
+
+_reload_hooks: List[Callable[[Optional[List[str]]], None]] = []
+
+
+def register_reload_hook(callback: Callable[[Optional[List[str]]], None]):
+    """Register a callback fired with the reloaded table names (None = all)"""
+    _reload_hooks.append(callback)
+
+
+def fire_reload_hooks(tables: Optional[Iterable[str]] = None):
+    """Run every registered reload hook, isolating failures"""
+    tables = list(tables) if tables is not None else None
+    for callback in list(_reload_hooks):
+        try:
+            callback(tables)
+        except Exception as e:
+            print(f"⚠️  Reload hook {getattr(callback, '__name__', callback)} failed: {e}")
+
+
+def parse_reload_payload(payload: str) -> Optional[List[str]]:
+    """Decode a NOTIFY payload into table names (None = everything)"""
+    if not payload:
+        return None
+    try:
+        tables = json.loads(payload)
+    except ValueError:
+        return None
+    return [str(table) for table in tables] if isinstance(tables, list) else None
+
+
+def notify_data_reload(cursor, tables: Optional[Iterable[str]] = None):
+    """
+    Announce a finished data load to every listening process.
+    
+    Args:
+        cursor: DB-API cursor on the loader's connection (committed by caller)
+        tables: Tables that were reloaded (None = all)
+    """
+    payload = json.dumps(sorted(tables)) if tables is not None else ""
+    cursor.execute("SELECT pg_notify(%s, %s);", (DATA_RELOAD_CHANNEL, payload))
+    fire_reload_hooks(tables)
+
+
+def notify_monitoring_run(cursor, alert_id: Optional[str] = None):
+    """
+    Announce a finished watchdog run to every listening process.
+    
+    Args:
+        cursor: DB-API cursor (the notification is delivered on commit)
+        alert_id: ID of the alert the run produced
+    """
+    cursor.execute("SELECT pg_notify(%s, %s);", (MONITORING_CHANNEL, alert_id or ""))
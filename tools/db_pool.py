@@ -0,0 +1,370 @@
+"""
+Pooled PostgreSQL connections shared by the API and agents
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+from collections import deque
+from contextlib import contextmanager
+import threading
+import time
+import psycopg2
+from psycopg2 import extensions
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no connection becomes available within the acquire timeout"""
+
+
+class _PoolEntry:
+    """Raw connection plus the bookkeeping the pool needs to recycle it"""
+
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class PooledConnection:
+    """
+    Thin proxy around a pooled psycopg2 connection.
+
+    Behaves like the underlying connection, except that ``close()`` hands the
+    connection back to the pool instead of closing the socket. This keeps the
+    existing ``conn = get_db_connection(); ...; conn.close()`` call sites
+    working unchanged.
+    """
+
+    def __init__(self, pool: "ConnectionPool", entry: _PoolEntry):
+        self._pool = pool
+        self._entry = entry
+
+    @property
+    def raw(self):
+        """Underlying psycopg2 connection"""
+        if self._entry is None:
+            raise psycopg2.InterfaceError("connection already returned to pool")
+        return self._entry.conn
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.raw, name)
+
+    def close(self):
+        """Return the connection to the pool"""
+        if self._entry is not None:
+            entry, self._entry = self._entry, None
+            self._pool._release(entry)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class ConnectionPool:
+    """
+    Thread-safe psycopg2 connection pool.
+
+    Connections are created lazily up to ``max_size`` and at least ``min_size``
+    are kept open once created. Idle connections beyond ``min_size`` are reaped
+    after ``max_idle_seconds``; any connection older than ``max_lifetime_seconds``
+    is recycled when it next passes through the pool. Connections that sat idle
+    for longer than ``health_check_after_seconds`` are pinged before being
+    handed out.
+    """
+
+    def __init__(
+        self,
+        connection_string: str,
+        min_size: int = 1,
+        max_size: int = 10,
+        max_idle_seconds: float = 300.0,
+        max_lifetime_seconds: float = 3600.0,
+        acquire_timeout_seconds: float = 30.0,
+        health_check_after_seconds: float = 30.0,
+        connect: Optional[Callable[[str], Any]] = None
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}")
+
+        self.conn_string = connection_string
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle_seconds = max_idle_seconds
+        self.max_lifetime_seconds = max_lifetime_seconds
+        self.acquire_timeout_seconds = acquire_timeout_seconds
+        self.health_check_after_seconds = health_check_after_seconds
+        self._connect = connect or psycopg2.connect
+
+        self._cond = threading.Condition()
+        self._idle: deque = deque()
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+        self._counters = {
+            "connections_created": 0,
+            "connections_closed": 0,
+            "acquired": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "health_check_failures": 0,
+            "recycled_lifetime": 0,
+            "reaped_idle": 0,
+        }
+        self._total_wait_seconds = 0.0
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        """
+        Check a connection out of the pool.
+
+        Args:
+            timeout: Seconds to wait for a free connection (defaults to the
+                pool's ``acquire_timeout_seconds``)
+
+        Returns:
+            PooledConnection; call ``close()`` to return it
+        """
+        timeout = self.acquire_timeout_seconds if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise psycopg2.InterfaceError("connection pool is closed")
+
+                self._reap_locked()
+
+                if self._idle:
+                    entry = self._idle.pop()
+                    self._in_use += 1
+                    break
+
+                if self._size < self.max_size:
+                    # Reserve the slot before connecting outside the lock
+                    self._size += 1
+                    self._in_use += 1
+                    entry = None
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters["timeouts"] += 1
+                    raise PoolExhaustedError(
+                        f"No database connection available within {timeout:.1f}s "
+                        f"(max_size={self.max_size})"
+                    )
+
+                if not waited:
+                    self._counters["waits"] += 1
+                    waited = True
+                wait_start = time.monotonic()
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+                    self._total_wait_seconds += time.monotonic() - wait_start
+
+        try:
+            if entry is None:
+                entry = self._new_entry()
+            elif not self._is_healthy(entry):
+                # Replace the broken connection, keeping its reserved slot
+                self._close_raw(entry)
+                entry = self._new_entry()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._counters["acquired"] += 1
+        return PooledConnection(self, entry)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """Context manager yielding a pooled connection"""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def reap_idle(self) -> int:
+        """Close idle and expired connections; returns how many were closed"""
+        with self._cond:
+            return self._reap_locked()
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool sizing and usage counters"""
+        with self._cond:
+            acquired = self._counters["acquired"]
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "avg_wait_ms": round(
+                    self._total_wait_seconds * 1000 / acquired, 3
+                ) if acquired else 0.0,
+                **self._counters,
+            }
+
+    def close(self):
+        """Close all idle connections and refuse further checkouts"""
+        with self._cond:
+            self._closed = True
+            entries = list(self._idle)
+            self._idle.clear()
+            self._size -= len(entries)
+            self._cond.notify_all()
+
+        for entry in entries:
+            self._close_raw(entry)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _new_entry(self) -> _PoolEntry:
+        conn = self._connect(self.conn_string)
+        with self._cond:
+            self._counters["connections_created"] += 1
+        return _PoolEntry(conn)
+
+    def _release(self, entry: _PoolEntry):
+        """Return a checked-out connection, resetting or discarding it"""
+        reusable = not self._closed and not entry.conn.closed
+
+        if reusable:
+            try:
+                # Never hand out a connection that is still inside a transaction
+                if entry.conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    entry.conn.rollback()
+            except psycopg2.Error:
+                reusable = False
+
+        if reusable and self._expired(entry):
+            with self._cond:
+                self._counters["recycled_lifetime"] += 1
+            reusable = False
+
+        with self._cond:
+            self._in_use -= 1
+            if reusable:
+                entry.last_used = time.monotonic()
+                self._idle.append(entry)
+            else:
+                self._size -= 1
+            self._reap_locked()
+            self._cond.notify()
+
+        if not reusable:
+            self._close_raw(entry)
+
+    def _is_healthy(self, entry: _PoolEntry) -> bool:
+        """Check a connection before handing it out"""
+        if entry.conn.closed or self._expired(entry):
+            if not entry.conn.closed:
+                with self._cond:
+                    self._counters["recycled_lifetime"] += 1
+            return False
+
+        if time.monotonic() - entry.last_used < self.health_check_after_seconds:
+            return True
+
+        try:
+            with entry.conn.cursor() as cursor:
+                cursor.execute("SELECT 1;")
+            entry.conn.rollback()
+            return True
+        except psycopg2.Error:
+            with self._cond:
+                self._counters["health_check_failures"] += 1
+            return False
+
+    def _expired(self, entry: _PoolEntry) -> bool:
+        return time.monotonic() - entry.created_at > self.max_lifetime_seconds
+
+    def _reap_locked(self) -> int:
+        """Drop idle connections past their idle/lifetime limits (lock held)"""
+        now = time.monotonic()
+        keep: List[_PoolEntry] = []
+        doomed: List[_PoolEntry] = []
+
+        # Oldest idle connections sit at the left of the deque
+        for entry in self._idle:
+            expired = now - entry.created_at > self.max_lifetime_seconds
+            idle_too_long = now - entry.last_used > self.max_idle_seconds
+            if expired:
+                self._counters["recycled_lifetime"] += 1
+                doomed.append(entry)
+            elif idle_too_long and self._size - len(doomed) > self.min_size:
+                self._counters["reaped_idle"] += 1
+                doomed.append(entry)
+            else:
+                keep.append(entry)
+
+        if doomed:
+            self._idle = deque(keep)
+            self._size -= len(doomed)
+            for entry in doomed:
+                self._close_raw(entry)
+
+        return len(doomed)
+
+    def _close_raw(self, entry: _PoolEntry):
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._counters["connections_closed"] += 1
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(connection_string: str, **pool_options) -> ConnectionPool:
+    """
+    Get the process-wide pool for a connection string, creating it on first use.
+
+    Pool options only take effect for the call that creates the pool, so every
+    component that talks to the same database shares one set of connections.
+    """
+    with _pools_lock:
+        pool = _pools.get(connection_string)
+        if pool is None:
+            pool = ConnectionPool(connection_string, **pool_options)
+            _pools[connection_string] = pool
+        return pool
+
+
+def pool_stats() -> List[Dict[str, Any]]:
+    """Stats for every pool created in this process"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.stats() for pool in pools]
+
+
+def close_all_pools():
+    """Close every pool created in this process"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,196 @@
+"""
+In-memory resolver for lot numbers, trial names and countries
+
+The distinct values are loaded once per data load into three structures per
+entity kind: a hash map of normalized keys (exact matches), a prefix trie
+(completions, shortest first) and a trigram index (ranked fuzzy candidates,
+scored like pg_trgm similarity). Free text is resolved in microseconds and
+the database is only queried for the canonical value.
+
+A data reload marks the affected kinds stale; they are reloaded on next use.
+"""
+
+from collections import deque
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+import threading
+import time
+
+from tools.text_search import normalize_key
+
+
+# kind -> (query returning one text column, tables it reads)
+ENTITY_SOURCES: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "lot": (
+        "SELECT DISTINCT lot FROM available_inventory_report WHERE lot IS NOT NULL AND deleted_at IS NULL;",
+        ("available_inventory_report",),
+    ),
+    "trial": (
+        "SELECT DISTINCT trial_name FROM available_inventory_report "
+        "WHERE trial_name IS NOT NULL AND deleted_at IS NULL;",
+        ("available_inventory_report",),
+    ),
+    "country": (
+        "SELECT DISTINCT country_name FROM ip_shipping_timelines_report WHERE country_name IS NOT NULL;",
+        ("ip_shipping_timelines_report",),
+    ),
+}
+
+# Minimum trigram similarity for a fuzzy candidate (pg_trgm's default threshold)
+SIMILARITY_THRESHOLD = 0.3
+
+# Trigrams found in more than this share of the keys do not nominate fuzzy candidates
+COMMON_GRAM_SHARE = 0.1
+
+
+class EntityMatch(NamedTuple):
+    """A resolved entity with how it matched and a 0-1 score"""
+
+    value: str
+    tier: str  # exact, prefix or fuzzy
+    score: float
+
+
+def trigrams(key: str) -> Set[str]:
+    """pg_trgm-style trigrams: each word padded with two leading and one trailing space"""
+    grams = set()
+    for word in key.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class EntityIndex:
+    """Exact, prefix and trigram lookup over one kind of entity"""
+
+    def __init__(self, values: Iterable[str]):
+        self._exact: Dict[str, str] = {}
+        self._trie: Dict = {}
+        self._grams: Dict[str, Set[str]] = {}
+        self._key_grams: Dict[str, Set[str]] = {}
+
+        for value in values:
+            key = normalize_key(value)
+            if not key or key in self._exact:
+                continue
+            self._exact[key] = value
+
+            node = self._trie
+            for char in key:
+                node = node.setdefault(char, {})
+            node[None] = key  # end-of-key marker
+
+            grams = trigrams(key)
+            self._key_grams[key] = grams
+            for gram in grams:
+                self._grams.setdefault(gram, set()).add(key)
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def exact(self, term: str) -> Optional[str]:
+        return self._exact.get(normalize_key(term))
+
+    def prefix(self, term: str, limit: Optional[int] = 5) -> List[str]:
+        """Keys starting with term, shortest (closest) first (limit None = all)"""
+        node = self._trie
+        for char in normalize_key(term):
+            node = node.get(char)
+            if node is None:
+                return []
+
+        found = []
+        queue = deque([node])
+        while queue and (limit is None or len(found) < limit):
+            node = queue.popleft()
+            if None in node:
+                found.append(node[None])
+            queue.extend(child for char, child in sorted(node.items(), key=lambda item: item[0] or "") if char)
+        return found
+
+    def fuzzy(self, term: str, limit: Optional[int] = 5) -> List[Tuple[str, float]]:
+        """Keys sharing trigrams with term (or containing it), best similarity first"""
+        key = normalize_key(term)
+        grams = trigrams(key)
+        postings = sorted((self._grams[gram] for gram in grams if gram in self._grams), key=len)
+        if not postings:
+            return []
+
+        # Grams most keys share (e.g. "lot") only add candidates that the rarer grams outrank
+        common = max(1, int(len(self._exact) * COMMON_GRAM_SHARE))
+        candidates = set().union(*(posting for posting in postings if len(posting) <= common)) or postings[0]
+
+        scored = []
+        for candidate in candidates:
+            candidate_grams = self._key_grams[candidate]
+            shared = len(grams & candidate_grams)
+            similarity = shared / (len(grams) + len(candidate_grams) - shared)
+            if similarity >= SIMILARITY_THRESHOLD or key in candidate:
+                scored.append((candidate, similarity))
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:limit]
+
+    def resolve(self, term: str, limit: Optional[int] = 5) -> List[EntityMatch]:
+        """Ranked candidates: the exact match, else prefix completions, else fuzzy matches"""
+        value = self.exact(term)
+        if value is not None:
+            return [EntityMatch(value, "exact", 1.0)]
+
+        key_length = max(len(normalize_key(term)), 1)
+        completions = self.prefix(term, limit)
+        if completions:
+            return [EntityMatch(self._exact[key], "prefix", key_length / len(key)) for key in completions]
+
+        return [EntityMatch(self._exact[key], "fuzzy", score) for key, score in self.fuzzy(term, limit)]
+
+
+class EntityResolver:
+    """
+    Lot, trial and country indexes for one process, reloaded after data loads.
+
+    Register invalidate() as a reload hook (tools.data_events) so new data
+    is picked up on the next lookup.
+    """
+
+    def __init__(self, connect: Callable, sources: Dict[str, Tuple[str, Tuple[str, ...]]] = ENTITY_SOURCES):
+        """
+        Args:
+            connect: Returns a context manager yielding a DB-API connection
+                (e.g. ConnectionPool.connection)
+            sources: kind -> (query, source tables)
+        """
+        self.connect = connect
+        self.sources = sources
+        self._indexes: Dict[str, EntityIndex] = {}
+        self._stale: Set[str] = set(sources)
+        self._lock = threading.Lock()
+
+    def invalidate(self, tables: Optional[List[str]] = None):
+        """Mark kinds built from the reloaded tables (None = all) for reloading"""
+        with self._lock:
+            for kind, (_, source_tables) in self.sources.items():
+                if tables is None or set(source_tables) & set(tables):
+                    self._stale.add(kind)
+
+    def index(self, kind: str) -> EntityIndex:
+        """The index for a kind, (re)loaded from the database if stale"""
+        with self._lock:
+            if kind not in self._stale:
+                return self._indexes[kind]
+
+            start_time = time.time()
+            query, _ = self.sources[kind]
+            with self.connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query)
+                values = [row[0] for row in cursor.fetchall()]
+                cursor.close()
+
+            index = self._indexes[kind] = EntityIndex(str(value) for value in values)
+            self._stale.discard(kind)
+            elapsed_ms = (time.time() - start_time) * 1000
+            print(f"[RESOLVER] Loaded {len(index)} {kind} values in {elapsed_ms:.2f}ms")
+            return index
+
+    def resolve(self, kind: str, term: str, limit: Optional[int] = 5) -> List[EntityMatch]:
+        """Ranked candidates for free text (empty when nothing is close)"""
+        return self.index(kind).resolve(term, limit)
@@ -0,0 +1,139 @@
+"""
+Precomputed expiry-risk snapshot of available_inventory_report
+
+The snapshot stores days_until_expiry and risk_level per dated inventory row
+so readers do not re-run the CASE/date arithmetic on every request. It is a
+plain table rather than a materialized view because the loaders replace
+available_inventory_report, and a dependent view would block that DROP.
+
+Refreshes run DELETE + INSERT in a single transaction, so readers never
+block and keep seeing the previous snapshot until the new one commits.
+The refresh date is kept in a one-row marker table, so a snapshot that is
+legitimately empty (no dated inventory) still counts as current.
+"""
+
+from typing import Any, Dict, List, Tuple
+
+
+SNAPSHOT_TABLE = "inventory_expiry_snapshot"
+SNAPSHOT_META_TABLE = "inventory_expiry_snapshot_meta"
+
+SNAPSHOT_DDL = """
+    CREATE TABLE IF NOT EXISTS inventory_expiry_snapshot (
+        id BIGSERIAL PRIMARY KEY,
+        trial_name TEXT,
+        location TEXT,
+        lot TEXT,
+        package_type_description TEXT,
+        expiry_date DATE NOT NULL,
+        received_packages BIGINT,
+        days_until_expiry INTEGER NOT NULL,
+        risk_level VARCHAR(10) NOT NULL,
+        snapshot_date DATE NOT NULL DEFAULT CURRENT_DATE,
+        refreshed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS idx_expiry_snap_days ON inventory_expiry_snapshot(days_until_expiry);
+    CREATE INDEX IF NOT EXISTS idx_expiry_snap_risk ON inventory_expiry_snapshot(risk_level, days_until_expiry);
+    CREATE INDEX IF NOT EXISTS idx_expiry_snap_expiry_id ON inventory_expiry_snapshot(expiry_date, id);
+    CREATE TABLE IF NOT EXISTS inventory_expiry_snapshot_meta (
+        singleton BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (singleton),
+        refreshed_on DATE NOT NULL
+    );
+"""
+
+# Created together with the snapshot, so its presence means both exist
+EXISTS_SQL = f"SELECT to_regclass('{SNAPSHOT_META_TABLE}') IS NOT NULL AS present;"
+
+# No marker row yet means the snapshot was never built
+STALE_CHECK_SQL = """
+    SELECT COALESCE((SELECT refreshed_on FROM inventory_expiry_snapshot_meta) < CURRENT_DATE, TRUE) AS stale;
+"""
+
+_MARK_REFRESHED_SQL = """
+    INSERT INTO inventory_expiry_snapshot_meta (refreshed_on) VALUES (CURRENT_DATE)
+    ON CONFLICT (singleton) DO UPDATE SET refreshed_on = EXCLUDED.refreshed_on;
+"""
+
+_REFRESH_SQL = """
+    INSERT INTO inventory_expiry_snapshot (
+        trial_name, location, lot, package_type_description,
+        expiry_date, received_packages, days_until_expiry, risk_level
+    )
+    SELECT
+        trial_name,
+        location,
+        lot,
+        package_type_description,
+        expiry_day,
+        received_packages,
+        expiry_day - CURRENT_DATE,
+        CASE
+            WHEN expiry_day - CURRENT_DATE <= %(critical_days)s THEN 'CRITICAL'
+            WHEN expiry_day - CURRENT_DATE <= %(high_days)s THEN 'HIGH'
+            WHEN expiry_day - CURRENT_DATE <= %(medium_days)s THEN 'MEDIUM'
+            ELSE 'LOW'
+        END
+    FROM (
+        SELECT *, expiry_date::date AS expiry_day
+        FROM available_inventory_report
+        WHERE expiry_date IS NOT NULL AND deleted_at IS NULL
+    ) inventory;
+"""
+
+
+def refresh_statements(config) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Statements that rebuild the snapshot; run them in one transaction.
+
+    The advisory lock serializes concurrent refreshers (loader, watchdog, API)
+    so they cannot interleave their DELETE and INSERT.
+    """
+    thresholds = {
+        "critical_days": config.expiry_critical_days,
+        "high_days": config.expiry_high_days,
+        "medium_days": config.expiry_medium_days,
+    }
+    return [
+        (SNAPSHOT_DDL, {}),
+        (f"SELECT pg_advisory_xact_lock(hashtext('{SNAPSHOT_TABLE}'));", {}),
+        (f"DELETE FROM {SNAPSHOT_TABLE};", {}),
+        (_MARK_REFRESHED_SQL, {}),
+        (_REFRESH_SQL, thresholds),
+    ]
+
+
+def refresh_expiry_snapshot(conn, config) -> int:
+    """
+    Rebuild the snapshot on a psycopg2 connection and commit.
+
+    Args:
+        conn: psycopg2 connection (plain or pooled), not in autocommit mode
+        config: AgentConfig providing the expiry_*_days thresholds
+
+    Returns:
+        Number of snapshot rows written
+    """
+    with conn.cursor() as cursor:
+        rows = 0
+        for statement, params in refresh_statements(config):
+            cursor.execute(statement, params)
+            rows = cursor.rowcount
+    conn.commit()
+
+    print(f"✓ Refreshed {SNAPSHOT_TABLE}: {rows} rows")
+    return rows
+
+
+def refresh_expiry_snapshot_if_stale(conn, config) -> bool:
+    """Refresh the snapshot when it was built before today; returns True if refreshed"""
+    with conn.cursor() as cursor:
+        cursor.execute(EXISTS_SQL)
+        stale = not cursor.fetchone()[0]
+        if not stale:
+            cursor.execute(STALE_CHECK_SQL)
+            stale = cursor.fetchone()[0]
+    conn.commit()
+
+    if stale:
+        refresh_expiry_snapshot(conn, config)
+    return bool(stale)
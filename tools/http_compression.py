@@ -0,0 +1,60 @@
+"""
+Accept-Encoding negotiation and compression for JSON API responses
+
+Brotli is used when the brotli package is installed and the client accepts
+it, otherwise gzip. Bodies below RESPONSE_COMPRESS_MIN_BYTES are sent as is
+(the headers would outweigh the saving).
+"""
+
+from typing import Dict, Optional
+import gzip
+import importlib.util
+
+BROTLI_AVAILABLE = importlib.util.find_spec("brotli") is not None
+if BROTLI_AVAILABLE:
+    import brotli
+
+# Supported content-codings, preferred first
+ENCODINGS = ("br", "gzip") if BROTLI_AVAILABLE else ("gzip",)
+
+# Levels that trade a little ratio for fast per-request compression
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> Dict[str, float]:
+    """Content-coding -> q-value from an Accept-Encoding header"""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        name, _, value = params.strip().partition("=")
+        if name.strip().lower() == "q":
+            try:
+                q = float(value)
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best supported content-coding the client accepts (None = send uncompressed)"""
+    accepted = accepted_encodings(accept_encoding)
+    best, best_q = None, 0.0
+    for coding in ENCODINGS:
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a body with a content-coding from ENCODINGS"""
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported content-coding: {encoding}")
@@ -0,0 +1,150 @@
+"""
+Keyset (cursor) pagination for the list endpoints
+
+A page is fetched with WHERE (sort key) > (last key seen) ORDER BY sort key
+LIMIT n, so page 500 costs the same index range scan as page 1, unlike
+OFFSET which reads and discards every earlier row. The last key of a page
+travels to the client as an opaque continuation token.
+
+Queries declare where the keyset parts go with {keyset_columns},
+{keyset_filter}, {order_by} and {limit} placeholders; see Keyset.render().
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import base64
+import json
+
+
+# Largest page a list endpoint serves
+MAX_PAGE_SIZE = 1000
+
+
+class InvalidPageToken(ValueError):
+    """A continuation token that is malformed or belongs to another listing"""
+
+
+@dataclass(frozen=True)
+class Keyset:
+    """
+    Sort key of a paginated query.
+
+    Each column is a SQL expression (unique as a whole, NULL-free, e.g. via
+    COALESCE) plus the Postgres type its token value is cast back to.
+    """
+
+    name: str  # scope: a token only continues the listing that issued it
+    columns: Tuple[Tuple[str, str], ...]
+
+    @property
+    def order_by(self) -> str:
+        return ", ".join(expression for expression, _ in self.columns)
+
+    def encode(self, values: Sequence[Any], tag: Optional[str] = None) -> str:
+        """
+        Opaque continuation token for a key.
+
+        tag carries state the listing resolved on its first page (e.g. which
+        match tier answered) so later pages need not work it out again.
+        """
+        payload = {"s": self.name, "k": [str(value) for value in values]}
+        if tag is not None:
+            payload["t"] = tag
+        encoded = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(encoded).decode("ascii").rstrip("=")
+
+    def _payload(self, token: str) -> Dict[str, Any]:
+        try:
+            padded = token + "=" * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            values = payload["k"]
+            scope = payload["s"]
+        except (ValueError, TypeError, KeyError, UnicodeError):
+            raise InvalidPageToken("Malformed page token") from None
+        if scope != self.name or not isinstance(values, list) or len(values) != len(self.columns):
+            raise InvalidPageToken(f"Page token does not belong to {self.name}")
+        return payload
+
+    def decode(self, token: str) -> List[str]:
+        """Key values from a continuation token"""
+        return self._payload(token)["k"]
+
+    def tag(self, token: str) -> Optional[str]:
+        """Tag a continuation token was encoded with (None if untagged)"""
+        return self._payload(token).get("t")
+
+    def render(
+        self,
+        query: str,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+        **fields: str
+    ) -> Tuple[str, Dict[str, str]]:
+        """
+        Fill a query's keyset placeholders (and any other format fields).
+
+        {keyset_columns} becomes ", <key> AS _k0, ..." (text copies of the key,
+        read back by split_page), {keyset_filter} becomes "AND (<key>) > (<token
+        values>)" when continuing, {order_by} the key and {limit} one row more
+        than the page size (so split_page knows whether another page exists).
+
+        Returns:
+            Tuple of (query, parameters for the token values)
+        """
+        params: Dict[str, str] = {}
+        keyset_filter = ""
+        if after:
+            placeholders = []
+            for i, (value, (_, sql_type)) in enumerate(zip(self.decode(after), self.columns)):
+                params[f"_k{i}"] = value
+                placeholders.append(f"%(_k{i})s::text::{sql_type}")
+            keyset_filter = f"AND ({self.order_by}) > ({', '.join(placeholders)})"
+
+        return query.format(
+            keyset_columns="".join(
+                f", ({expression})::text AS _k{i}" for i, (expression, _) in enumerate(self.columns)
+            ),
+            keyset_filter=keyset_filter,
+            order_by=self.order_by,
+            limit=f"LIMIT {int(limit) + 1}" if limit else "",
+            **fields
+        ), params
+
+    def split_page(
+        self,
+        rows: List[Dict[str, Any]],
+        limit: Optional[int] = None,
+        tag: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Strip the key columns and work out the next page's token.
+
+        Args:
+            rows: Query result including the _k* key columns
+            limit: Page size the query was rendered with
+            tag: Passed through to the token (see encode())
+
+        Returns:
+            Tuple of (page rows, continuation token or None on the last page)
+        """
+        keys = [f"_k{i}" for i in range(len(self.columns))]
+        has_more = bool(limit) and len(rows) > limit
+        if has_more:
+            rows = rows[:limit]
+        next_token = self.encode([rows[-1][key] for key in keys], tag) if has_more else None
+        return [{k: v for k, v in row.items() if k not in keys} for row in rows], next_token
+
+
+def explain_rows(plan: Any) -> Optional[int]:
+    """
+    Planner row estimate from an EXPLAIN (FORMAT JSON) result.
+
+    Args:
+        plan: The single "QUERY PLAN" value (JSON text or already decoded)
+    """
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    try:
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
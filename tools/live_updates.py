@@ -0,0 +1,189 @@
+"""
+Shared change feed for the /ws/monitoring WebSocket
+
+One LiveUpdates producer rebuilds the monitored state (dashboard sections,
+latest alert) when a data reload or watchdog run is announced, or every
+refresh_seconds as a fallback, and fans out only the sections that changed
+to every subscriber. Bursts of events are coalesced into one rebuild.
+
+Each subscriber has a bounded queue. A client too slow to drain it loses
+its backlog and is resynced with one full snapshot instead, so a stalled
+socket never holds more than queue_size messages or slows the others.
+"""
+
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+
+
+def diff_state(old: Dict[str, Any], new: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Top-level sections that changed between two states.
+
+    Returns:
+        Tuple of (changed or added sections with their new values, removed section names)
+    """
+    changed = {key: value for key, value in new.items() if key not in old or old[key] != value}
+    removed = [key for key in old if key not in new]
+    return changed, removed
+
+
+class LiveUpdates:
+    """Single producer that broadcasts state diffs to subscriber queues"""
+
+    def __init__(
+        self,
+        producer: Callable[[], Awaitable[Dict[str, Any]]],
+        queue_size: int = 16,
+        refresh_seconds: float = 60.0,
+        debounce_seconds: float = 1.0
+    ):
+        """
+        Args:
+            producer: Coroutine function returning the current state as a dict of sections
+            queue_size: Messages buffered per subscriber before it is resynced
+            refresh_seconds: Rebuild interval when no event arrives (0 disables)
+            debounce_seconds: Wait after an event so a burst triggers one rebuild
+        """
+        self.producer = producer
+        self.queue_size = max(1, queue_size)
+        self.refresh_seconds = refresh_seconds
+        self.debounce_seconds = debounce_seconds
+        self.state: Optional[Dict[str, Any]] = None
+        self.version = 0
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._counters = {"rebuilds": 0, "diffs": 0, "resyncs": 0}
+
+    def _start(self):
+        """Start the producer task on the running loop (first subscriber)"""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._refresh_lock = asyncio.Lock()
+        self._task = self._loop.create_task(self._run())
+
+    def trigger(self, *_event: Any):
+        """
+        Request a rebuild; safe from any thread.
+
+        Accepts and ignores event arguments so it can be registered directly
+        as a data reload hook.
+        """
+        if self._loop is None or self._loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._wake.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def _snapshot(self) -> Dict[str, Any]:
+        return {
+            "type": "snapshot",
+            "version": self.version,
+            "timestamp": datetime.utcnow().isoformat(),
+            "state": self.state,
+        }
+
+    async def subscribe(self) -> asyncio.Queue:
+        """New subscriber queue, primed with a full snapshot of the current state"""
+        self._start()
+        if self.state is None:
+            await self.refresh()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        queue.put_nowait(self._snapshot())
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    async def refresh(self) -> Optional[Dict[str, Any]]:
+        """
+        Rebuild the state and broadcast what changed.
+
+        Returns:
+            The diff message sent, or None when nothing changed (or on the first build)
+        """
+        async with self._refresh_lock:
+            state = await self.producer()
+            self._counters["rebuilds"] += 1
+            if self.state is None:
+                self.state = state
+                self.version += 1
+                return None
+
+            changed, removed = diff_state(self.state, state)
+            if not changed and not removed:
+                return None
+
+            self.state = state
+            self.version += 1
+            message = {
+                "type": "diff",
+                "version": self.version,
+                "timestamp": datetime.utcnow().isoformat(),
+                "changed": changed,
+                "removed": removed,
+            }
+            self._publish(message)
+            self._counters["diffs"] += 1
+            return message
+
+    def _publish(self, message: Dict[str, Any]):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Diffs only apply in order; a client that fell behind skips to a snapshot
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self._snapshot())
+                self._counters["resyncs"] += 1
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.refresh_seconds or None)
+            except asyncio.TimeoutError:
+                pass
+
+            if not self._subscribers:
+                # Nobody to notify; the next subscriber rebuilds from scratch
+                self._wake.clear()
+                self.state = None
+                continue
+
+            await asyncio.sleep(self.debounce_seconds)
+            self._wake.clear()
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"[LIVE] State rebuild failed: {e}")
+
+    async def close(self):
+        """Stop the producer task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Subscriber count, state version and broadcast counters"""
+        return {
+            "subscribers": len(self._subscribers),
+            "version": self.version,
+            "queue_size": self.queue_size,
+            **self._counters,
+        }
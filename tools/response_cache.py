@@ -0,0 +1,120 @@
+"""
+In-process response cache for read-mostly API endpoints
+"""
+
+from typing import Any, Dict, Iterable, Optional
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+import hashlib
+import threading
+import time
+
+
+def content_etag(body: bytes) -> str:
+    """Strong ETag from a hash of the response content"""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+@dataclass
+class CachedResponse:
+    """Serialized response body plus its validators"""
+    
+    body: bytes
+    etag: str
+    last_modified: datetime
+    expires_at: float
+    tags: frozenset = field(default_factory=frozenset)
+    encoded: Dict[str, bytes] = field(default_factory=dict)  # content-coding -> compressed body
+
+
+class ResponseCache:
+    """
+    Thread-safe TTL cache with size-bounded LRU eviction.
+    
+    Entries are tagged with the tables they were built from so a data reload
+    can drop only the affected responses.
+    """
+    
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+    
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Return a live entry and mark it recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self._counters["misses"] += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry
+    
+    def set(self, key: str, body: bytes, tags: Iterable[str] = (), etag: Optional[str] = None) -> CachedResponse:
+        """
+        Store a serialized body, evicting least recently used entries.
+        
+        etag defaults to a hash of body; pass one computed without volatile
+        fields (e.g. a generation timestamp) so unchanged data keeps its tag.
+        """
+        entry = CachedResponse(
+            body=body,
+            etag=etag or content_etag(body),
+            last_modified=datetime.now(timezone.utc).replace(microsecond=0),
+            expires_at=time.monotonic() + self.ttl_seconds,
+            tags=frozenset(tags)
+        )
+        
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is not None and previous.etag == entry.etag:
+                # Unchanged content keeps its original Last-Modified
+                entry.last_modified = previous.last_modified
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+        
+        return entry
+    
+    def invalidate(self, tables: Optional[Iterable[str]] = None) -> int:
+        """
+        Drop cached responses.
+        
+        Args:
+            tables: Only drop entries built from these tables (None drops all)
+            
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            if tables is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                tables = set(tables)
+                stale = [key for key, entry in self._entries.items() if entry.tags & tables]
+                for key in stale:
+                    del self._entries[key]
+                removed = len(stale)
+            self._counters["invalidations"] += 1
+        
+        return removed
+    
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of cache size and hit counters"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                **self._counters,
+            }
@@ -0,0 +1,86 @@
+"""
+JSON, NDJSON and CSV encoding for query results
+
+encode_json() serializes row payloads straight to bytes (with orjson when
+installed), replacing the jsonable_encoder walk plus json.dumps that
+FastAPI does for a returned dict.
+
+The API feeds batches from SQLQueryTool.stream_query /
+AsyncSQLQueryTool.stream_query through a RowEncoder and writes each chunk
+as soon as it is encoded, so a response never holds more than one batch.
+"""
+
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Union
+import csv
+import importlib.util
+import io
+import json
+
+ORJSON_AVAILABLE = importlib.util.find_spec("orjson") is not None
+if ORJSON_AVAILABLE:
+    import orjson
+
+
+# format -> response media type
+STREAM_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return str(value)
+
+
+def encode_json(value: Any) -> bytes:
+    """
+    Serialize a response payload to UTF-8 JSON bytes.
+
+    Dates and datetimes become ISO strings and Decimals become int or float,
+    as FastAPI's jsonable_encoder renders them.
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_json_default, separators=(",", ":")).encode("utf-8")
+
+
+class RowEncoder:
+    """Encodes batches of row dicts as NDJSON lines or CSV (header before the first batch)"""
+
+    def __init__(self, fmt: str):
+        if fmt not in STREAM_FORMATS:
+            raise ValueError(f"Unknown stream format: {fmt} (expected one of {', '.join(STREAM_FORMATS)})")
+        self.fmt = fmt
+        self.media_type = STREAM_FORMATS[fmt]
+        self._columns: Optional[List[str]] = None
+
+    def encode(self, rows: List[Dict[str, Any]]) -> Union[bytes, str]:
+        """
+        Encode one batch.
+
+        NDJSON comes back as bytes (via encode_json), CSV as text; both are
+        empty for an empty batch. StreamingResponse accepts either.
+        """
+        if self.fmt == "ndjson":
+            return b"".join(encode_json(row) + b"\n" for row in rows)
+
+        if not rows:
+            return ""
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if self._columns is None:
+            self._columns = list(rows[0].keys())
+            writer.writerow(self._columns)
+        for row in rows:
+            writer.writerow([
+                value.isoformat() if isinstance(value, (datetime, date, time)) else value
+                for value in (row.get(column) for column in self._columns)
+            ])
+        return buffer.getvalue()
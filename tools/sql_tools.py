@@ -2,7 +2,7 @@
 Common tools used by all agents
 """
 
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import psycopg2
 from psycopg2.extras import RealDictCursor
 import time
@@ -10,12 +10,19 @@ from datetime import datetime
 import uuid
 import json
 
+from tools.db_pool import get_pool
+
+
+# Rows per round trip when streaming through a server-side cursor
+STREAM_BATCH_ROWS = 2000
+
 
 class SQLQueryTool:
     """Execute SQL queries against PostgreSQL database"""
     
-    def __init__(self, connection_string: str):
+    def __init__(self, connection_string: str, **pool_options):
         self.conn_string = connection_string
+        self.pool = get_pool(connection_string, **pool_options)
     
     def execute_query(
         self, 
@@ -35,7 +42,7 @@ class SQLQueryTool:
         start_time = time.time()
         
         try:
-            with psycopg2.connect(self.conn_string) as conn:
+            with self.pool.connection() as conn, conn.raw:
                 with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                     cursor.execute(query, parameters or {})
                     
@@ -53,6 +60,50 @@ class SQLQueryTool:
         except psycopg2.Error as e:
             print(f"[SQL ERROR] {e}")
             raise
+    
+    def stream_query(
+        self,
+        query: str,
+        parameters: Optional[Dict[str, Any]] = None,
+        batch_rows: int = STREAM_BATCH_ROWS
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Execute a SELECT through a named server-side cursor, yielding rows in batches.
+        
+        Only one batch is held in memory at a time, whatever the result size.
+        The pooled connection stays checked out until the iterator is
+        exhausted or closed.
+        
+        Args:
+            query: SQL query (parameterized if needed)
+            parameters: Query parameters
+            batch_rows: Rows fetched per round trip
+            
+        Yields:
+            Lists of row dictionaries
+        """
+        start_time = time.time()
+        total = 0
+        
+        try:
+            with self.pool.connection() as conn, conn.raw:
+                with conn.cursor(name=f"stream_{uuid.uuid4().hex}", cursor_factory=RealDictCursor) as cursor:
+                    cursor.itersize = batch_rows
+                    cursor.execute(query, parameters or {})
+                    
+                    while True:
+                        rows = cursor.fetchmany(batch_rows)
+                        if not rows:
+                            break
+                        total += len(rows)
+                        yield [dict(row) for row in rows]
+            
+            execution_time = (time.time() - start_time) * 1000
+            print(f"[SQL] Streamed {total} rows in {execution_time:.2f}ms")
+        
+        except psycopg2.Error as e:
+            print(f"[SQL ERROR] {e}")
+            raise
 
 
 class RiskCalculationTool:
@@ -84,6 +135,89 @@ class RiskCalculationTool:
             return "LOW"
 
 
+class ExpiryBucketAggregator:
+    """
+    Single-pass expiry bucket aggregation over available_inventory_report.
+    
+    One scan yields the inventory totals plus the expired/critical/high/medium
+    counts, with bucket edges taken from the configured expiry_*_days
+    thresholds (same boundaries as RiskCalculationTool.categorize_expiry_risk).
+    Shared by the dashboard, the risk heatmap and the Supply Watchdog.
+    """
+    
+    GROUPABLE_COLUMNS = ("trial_name", "location", "lot", "package_type_description")
+    
+    def __init__(self, config):
+        self.config = config
+    
+    @property
+    def parameters(self) -> Dict[str, int]:
+        """Threshold parameters referenced by the aggregation query"""
+        return {
+            "critical_days": self.config.expiry_critical_days,
+            "high_days": self.config.expiry_high_days,
+            "medium_days": self.config.expiry_medium_days,
+        }
+    
+    def build_query(
+        self,
+        group_by: Optional[List[str]] = None,
+        where: Optional[str] = None,
+        order_by: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Tuple[str, Dict[str, int]]:
+        """
+        Build the bucket aggregation query.
+        
+        Args:
+            group_by: Inventory columns to group by (None for one summary row)
+            where: Filter on the aggregated output columns, e.g. "live_count > 0"
+            order_by: Ordering on the aggregated output columns
+            limit: Optional row limit
+            
+        Returns:
+            Tuple of (query, parameters)
+        """
+        group_by = list(group_by or [])
+        for column in group_by:
+            if column not in self.GROUPABLE_COLUMNS:
+                raise ValueError(f"Cannot group expiry buckets by '{column}'")
+        
+        group_select = "".join(f"{column},\n                " for column in group_by)
+        group_clause = f"GROUP BY {', '.join(group_by)}" if group_by else ""
+        
+        query = f"""
+        SELECT * FROM (
+            SELECT
+                {group_select}COUNT(*) AS row_count,
+                COUNT(days_until_expiry) AS dated_count,
+                COUNT(DISTINCT lot) AS distinct_lots,
+                COUNT(DISTINCT trial_name) AS distinct_trials,
+                SUM(received_packages) AS total_packages,
+                COUNT(*) FILTER (WHERE days_until_expiry > 0) AS live_count,
+                COUNT(*) FILTER (WHERE days_until_expiry <= 0) AS expired_count,
+                COUNT(*) FILTER (WHERE days_until_expiry < %(medium_days)s) AS expiring_soon,
+                COUNT(*) FILTER (WHERE days_until_expiry > 0
+                    AND days_until_expiry <= %(critical_days)s) AS critical_count,
+                COUNT(*) FILTER (WHERE days_until_expiry > %(critical_days)s
+                    AND days_until_expiry <= %(high_days)s) AS high_count,
+                COUNT(*) FILTER (WHERE days_until_expiry > %(high_days)s
+                    AND days_until_expiry <= %(medium_days)s) AS medium_count
+            FROM (
+                SELECT *, expiry_date::date - CURRENT_DATE AS days_until_expiry
+                FROM available_inventory_report
+                WHERE deleted_at IS NULL
+            ) inventory
+            {group_clause}
+        ) buckets
+        {f"WHERE {where}" if where else ""}
+        {f"ORDER BY {order_by}" if order_by else ""}
+        {f"LIMIT {int(limit)}" if limit else ""};
+        """
+        
+        return query, self.parameters
+
+
 class AlertGeneratorTool:
     """Generate structured alert payloads"""
     
@@ -0,0 +1,97 @@
+"""
+Tiered text lookups for trial, lot and country searches
+
+Free-text searches used to run ILIKE '%term%' straight away, which no B-tree
+index can serve. Each searchable column now has a normalized key column
+(lower(btrim(col)), generated by Postgres) with a text_pattern_ops B-tree,
+and the raw column has a pg_trgm GIN index. Lookups try, in order:
+
+    exact   key = 'term'            B-tree equality
+    prefix  key LIKE 'term%'        B-tree range scan
+    fuzzy   col ILIKE '%term%'      trigram GIN index
+
+and stop at the first tier that returns rows, so the usual case of a full
+lot number or trial name never reaches the fuzzy tier.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# table -> normalized key column -> source column
+SEARCH_KEYS: Dict[str, Dict[str, str]] = {
+    "available_inventory_report": {"trial_key": "trial_name", "lot_key": "lot"},
+    "re_evaluation": {"lot_key": "lot_number"},
+    "ip_shipping_timelines_report": {"country_key": "country_name"},
+}
+
+MATCH_TIERS = ("exact", "prefix", "fuzzy")
+
+
+def normalize_key(value: str) -> str:
+    """Python twin of the key columns' lower(btrim(...))"""
+    return str(value).strip(" ").lower()
+
+
+def escape_like(value: str) -> str:
+    """Escape LIKE wildcards so user input matches literally"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_key_columns_sql(table_name: str, keys: Optional[Dict[str, str]] = None) -> str:
+    """
+    ALTER TABLE adding a table's generated key columns (idempotent).
+
+    Args:
+        table_name: Table to alter (may be a shadow table)
+        keys: Key column -> source column; defaults to SEARCH_KEYS[table_name]
+    """
+    keys = keys if keys is not None else SEARCH_KEYS[table_name]
+    clauses = ", ".join(
+        f'ADD COLUMN IF NOT EXISTS "{key}" TEXT GENERATED ALWAYS AS (lower(btrim("{source}"::text))) STORED'
+        for key, source in keys.items()
+    )
+    return f'ALTER TABLE "{table_name}" {clauses};'
+
+
+def match_tiers(key_column: str, source_column: str, term: str) -> List[Tuple[str, str, Dict[str, Any]]]:
+    """
+    WHERE-clause predicates for each lookup tier, most selective first.
+
+    Every predicate uses the %(term)s parameter.
+
+    Args:
+        key_column: Normalized key column (e.g. "lot_key")
+        source_column: Raw text column it is derived from (e.g. "lot")
+        term: User-supplied search text
+
+    Returns:
+        (tier, predicate, parameters) tuples
+    """
+    key = normalize_key(term)
+    return [
+        ("exact", f"{key_column} = %(term)s", {"term": key}),
+        ("prefix", f"{key_column} LIKE %(term)s", {"term": f"{escape_like(key)}%"}),
+        ("fuzzy", f"{source_column} ILIKE %(term)s", {"term": f"%{escape_like(term.strip())}%"}),
+    ]
+
+
+def tiered_fetch(cursor, query: str, key_column: str, source_column: str, term: str) -> Tuple[str, List]:
+    """
+    Run a query tier by tier until one returns rows.
+
+    Args:
+        cursor: psycopg2 cursor
+        query: SQL with a {match} placeholder for the predicate
+        key_column: Normalized key column
+        source_column: Raw text column
+        term: User-supplied search text
+
+    Returns:
+        (tier that matched or None, rows)
+    """
+    for tier, predicate, params in match_tiers(key_column, source_column, term):
+        cursor.execute(query.format(match=predicate), params)
+        rows = cursor.fetchall()
+        if rows:
+            return tier, rows
+    return None, []